@@ -0,0 +1,70 @@
+"""
+The cost of creating a sweep variant vs. the size of the component hierarchy.
+
+clone() constructs a new component and copies every registry, recursively.  variant() shares
+the registries until they are used.  Creating a variant and overriding one parameter, as each
+loop iteration does, is also shown, along with a variant whose whole hierarchy is then
+accessed (the worst case).
+
+    python benchmarks/bench_clone.py [num_instances ...]
+"""
+import sys
+import time
+
+from siva.components import Component, Parameter
+
+
+class Cell(Component):
+    w = Parameter(1e-6)
+    l = Parameter(100e-9)
+    m = Parameter(1)
+
+
+def hierarchy(num_instances, fanout=10):
+    """A tree of Cells with *num_instances* leaves."""
+    cells = [Cell(name="i{}".format(i)) for i in range(num_instances)]
+    while len(cells) > 1:
+        cells = [Cell(name="x{}".format(i), children=cells[n:n + fanout])
+                 for i, n in enumerate(range(0, len(cells), fanout))]
+    top = cells[0]
+    top.name = 'top'
+    return top
+
+
+def walk(comp):
+    for child in comp.children:
+        walk(child)
+
+
+def per_call(fn, n):
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn()
+    return (time.perf_counter() - t0)/n
+
+
+def main(*sizes):
+    sizes = sizes or (10, 100, 1000, 10000)
+    print("{:>10s} {:>14s} {:>14s} {:>20s} {:>20s}".format(
+        "instances", "clone", "variant", "variant + param", "variant + walk"))
+    for size in sizes:
+        top = hierarchy(size)
+        n = max(1, 1000//size)
+
+        def override():
+            v = top.variant(name='v')
+            v.params['w'].value = 2e-6
+
+        def walked():
+            walk(top.variant(name='v'))
+
+        print("{:>10d} {:>12.1f}us {:>12.1f}us {:>18.1f}us {:>18.1f}us".format(
+            size,
+            1e6*per_call(lambda: top.clone(name='c'), n),
+            1e6*per_call(lambda: top.variant(name='v'), n),
+            1e6*per_call(override, n),
+            1e6*per_call(walked, n)))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
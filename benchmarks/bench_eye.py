@@ -0,0 +1,51 @@
+"""
+Accumulating the eye diagram of a long NRZ capture, added in chunks as it would be read
+from a file, with and without resampling to the time bins.
+
+    python benchmarks/bench_eye.py [num_points] [chunk_size]
+"""
+import sys
+import time
+
+import numpy as np
+
+from siva.waveforms import EyeDiagram
+
+
+def chunks(n, chunk_size, samples_per_ui=32, ui=100e-12, seed=0):
+    """An NRZ capture with noise, generated one chunk at a time."""
+    rng = np.random.default_rng(seed)
+    dt = ui/samples_per_ui
+    kernel = np.ones(samples_per_ui//4)/(samples_per_ui//4)
+    for start in range(0, n, chunk_size):
+        m = min(chunk_size, n - start)
+        bits = rng.integers(0, 2, m//samples_per_ui + 1)*2 - 1.0
+        y = np.convolve(np.repeat(bits, samples_per_ui)[:m], kernel, mode='same') + 0.02*rng.standard_normal(m)
+        yield (start + np.arange(m))*dt, y
+
+
+def run(n, chunk_size, **kwargs):
+    eye = EyeDiagram(ui=100e-12, y_range=(-1.5, 1.5), bins=(128, 128), **kwargs)
+    generate = 0.0
+    t0 = time.perf_counter()
+    source = chunks(n, chunk_size)
+    while True:
+        t = time.perf_counter()
+        chunk = next(source, None)
+        generate += time.perf_counter() - t
+        if chunk is None:
+            break
+        eye.add(*chunk)
+    return eye, time.perf_counter() - t0 - generate
+
+
+def main(n=100000000, chunk_size=1000000):
+    print("{:,} points, in chunks of {:,}".format(n, chunk_size))
+    for label, kwargs in [("resampled", {}), ("samples", {'resample': False})]:
+        eye, elapsed = run(n, chunk_size, **kwargs)
+        print("{:40s} {:8.3f}s  height {:.3f}  width {:.1f}ps".format(label, elapsed, eye.height(level=0),
+                                                                     eye.width(level=0)*1e12))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
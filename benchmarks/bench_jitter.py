@@ -0,0 +1,53 @@
+"""
+Clock ticks and jitter of a long clock:  generating the ticks of a ClockSource, and each
+jitter measurement on them.
+
+    python benchmarks/bench_jitter.py [num_edges]
+"""
+import sys
+import time
+
+import numpy as np
+
+from siva.waveforms.clock import ClockSource
+
+
+def timeit(label, fn, repeat=3):
+    best = min(_time(fn) for i in range(repeat))
+    print("{:40s} {:8.3f}s".format(label, best))
+
+
+def _time(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+class JitteredClock(ClockSource):
+    """A clock with random and sinusoidal time interval error."""
+    def __init__(self, n, **kwargs):
+        super().__init__(**kwargs)
+        k = np.arange(n)
+        rng = np.random.default_rng(0)
+        self.tie = 1e-12*rng.standard_normal(n) + 2e-12*np.sin(2*np.pi*k/1000)
+
+    def ticks(self, n=None, edge='rising', stop=None):
+        return super().ticks(n=len(self.tie), edge=edge) + self.tie
+
+
+def main(n=10000000):
+    print("{:,} edges".format(n))
+    ideal = ClockSource(period=1e-9)
+    timeit("ticks, rising", lambda: ideal.ticks(n=n))
+    timeit("ticks, both", lambda: ideal.ticks(n=n, edge='both'))
+
+    clk = JitteredClock(n, period=1e-9)
+    timeit("period jitter", lambda: clk.jitter())
+    timeit("8-period jitter", lambda: clk.jitter(n_cycles=8))
+    timeit("cycle-cycle jitter", lambda: clk.jitter(type="cycle"))
+    timeit("TIE", lambda: clk.jitter(type="tie"))
+    timeit("TIE spectrum", lambda: clk.jitter_spectrum(), repeat=1)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
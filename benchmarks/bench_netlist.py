@@ -0,0 +1,109 @@
+"""
+Netlisting throughput for large designs, with and without a Netlister.
+
+Each design has *num_instances* transistors:  an array of *num_instances* // 100 rows, each a
+subcircuit of 50 inverters.  A flat array, with every transistor in one subcircuit, is also
+shown.  Each sweep step changes one transistor's width, as a loop variable targeting it would.
+
+    python benchmarks/bench_netlist.py [num_instances ...]
+"""
+import sys
+import time
+
+from siva.components.component import ComponentNamespace
+from siva.simulation.spice import Simulation, Circuit, Tran, Vdc
+from siva.simulation.spice.circuit import CircuitMeta
+from siva.simulation.spice.connections import Net, Input, Output, GND
+from siva.simulation.spice.primitives import Nmos, Pmos
+from siva.simulation.spice.netlister import Netlister
+
+
+def circuit(name, items):
+    """Creates a Circuit class from a list of (name, item) pairs, as a class body would."""
+    return CircuitMeta(name, (Circuit,), ComponentNamespace(None, items))
+
+
+class Inv(Circuit):
+    i = Input('i')
+    o = Output('o')
+    vdd = Input('vdd')
+    mp = Pmos(s=vdd, g=i, d=o, b=vdd, w=2e-6, l=100e-9, m=1, model="pch")
+    mn = Nmos(s=GND, g=i, d=o, b=GND, w=1e-6, l=100e-9, m=1, model="nch")
+
+
+def chain(name, length, cell=None):
+    """A chain of *length* instances of *cell*, or of inverters made of two transistors."""
+    vdd = Input('vdd')
+    nets = [Input('i')] + [Net('n{}'.format(k)) for k in range(1, length)] + [Output('o')]
+    items = [('i', nets[0]), ('o', nets[-1]), ('vdd', vdd)]
+    items += [('n{}'.format(k), nets[k]) for k in range(1, length)]
+    for k in range(length):
+        if cell is not None:
+            items.append(('x{}'.format(k), cell(nets[k], nets[k + 1], vdd)))
+        else:
+            items.append(('mp{}'.format(k), Pmos(s=vdd, g=nets[k], d=nets[k + 1], b=vdd, w=2e-6, l=100e-9,
+                                                 m=1, model="pch")))
+            items.append(('mn{}'.format(k), Nmos(s=GND, g=nets[k], d=nets[k + 1], b=GND, w=1e-6, l=100e-9,
+                                                 m=1, model="nch")))
+    return circuit(name, items)
+
+
+def simulation(num_instances, hierarchical=True):
+    if hierarchical:
+        array = chain('Array', num_instances//100, chain('Row', 50, Inv))
+    else:
+        array = chain('Array', num_instances//2)
+
+    class Sim(Simulation):
+        Tran(step=1e-12, stop=1e-9)
+        vdd = Net('vdd')
+        a = Net('a')
+        b = Net('b')
+        dut = array(a, b, vdd)
+        v_vdd = Vdc(vdd, v=1.0)
+
+    Sim.simulator_path = ''
+    return Sim(name='sim', work_dir=None)
+
+
+def sweep_target(sim):
+    """A transistor deep in the design, in the instance of each cell that is netlisted"""
+    inst = sim.dut
+    while 'mn' not in inst.instances:
+        names = [name for name in inst.instances if name.startswith('mn')]
+        if names:
+            return inst.instances[names[-1]]
+        inst = list(inst.instances.values())[0]
+    return inst.instances['mn']
+
+
+def per_netlist(sim, steps=5):
+    target = sweep_target(sim)
+    t0 = time.perf_counter()
+    for k in range(steps):
+        target.params['w'].value = (1 + k)*1e-6
+        text = sim.netlist()
+    return (time.perf_counter() - t0)/steps, text
+
+
+def main(*sizes):
+    sizes = sizes or (1000, 10000)
+    print("{:>10s} {:>14s} {:>12s} {:>12s} {:>12s}".format(
+        "instances", "design", "netlist", "netlister", "lines/s"))
+    for size in sizes:
+        for hierarchical in (True, False):
+            sim = simulation(size, hierarchical)
+            plain, text = per_netlist(sim)
+
+            sim.netlister = Netlister()
+            sim.netlist()  # Fill the cache
+            cached, cached_text = per_netlist(sim)
+            assert cached_text == text
+
+            print("{:>10d} {:>14s} {:>10.1f}ms {:>10.1f}ms {:>12,.0f}".format(
+                size, "hierarchical" if hierarchical else "flat", 1e3*plain, 1e3*cached,
+                text.count('\n')/cached))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
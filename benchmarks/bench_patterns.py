@@ -0,0 +1,54 @@
+"""
+Bitwise operations, bit selection and conversion to Logic waveforms of long patterns:
+Pattern (a list of Binary words) compared with PackedPattern (an array of words).
+
+    python benchmarks/bench_patterns.py [num_words]
+"""
+import sys
+import time
+
+import numpy as np
+
+from siva.waveforms import Pattern, PackedPattern
+
+
+def timeit(label, fn, repeat=3):
+    best = min(_time(fn) for i in range(repeat))
+    print("{:40s} {:8.3f}s".format(label, best))
+
+
+def _time(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def main(n=10000000):
+    rng = np.random.default_rng(0)
+    words = rng.integers(0, 2**10, n)
+
+    # Pattern is measured on fewer words, and scaled
+    m = min(n, 20000)
+    scale = n/m
+    pattern = Pattern(words[:m].tolist(), width=10)
+    print("{:,} 10 bit words (Pattern:  {:,}, scaled)".format(n, m))
+    t = min(_time(lambda: [~b for b in pattern.data]) for i in range(3))*scale
+    print("{:40s} {:8.3f}s".format("Pattern, invert (scaled)", t))
+    t = min(_time(lambda: [b[9:5] for b in pattern.data]) for i in range(3))*scale
+    print("{:40s} {:8.3f}s".format("Pattern, bits [9:5] (scaled)", t))
+
+    packed = PackedPattern(words, width=10)
+    timeit("PackedPattern, create", lambda: PackedPattern(words, width=10))
+    timeit("PackedPattern, invert", lambda: ~packed)
+    timeit("PackedPattern, xor", lambda: packed ^ packed)
+    timeit("PackedPattern, bits [9:5]", lambda: packed.bits[9:5])
+    timeit("PackedPattern, unpack", lambda: packed.unpack())
+    bits = packed.unpack()
+    timeit("PackedPattern, pack", lambda: PackedPattern.pack(bits, 10))
+    timeit("PackedPattern, to_logic", lambda: packed.to_logic(period=1e-9))
+    logic = packed.to_logic(period=1e-9)
+    timeit("PackedPattern, from_logic", lambda: PackedPattern.from_logic(logic, period=1e-9))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
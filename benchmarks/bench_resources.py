@@ -0,0 +1,66 @@
+"""
+Request-to-grant latency of the resource managers under load.
+
+Many threads each make a series of short-lived SlotManager requests, as sweep variants do
+when they launch simulators.  The event driven manager is compared with a manager that
+reproduces the old loop:  sleep 'polling_time', then handle a single queued request.
+
+    python benchmarks/bench_resources.py [num_jobs] [num_threads]
+"""
+import sys
+import time
+import threading
+
+from siva.resources.slot_resources import SlotManager
+
+
+class PollingSlotManager(SlotManager):
+    """The pre-event driven behavior:  one request per polling interval."""
+    def run(self):
+        self._running = True
+        while self._running:
+            time.sleep(self.polling_time)
+            self.process_one()
+
+    def process_one(self):
+        with self.lock:
+            while not self.queue.empty():
+                self.pending.append(self.queue.get())
+            for request in self.pending:
+                resource = self.get_resource(request)
+                if resource is not None:
+                    self.pending.remove(request)
+                    self.grant(request, resource)
+                    break
+
+
+def run(mgr, num_jobs, num_threads, hold_time=.001):
+    per_thread = num_jobs//num_threads
+
+    def worker():
+        for i in range(per_thread):
+            with mgr.request(job=None):
+                time.sleep(hold_time)
+
+    threads = [threading.Thread(target=worker) for i in range(num_threads)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    mgr.stop()
+    return elapsed, mgr.stats()
+
+
+def main(num_jobs=2000, num_threads=100, slots=16, polling_time=.01):
+    print("{} jobs from {} threads, {} slots, polling_time={}s".format(num_jobs, num_threads, slots, polling_time))
+    for cls in (PollingSlotManager, SlotManager):
+        elapsed, stats = run(cls(slots=slots, polling_time=polling_time), num_jobs, num_threads)
+        print("{:20s} total {:8.3f}s   mean wait {:8.4f}s   max wait {:8.4f}s   grants/s {:10.1f}".format(
+            cls.__name__, elapsed, stats['mean_wait'], stats['max_wait'], stats['num_granted']/elapsed))
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,62 @@
+"""
+Slicing long serdes captures into symbols with Wave.slice:  PAM-2 and PAM-4, compared
+with slicing PAM-2 by finding the rising and falling crossings separately and sorting them.
+
+    python benchmarks/bench_slice.py [num_points]
+"""
+import sys
+import time
+
+import numpy as np
+
+from siva.waveforms import Wave
+from siva.waveforms.logic import Logic
+
+
+def timeit(label, fn, repeat=3):
+    best = min(_time(fn) for i in range(repeat))
+    print("{:40s} {:8.3f}s".format(label, best))
+
+
+def _time(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def capture(n, levels, samples_per_ui=32, ui=100e-12, seed=0):
+    """A band limited PAM capture with noise:  random symbols, smoothed by a few passes of a moving average."""
+    rng = np.random.default_rng(seed)
+    symbols = rng.choice(levels, n//samples_per_ui + 1)
+    y = np.repeat(symbols, samples_per_ui)[:n]
+    for i in range(3):
+        y = np.convolve(y, np.ones(samples_per_ui//4)/(samples_per_ui//4), mode='same')
+    y += 0.02*rng.standard_normal(n)
+    x = np.arange(n)*(ui/samples_per_ui)
+    return Wave(x=x, y=y)
+
+
+def sort_crossings(wave, level, values=(0, 1)):
+    """Rising and falling crossings, merged with a sort."""
+    x_rising = wave.cross(level, edge="rising")
+    x_falling = wave.cross(level, edge="falling")
+    x = np.concatenate([[wave.x[0]], x_rising, x_falling])
+    y = np.concatenate([[values[0] if wave.y[0] <= level else values[1]],
+                        np.repeat(values[1], len(x_rising)), np.repeat(values[0], len(x_falling))])
+    indices = x.argsort()
+    return Logic(x=x[indices], y=y[indices])
+
+
+def main(n=50000000):
+    print("{:,} point captures".format(n))
+    nrz = capture(n, [-1., 1.])
+    timeit("PAM-2, sorted crossings", lambda: sort_crossings(nrz, 0.))
+    timeit("PAM-2, slice", lambda: nrz.slice([0.], values=[-1, 1]))
+    del nrz
+
+    pam4 = capture(n, [-3., -1., 1., 3.])
+    timeit("PAM-4, slice", lambda: pam4.slice([-2., 0., 2.], values=[-3, -1, 1, 3]))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,84 @@
+"""
+Binary operations between Waves with different x values, the per-call cost of
+interpolating a waveform (e.g., sampling at each clock tick in a loop), and building
+a waveform incrementally, compared with copying the same data into preallocated arrays.
+
+    python benchmarks/bench_waveforms.py [num_points]
+"""
+import sys
+import time
+
+import numpy as np
+
+from siva.waveforms import Wave
+
+
+def timeit(label, fn, repeat=3):
+    best = min(_time(fn) for i in range(repeat))
+    print("{:40s} {:8.3f}s".format(label, best))
+
+
+def _time(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def main(n=10000000):
+    print("{:,} point waveforms".format(n))
+    rng = np.random.default_rng(0)
+
+    # Two event driven runs:  same span, independent (non-uniform) time points
+    a = Wave(x=np.sort(rng.uniform(0, 1e-6, n)), y=rng.standard_normal(n))
+    b = Wave(x=np.sort(rng.uniform(0, 1e-6, n)), y=rng.standard_normal(n), interp='step')
+    c = Wave(x=a.x, y=rng.standard_normal(n), interp='nearest')
+
+    timeit("same x (no interpolation)", lambda: a + c)
+    timeit("union, linear + step", lambda: a + b)
+    timeit("intersection", lambda: a.combine(b, '__add__', domain='intersection'))
+    timeit("left", lambda: a.combine(b, '__add__', domain='left'))
+    timeit("resample, dx = 1ps", lambda: a.combine(b, '__add__', domain=1e-12))
+
+    # Sampling one point at a time
+    w = Wave(x=np.linspace(0, 1e-6, 100001), y=rng.standard_normal(100001))
+    ticks = rng.uniform(0, 1e-6, 1000)
+    for kind in ('linear', 'step', 'nearest', 'cubic'):
+        f = w.interpolator(kind)
+        t = min(_time(lambda: [f(t) for t in ticks]) for i in range(3))
+        print("{:40s} {:8.2f}us/call".format("interpolate one point, " + kind, 1e6*t/len(ticks)))
+
+    # Building a waveform from blocks of samples
+    x = np.arange(n, dtype=float)
+    y = rng.standard_normal(n)
+    block = 10000
+
+    def build(reserve=False):
+        w = Wave()
+        if reserve:
+            w.reserve(n)
+        for i in range(0, n, block):
+            w.extend(x[i:i + block], y[i:i + block])
+        return w.finalize()
+
+    def copy():
+        bx, by = np.empty(n), np.empty(n)
+        for i in range(0, n, block):
+            bx[i:i + block] = x[i:i + block]
+            by[i:i + block] = y[i:i + block]
+
+    timeit("copy into preallocated arrays", copy)
+    timeit("build mode, extend", build)
+    timeit("build mode, reserve + extend", lambda: build(reserve=True))
+
+    m = min(n, 1000000)
+
+    def append():
+        w = Wave()
+        for i in range(m):
+            w.append(i, 0.5)
+    t = min(_time(append) for i in range(3))
+    print("{:40s} {:8.2f}us/call".format("build mode, append one point", 1e6*t/m))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
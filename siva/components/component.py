@@ -13,7 +13,8 @@ import collections
 import copy
 import inspect
 
-from .registered import Registered, Registry
+from .registered import Registered, Registry, CowRegistry
+from .expressions import HierarchyNamespace
 
 class ComponentNamespace(collections.OrderedDict):
     """ A dictionary that provides instances of a default class
@@ -167,6 +168,32 @@ class Component(Registered, metaclass=ComponentMeta):
             setattr(clone_inst, name, value)
         return clone_inst
 
+    def variant(self, **kwargs):
+        """ Creates a lightweight copy of this component.
+
+        Unlike clone(), the constructor isn't called, and the registries aren't copied.  The variant's
+        registries are copy-on-write views of this component's (See CowRegistry):  parameters, child
+        components, etc. are only copied when the variant uses them.  Other attributes are shared.
+        """
+        inst = object.__new__(self.__class__)
+        memo = {}
+        for k, v in self.__dict__.items():
+            if k in self._registries:
+                v = CowRegistry(owner=inst, base=v, memo=memo)
+            inst.__dict__[k] = v
+        inst._registries = list(self._registries)
+        inst.init_variant()
+
+        # Apply new attribute values to the variant
+        for name, value in kwargs.items():
+            setattr(inst, name, value)
+        return inst
+
+    def init_variant(self):
+        """ Called by variant() to reset the state that a variant shouldn't share with the original.
+        """
+        pass
+
     def __init__(self, parent=None, children=None, name=None):
         self.name = name
         self.parent = parent
@@ -248,6 +275,12 @@ class Component(Registered, metaclass=ComponentMeta):
         ns.update(self.namespace)
         return ns
 
+    def scope(self):
+        """ Returns a HierarchyNamespace for evaluating expressions:  The same names as hierarchy_namespace,
+        looked up as they are used.
+        """
+        return HierarchyNamespace(self)
+
     @property
     def hierarchy_params(self):
         params = collections.OrderedDict()
@@ -0,0 +1,146 @@
+"""
+Compiled expressions for parameters and measurements.
+
+Expression strings (parameter formulas, parameter targets, and measurement expressions) are
+compiled once, and the code objects are reused for every evaluation.  Targets are parsed once
+into a Target, which assigns values directly instead of formatting and executing a statement.
+
+Expressions are evaluated against a HierarchyNamespace:  a read-only view of a component's
+hierarchy namespace (See Component.hierarchy_namespace) that looks names up on demand,
+instead of building a dictionary of every name in the hierarchy.
+"""
+import ast
+import functools
+from collections.abc import Mapping
+
+
+@functools.lru_cache(maxsize=None)
+def compile_expression(expr):
+    """Returns the code object of an expression.  A leading '=' (formula) is ignored."""
+    expr = expr.strip()
+    if expr.startswith('='):
+        expr = expr[1:]
+    return compile(expr, "<{}>".format(expr), 'eval')
+
+
+class Target:
+    """ An assignable expression:  a name, attribute, or item.  E.g., 'x', 'sim.vdd', 'sim.ports[0]'.
+
+    If the expression evaluates to a callable, assign() calls it with the value instead.
+    """
+    def __init__(self, expr):
+        self.expr = expr
+        node = ast.parse(expr.strip(), mode='eval').body
+        self.code = compile_expression(expr)
+
+        self.name = self.attr = self.obj = self.key = None
+        if isinstance(node, ast.Name):
+            self.name = node.id
+        elif isinstance(node, ast.Attribute):
+            self.obj = compile_expression(ast.unparse(node.value))
+            self.attr = node.attr
+        elif isinstance(node, ast.Subscript):
+            self.obj = compile_expression(ast.unparse(node.value))
+            self.key = compile_expression(ast.unparse(node.slice))
+        else:
+            raise ValueError("Can't assign to {}".format(expr))
+
+    def assign(self, value, globals, locals):
+        try:
+            current = eval(self.code, globals, locals)
+        except (AttributeError, KeyError, NameError):
+            # The target will be created by the assignment
+            current = None
+        if callable(current):
+            current(value)
+            return
+
+        if self.name is not None:
+            locals[self.name] = value
+        elif self.attr is not None:
+            setattr(eval(self.obj, globals, locals), self.attr, value)
+        else:
+            eval(self.obj, globals, locals)[eval(self.key, globals, locals)] = value
+
+
+@functools.lru_cache(maxsize=None)
+def compile_target(expr):
+    return Target(expr)
+
+
+class HierarchyNamespace(Mapping):
+    """ The names visible to a component's expressions, resolved when they are looked up.
+
+    Names resolve as they do in Component.hierarchy_namespace:  'self', the component's name, its child
+    components, its non-local parameters, then the names of its children's namespaces, and then the same
+    for each of its ancestors.  Each name is resolved once;  parameters are looked up to their current
+    evaluated value every time.
+
+    Assigned names (E.g., parameter targets that are plain names) are kept in the namespace.
+    """
+    _missing = object()
+
+    def __init__(self, component):
+        self.component = component
+        self._resolved = {}
+        self._assigned = {}
+
+    def __getitem__(self, name):
+        if name in self._assigned:
+            return self._assigned[name]
+        item = self._resolved.get(name)
+        if item is None:
+            item = self._resolved[name] = self.resolve(name)
+        if item is self._missing:
+            raise KeyError(name)
+        kind, value = item
+        return value.evaluated_value if kind == 'param' else value
+
+    def __setitem__(self, name, value):
+        self._assigned[name] = value
+
+    def resolve(self, name):
+        if name == 'self':
+            return 'obj', self.component
+
+        # A component's namespace includes its children's, so each ancestor is searched without
+        # the subtree that was just searched.
+        searched = None
+        comp = self.component
+        while comp is not None:
+            item = self._search(comp, name, skip=searched)
+            if item is not None:
+                return item
+            searched = comp
+            comp = comp.parent
+        return self._missing
+
+    def _search(self, comp, name, skip=None):
+        """Looks *name* up in a component's namespace.  (See Component.namespace)"""
+        if name == comp.name:
+            return 'obj', comp
+        components = comp.components
+        if name in components:
+            return 'obj', components[name]
+        params = comp.params
+        if name in params and not params[name].local:
+            return 'param', params[name]
+        for child in reversed(list(components.values())):
+            if child is not skip:
+                item = self._search(child, name)
+                if item is not None:
+                    return item
+        return None
+
+    def __iter__(self):
+        return iter(self.component.hierarchy_namespace)
+
+    def __len__(self):
+        return len(self.component.hierarchy_namespace)
+
+    def __contains__(self, name):
+        try:
+            self[name]
+        except KeyError:
+            return False
+        return True
@@ -1,5 +1,6 @@
 import inspect
 from ..components.registered import Registered
+from .expressions import compile_expression, compile_target
 from siva.utilities.conversions import float_to_eng
 
 class Parameter(Registered):
@@ -41,19 +42,17 @@ class Parameter(Registered):
     def eval(self, globals, locals):
         """Propagates values to the target defined by an expression.  The expression must be defined
         in terms of names contained in the global and local namespaces provided.
+
+        Formulas and targets are compiled the first time they are used.  (See siva.components.expressions)
         """
 
         # Handle formula values
         if type(self.value) is str and self.value.startswith('='):
-            value = eval(str(self.value), globals, locals)
+            value = eval(compile_expression(self.value), globals, locals)
         else:
             value = self.value
         self.evaluated_value = value
 
-        # The parameter value will be set via exec.  Need to ensure string values are enclosed in quotes.
-        if type(value) is str:
-            value = "'{}'".format(value)
-
         # If this variable is a 'remote' variable, set its target
         if self.target is not None:
             # If an non-string iterable wasn't given, wrap it in a list
@@ -64,20 +63,7 @@ class Parameter(Registered):
 
             for target in targets:
                 try:
-                    # Determine if the target expression is a callable.  This may fail
-                    # with an attribute error if the target expression is an instance attribute
-                    # that hasn't been created yet.
-
-                    evaled_target = eval(target, globals, locals)
-                    if callable(evaled_target):
-                        exec("{}({})".format(target, value), globals, locals)
-                    else:
-                        exec("{}={}".format(target, value), globals, locals)
-                except AttributeError:
-                    # If the target expression is an instance attribute created by evaluating
-                    # the expression, the previous eval statement will create an AttributeError
-                    # but the expression below will work.
-                    exec("{}={}".format(target, value), globals, locals)
+                    compile_target(target).assign(value, globals, locals)
                 except NameError:
                     raise
                 except:
@@ -111,6 +97,13 @@ class Parameter(Registered):
     def __str__(self):
         return str(self.evaluated_value)
 
+    @property
+    def shareable(self):
+        """ True if variants can share this parameter with their master until it is changed.  (See CowRegistry)
+        Formulas are evaluated separately in each variant.
+        """
+        return not (type(self.value) is str and self.value.startswith('='))
+
     def clone(self, owner=None):
         if owner is None:
             owner = self.parent
@@ -27,6 +27,71 @@ class Registry(collections.OrderedDict):
                 copied_item.parent = owner
         return new_copy
 
+class CowRegistry(Registry):
+    """ A copy-on-write view of another registry, used by lightweight variants.  (See Component.variant)
+
+    Items are shared with the *base* registry until they're looked up by name, when they are replaced
+    with private copies.  Iterating over the registry also makes private copies, except of items that are
+    read-only while running (See Parameter.shareable).  Change those by name, E.g. variant.params['x'].value.
+
+    Registries of the same variant share a *memo*, so an item registered under two names (E.g., a
+    LoopVariable, in 'params' and 'loop_vars') is copied once.
+    """
+    def __init__(self, owner=None, base=None, memo=None):
+        super().__init__(owner=owner)
+        self._memo = {} if memo is None else memo
+        self._private = set()
+        if base is not None:
+            for key, item in Registry.items(base):
+                Registry.__setitem__(self, key, item)
+
+    def __getitem__(self, key):
+        item = super().__getitem__(key)
+        if key not in self._private:
+            item = self._copy_on_write(key, item)
+        return item
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._private.add(key)
+
+    def _copy_on_write(self, key, item):
+        if id(item) in self._memo:
+            copied = self._memo[id(item)][1]
+        else:
+            if hasattr(item, 'variant'):
+                copied = item.variant(parent=self.owner)
+            elif hasattr(item, 'clone'):
+                copied = item.clone()
+            else:
+                copied = copy.copy(item)
+            if hasattr(item, 'parent'):
+                copied.parent = self.owner
+            # Keep a reference to the original, so its id isn't reused
+            self._memo[id(item)] = (item, copied)
+        super().__setitem__(key, copied)
+        self._private.add(key)
+        return copied
+
+    def _read(self, key, item):
+        if key in self._private or getattr(item, 'shareable', False):
+            return item
+        return self._copy_on_write(key, item)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def values(self):
+        return [self._read(k, v) for k, v in list(super().items())]
+
+    def items(self):
+        return [(k, self._read(k, v)) for k, v in list(super().items())]
+
+    def __reduce__(self):
+        # Sent to worker processes as an ordinary registry
+        return Registry, (self.owner,), None, None, iter(self.items())
+
+
 class ListRegistry(list):
     def __init__(self, *args, owner=None):
         super().__init__(*args)
@@ -0,0 +1,87 @@
+import pytest
+
+from ..component import Component
+from ..parameter import Parameter
+from ..expressions import compile_expression, compile_target
+from siva.simulation.measurement import Measurement, evaluate_all
+
+
+class Leaf(Component):
+    w = Parameter(2)
+    hidden = Parameter(5, local=True)
+
+
+class Mid(Component):
+    l = Parameter(3)
+    leaf = Leaf()
+
+
+class Top(Component):
+    vdd = Parameter(1.8)
+    w = Parameter('=vdd*2')
+    mid = Mid()
+    other = Leaf()
+
+
+def test_compile():
+    assert compile_expression('a + 1') is compile_expression('a + 1')
+    assert eval(compile_expression('=a*2'), {}, {'a': 2}) == 4
+    assert compile_target('sim.x') is compile_target('sim.x')
+    with pytest.raises(ValueError):
+        compile_target('a + 1')
+
+
+def test_targets():
+    class Obj:
+        pass
+    obj = Obj()
+    obj.items = [0, 0]
+    calls = []
+    obj.set = calls.append
+
+    ns = {'obj': obj}
+    compile_target('obj.x').assign(1, {}, ns)
+    compile_target('obj.items[1]').assign(2, {}, ns)
+    compile_target('obj.set').assign(3, {}, ns)
+    compile_target('y').assign('string', {}, ns)
+    assert obj.x == 1 and obj.items == [0, 2] and calls == [3] and ns['y'] == 'string'
+
+
+def test_scope():
+    top = Top(name='top')
+    leaf = top.mid.leaf
+
+    # The same names as the hierarchy namespace
+    for comp in (top, top.mid, leaf, top.other):
+        expected = comp.hierarchy_namespace
+        scope = comp.scope()
+        for name, value in expected.items():
+            assert scope[name] is value or scope[name] == value, (comp.name, name)
+        assert 'hidden' not in scope
+        assert 'missing' not in scope
+
+    # Parameters are looked up to their current value
+    scope = leaf.scope()
+    assert scope['vdd'] == 1.8
+    top.params['vdd'].value = 1.2
+    assert scope['vdd'] == 1.2
+
+    # Formulas
+    top.params['w'].target = 'mid.leaf.w'
+    top.params['w'].eval({}, top.scope())
+    assert top.params['w'].evaluated_value == 2.4
+    assert leaf.w == 2.4
+
+
+def test_evaluate_all():
+    top = Top(name='top')
+    m1 = Measurement(expr='mid.l*2', name='m1')
+    m2 = Measurement(expr='vdd', name='m2')
+    evaluate_all([m1, m2], top.scope())
+    assert m1.value == 6 and m2.value == 1.8
+
+    # A failing measurement raises its own exception
+    m3 = Measurement(expr='mid.missing', name='m3')
+    with pytest.raises(AttributeError):
+        evaluate_all([m1, m3], top.scope())
+    assert m1.value == 6
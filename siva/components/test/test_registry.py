@@ -44,3 +44,56 @@ def test_registry():
 
     assert a.v1 is not A.v1
 
+
+
+def test_cow_registry():
+    from ..parameter import Parameter
+    from ..registered import CowRegistry
+
+    class A(Component):
+        v1 = Var()
+        p1 = Parameter(1)
+        p2 = Parameter('=p1*2')
+
+    a = A(name='a')
+    memo = {}
+    params = CowRegistry(owner='variant', base=a.params, memo=memo)
+    my_vars = CowRegistry(owner='variant', base=a.my_vars, memo=memo)
+
+    # Constant parameters are shared until they are accessed by name
+    assert params.values()[0] is a.params['p1']
+    assert params.values()[1] is not a.params['p2']
+    assert params['p1'] is not a.params['p1']
+    assert params['p1'].parent == 'variant'
+    params['p1'].value = 3
+    assert a.params['p1'].value == 1
+
+    # Other items are copied when they are used
+    assert list(my_vars) == ['v1']
+    assert my_vars.values()[0] is not a.my_vars['v1']
+    assert my_vars.get('v1') is my_vars['v1']
+
+
+def test_variant():
+    from ..parameter import Parameter
+
+    class B(Component):
+        p = Parameter(1)
+
+    class A(Component):
+        p = Parameter(1)
+        b = B()
+
+    a = A(name='a')
+    v = a.variant(name='v')
+    assert v.name == 'v' and a.name == 'a'
+    assert v.params is not a.params
+
+    v.p = 2
+    assert v.p == 2 and a.p == 1
+
+    # Children are copied when used, and become children of the variant
+    assert v.b is not a.b
+    assert v.b.parent is v
+    assert v.b.p == 1
+    assert a.b.parent is a
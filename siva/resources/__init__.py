@@ -1,2 +1,3 @@
 from .disk_resources import DiskManager, LocalDiskManager
-from .resources import Request, ResourceManager, ResourceTimeoutError
\ No newline at end of file
+from .resources import Request, ResourceManager, ResourceTimeoutError
+from .slot_resources import SlotManager, SlotRequest, SlotResource
@@ -46,7 +46,7 @@ class DiskManager(ResourceManager):
     """
     log_name = "Disk"
 
-    def __init__(self, root=".", max_size=None, polling_time=.01, log_file="disk_mgr.log"):
+    def __init__(self, root=".", max_size=None, polling_time=1, log_file="disk_mgr.log"):
 
         root = os.path.abspath(root)
         if log_file:
@@ -81,29 +81,26 @@ class LocalDiskManager(DiskManager):
 
     def get_resource(self, request):
         """ Called by the Resource base class to get a resource.  This method is responsible
-        for allocating resources given the request.  If the resource is not available, it should
-        block until the resource is available.
-
-        This method should check for resource availability once every 'polling_time' seconds.
+        for allocating resources given the request.  If there isn't enough space, None is returned
+        and the request is retried when a disk resource is released, or after 'polling_time' seconds.
         """
         # If there is enough disk space for the requested job, grant the request.
-        while self._running:
-            if self.max_size is not None:
-                available_space = sum([r.size for r in self.resources]) - self.max_size
-            else:
-                available_space = shutil.disk_usage(self.root).free
-
-            if (request.size < available_space):
-                if request.subdirs is not None:
-                    subdirs = request.subdirs
-                else:
-                    subdirs = [request.name]
-                job_dir = os.path.join(self.root, *subdirs)
-
-                resource = DiskResource(path=job_dir, mgr=self, size=request.size)
-                self.info("Disk granted to {}".format(job_dir))
-                self.resources.append(resource)
-                return resource
-            else:
-                self.info("Waiting for more disk space")
-                time.sleep(self.polling_time)
\ No newline at end of file
+        if self.max_size is not None:
+            available_space = self.max_size - sum([r.size for r in self.resources])
+        else:
+            available_space = shutil.disk_usage(self.root).free
+
+        if request.size > available_space:
+            self.info("Waiting for more disk space")
+            return None
+
+        if request.subdirs is not None:
+            subdirs = request.subdirs
+        else:
+            subdirs = [request.name]
+        job_dir = os.path.join(self.root, *subdirs)
+
+        resource = DiskResource(path=job_dir, mgr=self, size=request.size)
+        self.info("Disk granted to {}".format(job_dir))
+        self.resources.append(resource)
+        return resource
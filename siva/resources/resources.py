@@ -26,6 +26,17 @@ class Request(threading.Event):
 
         self.resource = None
 
+        self.submit_time = time.time()
+        self.grant_time = None
+        self.cancelled = False
+
+    @property
+    def wait_time(self):
+        """Time from the request until it was granted (or until now, if it is still waiting)."""
+        if self.grant_time is None:
+            return time.time() - self.submit_time
+        return self.grant_time - self.submit_time
+
     def __repr__(self):
         return "{}(job={})".format(self.__class__.__name__, str(self.job))
 
@@ -37,15 +48,32 @@ class ResourceManager(threading.Thread):
         # Queue to store incoming requests
         self.queue = Queue()
 
+        # Requests taken from the queue, but not yet granted
+        self.pending = []
+
         # Initial state of the manager
         self._running = False
+        self._start_lock = threading.Lock()
 
-        # How often the request queue is polled for new requests (in seconds)
+        # The manager thread sleeps on this condition until a request arrives or a resource is freed
+        self.lock = threading.RLock()
+        self.condition = threading.Condition(self.lock)
+        self._changed = False
+
+        # The longest time the manager waits between checks for new requests (in seconds).
+        # Subclasses whose resources can become available without delete_resource being called
+        # (e.g., disk space freed by another program) are re-checked this often.
         self.polling_time = polling_time
 
         # Keep track of allocated resources
         self.resources = []
 
+        # Statistics
+        self.num_granted = 0
+        self.total_wait = 0.
+        self.max_wait = 0.
+        self.max_queue_depth = 0
+
         # Logging
         self.setup_logging(log_file=log_file, log_name=self.log_name)
 
@@ -64,58 +92,116 @@ class ResourceManager(threading.Thread):
     def enqueue_request(self, request, timeout=None):
         """Places the request in the queue and waits for it to be granted.
         """
-        if not self._running:
-            self.start()
+        # Several jobs may make their first request at the same time
+        with self._start_lock:
+            if not self._started.is_set():
+                self.start()
         self.queue.put(request)
+        self.notify()
+
         # The wait method will not return until the process_request loop
         # has called the request's set() method.
         if not request.wait(timeout):
-            raise ResourceTimeoutError
+            with self.lock:
+                # It may have been granted after the wait timed out
+                if not request.is_set():
+                    request.cancelled = True
+                    raise ResourceTimeoutError
 
         return request.resource
 
+    def notify(self):
+        """Wakes the manager thread to process requests."""
+        with self.condition:
+            self._changed = True
+            self.condition.notify()
+
     def run(self):
         """Executes the resource manager.  This method is called in its own thread of execution
         when the start method is called.
+
+        Requests are processed as soon as they arrive or resources are freed, and at least once
+        every 'polling_time' seconds.
         """
         self._running = True
         self.info("Resource manager started.".format(self.log_name))
         while self._running:
-            time.sleep(self.polling_time)
+            with self.condition:
+                if not self._changed:
+                    self.condition.wait(self.polling_time)
+                self._changed = False
             self.process_requests()
         self.debug('Run method is now halting.')
 
     def stop(self):
         self._running = False
+        self.notify()
 
     def process_requests(self):
-        """ Simple processing loop that gets requests from the queue and waits for the resource to
-        become available before granting.
+        """ Takes all new requests from the queue, then grants every pending request whose
+        resource is available.  Requests that can't be granted wait for the next pass.
 
-        More sophisticated managers can override this method to implement prioritization, or allow
-        smaller requests to get access to resources before larger ones.
+        More sophisticated managers can override sort_pending() to implement prioritization.
         """
-        if not self.queue.empty():
-            request = self.queue.get()
-            self.debug("Making request: {}".format(request))
-            # get_resource will block if the the requested resource
-            # is not available
-            request.resource = self.get_resource(request)
-            self.debug("Request granted: {}".format(request))
-            request.set()
+        with self.lock:
+            while not self.queue.empty():
+                self.pending.append(self.queue.get())
+            self.pending = [r for r in self.pending if not r.cancelled]
+            self.max_queue_depth = max(self.max_queue_depth, len(self.pending))
+
+            if not self.pending:
+                return
+
+            self.sort_pending()
+            waiting = []
+            for request in self.pending:
+                self.debug("Making request: {}".format(request))
+                resource = self.get_resource(request)
+                if resource is None:
+                    waiting.append(request)
+                else:
+                    self.grant(request, resource)
+            self.pending = waiting
+
+    def sort_pending(self):
+        """Orders the pending requests.  By default, requests are granted in the order they were made."""
+        pass
+
+    def grant(self, request, resource):
+        request.resource = resource
+        request.grant_time = time.time()
+        self.num_granted += 1
+        self.total_wait += request.wait_time
+        self.max_wait = max(self.max_wait, request.wait_time)
+        self.debug("Request granted: {}".format(request))
+        request.set()
 
     def get_resource(self, request):
         """ Called by the Resource base class to get a resource.  This method is responsible
         for allocating resources given the request.  If the resource is not available, it should
-        block until the resource is available.
-
-        This method should check for resource availability once every 'polling_time' seconds.
+        return None, and the request will be retried when a resource is freed.
         """
         raise NotImplementedError
 
     def delete_resource(self, resource):
-        self.resources.remove(resource)
-
+        with self.lock:
+            self.resources.remove(resource)
+        # Freed capacity may satisfy a waiting request
+        self.notify()
+
+    @property
+    def queue_depth(self):
+        """Number of requests waiting to be granted."""
+        return len(self.pending) + self.queue.qsize()
+
+    def stats(self):
+        """Returns a dictionary of wait time statistics."""
+        return {'queue_depth': self.queue_depth,
+                'max_queue_depth': self.max_queue_depth,
+                'num_granted': self.num_granted,
+                'mean_wait': self.total_wait/self.num_granted if self.num_granted else 0.,
+                'max_wait': self.max_wait,
+                }
 
     def setup_logging(self, log_file=None, log_name="Resource", level=logging.WARNING):
         if log_file is not None:
@@ -0,0 +1,138 @@
+import os
+
+from .resources import Request, ResourceManager
+
+
+class SlotRequest(Request):
+    """ A request for compute resources:  CPU slots, memory, and simulator license tokens.
+
+    Requests with a higher *priority* are granted first.  Among requests of equal priority,
+    the *group* that has been granted the fewest requests goes first, so the iterations of an
+    outer loop share the machine instead of the first iteration taking every slot.
+    """
+    def __init__(self, job=None, slots=1, memory=0, licenses=None, priority=0, group=None):
+        super().__init__(job=job)
+        self.slots = slots
+        self.memory = memory
+        self.licenses = dict(licenses) if licenses else {}
+        self.priority = priority
+        self.group = group
+
+
+class SlotResource:
+    """ Granted compute resources.  Released by calling release(), or on exiting a 'with' block.
+    """
+    def __init__(self, mgr, request):
+        self.mgr = mgr
+        self.slots = request.slots
+        self.memory = request.memory
+        self.licenses = request.licenses
+        self.group = request.group
+        self.released = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.release()
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.mgr.delete_resource(self)
+
+
+class SlotManager(ResourceManager):
+    """ Limits the number of jobs (e.g., simulator processes) that run at once.
+
+    :param slots: Number of CPU slots.  Defaults to the number of CPUs.
+    :param memory: Memory budget, in whatever units the jobs request (None for no limit).
+    :param licenses: Dictionary of license feature names to the number of available tokens.
+
+        mgr = SlotManager(slots=16, memory=64e9, licenses={'hspice': 4})
+        with mgr.request(job, memory=2e9, licenses={'hspice': 1}):
+            subprocess.check_output(cmd)
+    """
+    log_name = "Slots"
+
+    def __init__(self, slots=None, memory=None, licenses=None, polling_time=1, log_file=None):
+        super().__init__(polling_time=polling_time, log_file=log_file)
+        # Don't keep the interpreter alive once the jobs are done
+        self.daemon = True
+
+        self.slots = slots if slots is not None else (os.cpu_count() or 1)
+        self.memory = memory
+        self.licenses = dict(licenses) if licenses else {}
+
+        self.slots_in_use = 0
+        self.memory_in_use = 0
+        self.licenses_in_use = {name: 0 for name in self.licenses}
+        self.group_usage = {}
+        self.group_grants = {}
+
+    def request(self, job, slots=1, memory=0, licenses=None, priority=0, group=None, timeout=None):
+        """Blocks until the requested resources are available, and returns a SlotResource."""
+        if slots > self.slots:
+            raise ValueError("Requested {} slots, but only {} exist".format(slots, self.slots))
+        if self.memory is not None and memory > self.memory:
+            raise ValueError("Requested {} memory, but the budget is {}".format(memory, self.memory))
+        for name, count in (licenses or {}).items():
+            if count > self.licenses.get(name, 0):
+                raise ValueError("Requested {} '{}' licenses, but only {} exist".format(
+                    count, name, self.licenses.get(name, 0)))
+
+        request = SlotRequest(job=job, slots=slots, memory=memory, licenses=licenses, priority=priority,
+                              group=group)
+        return self.enqueue_request(request, timeout=timeout)
+
+    def sort_pending(self):
+        """Orders pending requests by priority, then the number of requests granted to the group,
+        then arrival."""
+        self.pending.sort(key=lambda r: (-r.priority, self.group_grants.get(r.group, 0), r.submit_time))
+
+    def fits(self, request):
+        if self.slots_in_use + request.slots > self.slots:
+            return False
+        if self.memory is not None and self.memory_in_use + request.memory > self.memory:
+            return False
+        for name, count in request.licenses.items():
+            if self.licenses_in_use.get(name, 0) + count > self.licenses.get(name, 0):
+                return False
+        return True
+
+    def get_resource(self, request):
+        """Allocates the requested resources, or returns None if they are not available."""
+        if not self.fits(request):
+            return None
+
+        self.slots_in_use += request.slots
+        self.memory_in_use += request.memory
+        for name, count in request.licenses.items():
+            self.licenses_in_use[name] += count
+        self.group_usage[request.group] = self.group_usage.get(request.group, 0) + request.slots
+        self.group_grants[request.group] = self.group_grants.get(request.group, 0) + 1
+
+        resource = SlotResource(mgr=self, request=request)
+        self.resources.append(resource)
+        return resource
+
+    def delete_resource(self, resource):
+        with self.lock:
+            self.slots_in_use -= resource.slots
+            self.memory_in_use -= resource.memory
+            for name, count in resource.licenses.items():
+                self.licenses_in_use[name] -= count
+            self.group_usage[resource.group] -= resource.slots
+            if self.group_usage[resource.group] == 0:
+                del self.group_usage[resource.group]
+            super().delete_resource(resource)
+
+    def stats(self):
+        """Returns a dictionary of usage and wait time statistics."""
+        stats = super().stats()
+        stats.update({'slots_in_use': self.slots_in_use,
+                      'group_usage': dict(self.group_usage),
+                      'memory_in_use': self.memory_in_use,
+                      'licenses_in_use': dict(self.licenses_in_use),
+                      })
+        return stats
@@ -1,6 +1,11 @@
 from ..components import Component
 from ..resources.disk_resources import LocalDiskManager
+from ..resources.slot_resources import SlotManager
 from ..simulation.table import Table
+from .results import Results
+from .executors import create_executor, is_detached, run_detached
+from .sinks import open_sink
+from .measurement import evaluate_all, evaluate_batch
 from ..utilities import disk_utils
 
 import logging
@@ -9,10 +14,12 @@ import sys
 import os
 import glob
 import time
+import contextlib
+import collections
+import functools
 
 
 import concurrent
-from concurrent.futures import ThreadPoolExecutor
 
 class Status:
     def __init__(self, notes):
@@ -67,6 +74,46 @@ class BaseComponent(Component):
 
     num_threads = 100
 
+    # How variants are run:  'thread', 'process', 'pool', or a factory for a concurrent.futures.Executor.
+    # See siva.simulation.executors.
+    executor = 'thread'
+
+    # Number of workers for the 'process' and 'pool' executors.  Defaults to the number of CPUs.
+    num_workers = None
+
+    # Number of variants per worker that are created and submitted ahead of time.  None submits
+    # every variant at once.
+    window = 2
+
+    # Finished variants are cleaned up (see clean()) after final().  Only what their clean up needs is kept
+    # until then (See deferred_clean), not the variants.  If clean_early is set, they are cleaned up as soon
+    # as their results are recorded instead.  Only set it when measure_batch(), summarize() and final()
+    # don't need the variants' files.  (E.g., lazily loaded waveforms)
+    clean_early = False
+
+    # Limits on the simulator processes run at once, shared by the whole hierarchy.  (See SlotManager)
+    # max_slots defaults to the number of CPUs.  max_licenses is a dictionary of {feature: tokens}.
+    max_slots = None
+    max_memory = None
+    max_licenses = None
+
+    # Measurement records are buffered per worker thread and merged into the results table when
+    # the variants finish.  If set, the buffers are also merged every flush_interval seconds
+    # while the sweep runs, so partial results can be inspected.
+    flush_interval = None
+
+    # If set, the results table is written to this file as variants finish.  (HDF5, or a directory
+    # of Parquet files if it ends with '.parquet')  Relative paths are in the top level work directory, since work areas
+    # are cleared when they are allocated.  A sweep restarted with the same file skips the variants
+    # already saved.  If retain_results is False, rows are not kept in memory.
+    results_sink = None
+    retain_results = True
+
+    # If set, the results of every simulation in the hierarchy are written to a single
+    # database with this file name, in the root component's work area.  Each simulation
+    # variant gets its own group.
+    aggregate_results = None
+
     def __init__(self, parent=None, children=None, name=None, params=None, measurements=None, work_dir=None,
                  log_file=None, disk_mgr=None, parallel=False, log_severity=logging.INFO, is_variant=False):
 
@@ -102,6 +149,7 @@ class BaseComponent(Component):
         self.log_severity = log_severity
 
         self._disk_mgr = disk_mgr
+        self._slot_mgr = None
 
         self.parallel = parallel
         self.status = Uninitialized
@@ -116,6 +164,18 @@ class BaseComponent(Component):
 
         self.is_variant = is_variant
 
+        self._results_archive = None
+
+        # The measurement record from the last run
+        self.record = None
+
+        # True when running in a worker process, apart from the master
+        self._detached = False
+
+        # Per-thread buffers of (row, record) pairs, while variants are running.  (See buffer_record)
+        self._result_buffers = None
+        self._local = threading.local()
+
     @property
     def disk_mgr(self):
         if self is not self.root:
@@ -133,52 +193,151 @@ class BaseComponent(Component):
         if self is self.root:
             self._disk_mgr = value
 
+    @property
+    def slot_mgr(self):
+        """The SlotManager that limits the number of simulators running at once."""
+        root = self.root
+        if self is not root:
+            return root.slot_mgr
+
+        if self._detached:
+            # The number of workers limits detached variants
+            return None
+
+        with self.lock:
+            if self._slot_mgr is None:
+                self._slot_mgr = SlotManager(slots=self.max_slots, memory=self.max_memory,
+                                             licenses=self.max_licenses)
+                self._slot_mgr.start()
+        return self._slot_mgr
+
+    @slot_mgr.setter
+    def slot_mgr(self, value):
+        if self is self.root:
+            self._slot_mgr = value
+
+    def request_slot(self, slots=1, memory=0, licenses=None, priority=0):
+        """ Blocks until the root's SlotManager grants the requested resources.  Returns a context
+        manager that releases them.
+
+        Requests are shared fairly between the iterations of the outermost loop.
+        """
+        mgr = self.slot_mgr
+        if mgr is None:
+            return contextlib.nullcontext()
+
+        group = None
+        for comp in self.path_components:
+            if getattr(comp, 'is_variant', False):
+                group = comp.path
+                break
+        return mgr.request(job=self, slots=slots, memory=memory, licenses=licenses, priority=priority,
+                           group=group)
+
     def start(self, wait=True):
         """ Starts this component's portion of the analysis.
         """
         # Initialize:  Get disk space, logs, etc.
         self.initialize()
+        saved = self.open_results_sink()
 
         # This component may spawn several variants of itself to run in their own threads.  (E.g., loop iterations).
-        # These lists will keep track of them.
-        self.variants = []
-        self.futures = []  # http://en.wikipedia.org/wiki/Futures_and_promises
+        # Only a window of them is in progress at once, so large sweeps aren't all held in memory.
+        pending = set()  # Futures of the variants in progress.  http://en.wikipedia.org/wiki/Futures_and_promises
+        finished = []  # (path, deferred_clean()) of the variants to clean up after final()
+        errors = []  # Exceptions of the variants that failed
+
+        # Variants buffer their records until flush_results() is called
+        self._local = threading.local()
+        self._result_buffers = []
+        last_flush = time.time()
 
         if self.parallel is False:
-            num_threads = 1
+            num_workers = 1
+        elif self.executor == 'thread':
+            num_workers = self.num_threads
         else:
-            num_threads = self.num_threads
+            num_workers = self.num_workers or os.cpu_count()
+        window = self.window*num_workers if self.window is not None and wait else None
 
-        with ThreadPoolExecutor(max_workers=num_threads) as pool:
-            for index, variant in enumerate(self):
-                self.variants.append(variant)
-
-                #TODO:  These two attributes should be set during the __next__ method call
-                # Make sure variant knows who the master is, so they can report
-                # results to the same location
-                variant.master = self
-
-                # The variant should also know its index, so it
-                # can add its results to the correct row in the results table
-                variant.index = index
-
-                # Submit the job
-                future = pool.submit(variant.run)
-                future.job = variant
-                self.futures.append(future)
-
-            # Wait for all scheduled jobs to complete
+        with create_executor(self.executor, num_workers) as pool:
+            detached = is_detached(pool)
+            variants = iter(self)
+            exhausted = False
             num_complete = 0
-            if wait:
-                for future in concurrent.futures.as_completed(self.futures):
+            while True:
+                # Submit variants until the window is full.  Each variant knows its master and index
+                # (set by __next__), so it can add its results to the correct row of the master's results table.
+                barrier = False
+                while not exhausted and (window is None or len(pending) < window):
+                    try:
+                        variant = next(variants)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    if variant is None:
+                        # The next variants depend on the results of the ones in progress
+                        barrier = True
+                        break
+                    if variant.index in saved:
+                        continue
+
+                    if detached:
+                        # Allocate the work area here, where the disk manager lives
+                        variant.setup_work_area()
+                        future = pool.submit(run_detached, variant)
+                    else:
+                        future = pool.submit(variant.run)
+                    future.job = variant
+                    pending.add(future)
+
+                if exhausted and (not wait or not pending):
+                    break
+
+                # Wait for a variant to finish, or all of them at a barrier
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.ALL_COMPLETED if barrier else concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    variant = future.job
                     num_complete += 1
-                    self.info("Job {}/{} finished. ({})".format(num_complete, len(self.futures), self.path))
+                    self.info("Job {} finished. ({})".format(num_complete, self.path))
                     if future.exception() is not None:
-                        msg = future.result()
+                        msg = future.exception()
                         self.error("Problem running job: {}".format(msg))
-                        future.job.status = Error(msg)
-                    else:
-                        self.info("Job {} completed".format(future.job.path))
+                        variant.status = Error(msg)
+                        errors.append(msg)
+                        continue
+
+                    if detached:
+                        self.add_record(*future.result(), variant=variant)
+                    self.variant_finished(variant)
+                    self.info("Job {} completed".format(variant.path))
+
+                    if not isinstance(variant.status, Error) and variant is not self:
+                        if self.clean_early:
+                            self.info("Cleaning up {}".format(variant.path))
+                            variant.clean()
+                        else:
+                            finished.append((variant.path, variant.deferred_clean()))
+
+                if barrier or (self.flush_interval is not None and time.time() - last_flush >= self.flush_interval):
+                    self.flush_results()
+                    self.results.flush()
+                    last_flush = time.time()
+
+        # Merge the buffered records into the results table
+        self.flush_results()
+        if wait:
+            self._result_buffers = None
+            self.results.close()
+
+        # The rows of the variants that finished are saved.  Report the ones that failed to the parent.
+        if errors:
+            raise ExecutionError("{} of {} jobs failed: {}.  First error: {}".format(
+                len(errors), num_complete, self.path, errors[0])) from errors[0]
+
+        if wait:
+            self.measure_batch()
 
         # Once all the variants finish running, collect and summarize the results
         self.info("Creating summary: {}".format(self.path))
@@ -187,13 +346,9 @@ class BaseComponent(Component):
         # Final clean up
         if wait and self.status is not Error:
             self.final()
-            for variant in self.variants:
-                if variant.status is not Error and variant is not self:
-                    self.info("Cleaning up {}".format(variant.path))
-                    variant.clean()
-
-        del self.variants
-        del self.futures
+            for path, clean in finished:
+                self.info("Cleaning up {}".format(path))
+                clean()
 
     def run(self):
         """Called by a thread's start() method.
@@ -237,10 +392,24 @@ class BaseComponent(Component):
                 with self.lock:
                     self.master.results = Table()
 
+                if self.aggregate_results and self._work_dir is not None and self._results_archive is None:
+                    path = os.path.join(self._work_dir, self.aggregate_results)
+                    self._results_archive = Results(path, 'w')
+                    self.info("Aggregating results in {}".format(path))
+
         self.status = Initialized
 
     def setup_work_area(self):
 
+        if self._detached:
+            # The work area was allocated by the master before this variant was sent to a worker
+            return
+        elif self.root._detached:
+            # Inside a detached variant, there is no disk manager.  Children get sub directories.
+            self._work_dir = os.path.join(self.parent._work_dir, self.inst_name)
+            os.makedirs(self._work_dir, exist_ok=True)
+            return
+
         # Create work area.
         root = self.root
         disk_mgr = root.disk_mgr
@@ -293,9 +462,9 @@ class BaseComponent(Component):
     def measure(self):
         self.info("{} ({}): Evaluating measurements".format(self.inst_name, id(self)))
 
-        # Evaluate all measurement statements
-        for m in self.measurements.values():
-            m.evaluate(self.hierarchy_namespace)
+        # Evaluate all measurement statements.  Batch measurements are evaluated by the master.
+        measurements = [m for m in self.measurements.values() if not m.batch]
+        evaluate_all(measurements, self.scope())
 
         # Now record input variables and measurement values
         # into the results table
@@ -303,20 +472,108 @@ class BaseComponent(Component):
         record.update(self.hierarchy_params)
 
         # As well as the measured values
-        for m in self.measurements.values():
+        for m in measurements:
             record[m.name] = m.value
 
-        # Add it to the master's results table
-        self.debug("  About to add results: {}".format(self.path))
-        with self.lock:
-            self.master.results.add_row(record, row=self.index)
-            self.debug("  Results added.")
+        # Add it to the master's results.  Detached variants send the
+        # record back to the master instead.
+        self.record = record
+        if not self._detached:
+            self.master.buffer_record(record, row=self.index)
         self.status = Measured
 
+    def measure_batch(self):
+        """ Evaluates the batch measurements once, over the whole results table, after all the
+        variants have finished.  (See siva.simulation.measurement.evaluate_batch)
+
+        The values are only kept in memory:  they are not written to the results sink.
+        """
+        batch = [m for m in self.measurements.values() if m.batch]
+        if not batch or self.results.is_empty:
+            return
+        if not self.results.retain:
+            self.warn("{}: Results are not retained.  Skipping batch measurements.".format(self.path))
+            return
+        self.info("{}: Evaluating {} batch measurements".format(self.path, len(batch)))
+        for m in batch:
+            evaluate_batch(m, self.results)
+
+    def add_record(self, record, status, variant):
+        """Adds the measurement record of a variant that was run in another process."""
+        variant.record = record
+        variant.status = status
+        self.buffer_record(record, row=variant.index)
+
+    def buffer_record(self, record, row):
+        """ Saves a variant's measurement record until the next flush_results().
+
+        Each worker thread appends to its own buffer, so variants don't contend for the
+        results table.  Outside of start(), the record is added to the table directly.
+        """
+        buffers = self._result_buffers
+        if buffers is None:
+            with self.lock:
+                self.results.add_row(record, row=row)
+            return
+
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = self._local.buffer = collections.deque()
+            with self.lock:
+                buffers.append(buffer)
+        buffer.append((row, record))
+
+    def variant_finished(self, variant):
+        """Called by start() as each variant finishes successfully."""
+        pass
+
+    def persistent_path(self, file_name):
+        """ Returns the path of a file that is kept between runs.  Relative paths are in the top level
+        work directory, since work areas are cleared when they are allocated.
+        """
+        disk_mgr = self.root.disk_mgr
+        work_dir = disk_mgr.root if disk_mgr is not None else self._work_dir
+        return os.path.join(work_dir or ".", file_name)
+
+    def open_results_sink(self):
+        """ Attaches the results_sink file to the results table.  Returns the rows it already holds.
+        """
+        if self.results_sink is None or self.results.sink is not None:
+            return set()
+        path = self.persistent_path(self.results_sink)
+        self.results.attach(open_sink(path), retain=self.retain_results)
+
+        saved = set(self.results.sink.rows().tolist())
+        if saved:
+            self.info("Resuming from {}:  {} results already saved".format(path, len(saved)))
+        return saved
+
+    def flush_results(self):
+        """Merges the buffered measurement records into the results table."""
+        if not self._result_buffers:
+            return
+        rows = []
+        records = []
+        with self.lock:
+            for buffer in self._result_buffers:
+                while True:
+                    try:
+                        row, record = buffer.popleft()
+                    except IndexError:
+                        break
+                    rows.append(row)
+                    records.append(record)
+            if records:
+                self.debug("  Adding {} results: {}".format(len(records), self.path))
+                self.results.add_rows(records, rows=rows)
+
     def final(self):
         self.status = Finalized
 
         self.results.close()
+        if self._results_archive is not None:
+            self._results_archive.close()
+            self._results_archive = None
         self.info("{}: Done.".format(self.path))
         self.close_logging()
 
@@ -328,29 +585,22 @@ class BaseComponent(Component):
 
     def clean(self):
         """Clean up work area and file handles.  This is called by the parent after
-        the final() method has been called.
+        the final() method has been called, or as soon as this variant finishes if the
+        parent's clean_early is set.
         """
         self.info("Cleaning up: {}".format(self.path))
         if self.status is Error:
             return
+        remove_work_area(self._work_dir, self._work_dir_resource)
 
-        # Remove all files from the work directory
-        if self._work_dir:
-            files = glob.glob(self._work_dir + "/*")
-            i = 0
-            for file in files:
-                try:
-                    if os.path.exists(file):
-                        disk_utils.remove(file, num_tries=3)
-                except PermissionError as e:
-                    raise
-
-        # This should delete the directory and release the resource
-        if self._work_dir_resource:
-            try:
-                self._work_dir_resource.clean()
-            except:
-                raise
+    def deferred_clean(self):
+        """ Returns a function that does the work of clean() later.  The parent keeps it until after final(),
+        instead of the finished variant.  Subclasses that override clean() should override this too, keeping
+        only what clean() needs.  Otherwise, the variant is kept.
+        """
+        if type(self).clean is not BaseComponent.clean:
+            return self.clean
+        return functools.partial(remove_work_area, self._work_dir, self._work_dir_resource)
 
     def clean_temp_files(self):
         """ Removes temporary/scratch files from work area, leaving only final results.
@@ -373,6 +623,8 @@ class BaseComponent(Component):
         if self._i > 0:
             raise StopIteration
         self._i += 1
+        self.master = self
+        self.index = 0
 
         #return self.clone()
         return self
@@ -382,6 +634,51 @@ class BaseComponent(Component):
         clone.master = master
         return clone
 
+    def __getstate__(self):
+        """ Variants are pickled when they are sent to worker processes.  Locks, loggers, and
+        resource managers stay with the master.
+        """
+        state = self.__dict__.copy()
+        for name in ('lock', 'logger', '_disk_mgr', '_slot_mgr', '_work_dir_resource', '_master', '_results_archive',
+                     '_iterators', '_result_buffers', '_local'):
+            state.pop(name, None)
+        return state
+
+    def init_variant(self):
+        """Lightweight variants get their own work area, files, results table, and iteration state.
+        (See Component.variant)
+        """
+        self.lock = threading.RLock()
+        self._results = Table()
+        for name in ('_i', '_iterators', '_samples', '_completed'):
+            # Set by __iter__()
+            self.__dict__.pop(name, None)
+        self._work_dir = None
+        self._work_dir_resource = None
+        self._disk_mgr = None
+        self._slot_mgr = None
+        self._master = None
+        self._results_archive = None
+        self._files = []
+        self._detached = False
+        self._result_buffers = None
+        self._local = threading.local()
+        self.record = None
+        self.index = None
+        self.status = Uninitialized
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
+        self.logger = None
+        self._disk_mgr = None
+        self._slot_mgr = None
+        self._work_dir_resource = None
+        self._master = None
+        self._results_archive = None
+        self._result_buffers = None
+        self._local = threading.local()
+
     @property
     def master(self):
         if self._master is None:
@@ -393,6 +690,11 @@ class BaseComponent(Component):
     def master(self, value):
         self._master = value
 
+    @property
+    def results_archive(self):
+        """The aggregate Results database of the root component, or None."""
+        return self.root._results_archive
+
     @property
     def editor(self):
         pass
@@ -469,4 +771,17 @@ class Root(BaseComponent):
     """ The root component for any analysis.  Contains resource managers, final results table.
     """
 
-    pass
\ No newline at end of file
+    pass
+
+
+def remove_work_area(work_dir, work_dir_resource):
+    """Removes the files in *work_dir*, and releases its disk resource.  (See BaseComponent.clean)"""
+    # Remove all files from the work directory
+    if work_dir:
+        for file in glob.glob(work_dir + "/*"):
+            if os.path.exists(file):
+                disk_utils.remove(file, num_tries=3)
+
+    # This should delete the directory and release the resource
+    if work_dir_resource:
+        work_dir_resource.clean()
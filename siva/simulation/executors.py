@@ -0,0 +1,207 @@
+"""
+Executors used by BaseComponent.start() to run a component's variants.
+
+    thread   -- A ThreadPoolExecutor.  Variants share memory with their master.  (Default)
+    process  -- A ProcessPoolExecutor.  Each variant is pickled, run in a worker process,
+                and its measurement record is sent back to the master.
+    pool     -- A WorkerPoolExecutor.  Like 'process', but jobs are handed to workers over
+                a socket, so workers can also be started on other hosts.
+
+Any callable that accepts a *max_workers* keyword and returns a concurrent.futures.Executor
+can also be used.
+
+Variants run by the 'process' and 'pool' executors are "detached":  they do not share
+a results table, logger, or disk manager with their master.  Their classes must be
+importable by the worker (i.e., defined at module level).
+"""
+import os
+import queue
+import threading
+import multiprocessing
+from multiprocessing.connection import Listener, Client
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor
+
+
+def run_detached(variant):
+    """ Runs a pickled variant in a worker.
+
+    Returns the variant's measurement record and final status, which the master adds to its own
+    results table.
+    """
+    variant._detached = True
+    try:
+        variant.run()
+    finally:
+        if variant._results_archive is not None:
+            variant._results_archive.close()
+        variant.close_logging()
+    return variant.record, variant.status
+
+
+class WorkerPoolExecutor(Executor):
+    """ An executor that hands jobs to worker processes over a socket.
+
+    *max_workers* local worker processes are started when the executor is created.  Workers on
+    other hosts can join by calling serve() with the executor's address and authkey:
+
+        pool = WorkerPoolExecutor(max_workers=4, address=('', 6000), authkey=b'secret')
+
+        # On another host
+        python -c "from siva.simulation.executors import serve; serve(('master', 6000), b'secret')"
+
+    Jobs are queued, and each connected worker pulls the next job as soon as it finishes the last one.
+    """
+    def __init__(self, max_workers=None, address=('localhost', 0), authkey=None):
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        if authkey is None:
+            authkey = multiprocessing.current_process().authkey
+
+        self.max_workers = max_workers
+        self.authkey = authkey
+        self._listener = Listener(address, authkey=authkey)
+        self.address = self._listener.address
+
+        self._jobs = queue.Queue()
+        self._shutdown = False
+        self._closed = False
+        self._threads = []
+
+        self._accept_thread = threading.Thread(target=self._accept, daemon=True)
+        self._accept_thread.start()
+
+        self._processes = []
+        for i in range(max_workers):
+            p = multiprocessing.Process(target=serve, args=(self.address, authkey), daemon=True)
+            p.start()
+            self._processes.append(p)
+
+    def submit(self, fn, *args, **kwargs):
+        if self._shutdown:
+            raise RuntimeError("Cannot submit jobs after shutdown")
+        future = Future()
+        self._jobs.put((future, fn, args, kwargs))
+        return future
+
+    def shutdown(self, wait=True):
+        if self._shutdown:
+            return
+        self._shutdown = True
+
+        # A single sentinel is passed from worker to worker, after the queued jobs
+        self._jobs.put(None)
+        if wait:
+            self._close()
+        else:
+            threading.Thread(target=self._close, daemon=True).start()
+
+    def _close(self):
+        # Workers that connect after shutdown are still accepted, and are sent the sentinel.  (Otherwise
+        # they would wait in Client() forever.)  The listener is closed once every local worker has exited.
+        for p in self._processes:
+            p.join()
+        for thread in list(self._threads):
+            thread.join()
+        self._closed = True
+        self._listener.close()
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError):
+                # Listener closed, or a client failed to authenticate
+                if self._closed:
+                    break
+                continue
+            thread = threading.Thread(target=self._dispatch, args=(conn,), daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _dispatch(self, conn):
+        """Feeds jobs to a single worker connection."""
+        with conn:
+            while True:
+                item = self._jobs.get()
+                if item is None:
+                    self._jobs.put(None)
+                    conn.send(None)
+                    return
+
+                future, fn, args, kwargs = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                try:
+                    conn.send((fn, args, kwargs))
+                except (OSError, EOFError) as e:
+                    future.set_exception(RuntimeError("Lost connection to worker: {}".format(e)))
+                    return
+                except Exception as e:
+                    # The job can't be pickled.  Nothing was sent, so the worker can take the next one.
+                    future.set_exception(e)
+                    continue
+
+                try:
+                    ok, value = conn.recv()
+                except (OSError, EOFError) as e:
+                    future.set_exception(RuntimeError("Lost connection to worker: {}".format(e)))
+                    return
+
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+
+def serve(address, authkey=None):
+    """ Worker loop for WorkerPoolExecutor.  Connects to the executor at *address* and runs
+    jobs until the executor shuts down.
+    """
+    if authkey is None:
+        authkey = multiprocessing.current_process().authkey
+
+    with Client(address, authkey=authkey) as conn:
+        while True:
+            try:
+                job = conn.recv()
+            except EOFError:
+                break
+            if job is None:
+                break
+
+            fn, args, kwargs = job
+            try:
+                result = (True, fn(*args, **kwargs))
+            except Exception as e:
+                result = (False, e)
+            try:
+                conn.send(result)
+            except (OSError, EOFError):
+                raise
+            except Exception as e:
+                # The result (or exception) can't be pickled
+                conn.send((False, RuntimeError("Could not return the result of {}: {}".format(fn, e))))
+
+
+EXECUTORS = {'thread': ThreadPoolExecutor,
+             'process': ProcessPoolExecutor,
+             'pool': WorkerPoolExecutor,
+             }
+
+
+def create_executor(kind, max_workers):
+    """ Creates an executor from a name in EXECUTORS, or from a factory callable.
+    """
+    if callable(kind):
+        return kind(max_workers=max_workers)
+    try:
+        cls = EXECUTORS[kind]
+    except KeyError:
+        raise ValueError("Unknown executor '{}'.  Must be one of: {}".format(kind, ", ".join(EXECUTORS)))
+    return cls(max_workers=max_workers)
+
+
+def is_detached(executor):
+    """True if jobs submitted to *executor* run outside of this process."""
+    return getattr(executor, 'detached', not isinstance(executor, ThreadPoolExecutor))
@@ -1,9 +1,14 @@
 
+import os
 import numpy as np
 import itertools
 import collections
+import hashlib
+import numbers
+import json
 
 from .base_component import BaseComponent, Running
+from . import sampling
 from ..components.parameter import Parameter
 #from .variable import Variable
 from ..components.parameter import Parameter
@@ -38,13 +43,18 @@ class LoopVariable(Parameter):
                 if space == "linear":
                     values = np.linspace(start, stop, n, endpoint)
                 elif space == "log":
-                    values = np.logpace(start, stop, n, endpoint)
+                    values = np.logspace(start, stop, n, endpoint)
 
         self.name = name
         self.start = start
         self.stop = stop
         self.n = n
         self.values = values
+        self.space = space
+
+        # Variables defined by a range can take any value in it when sampled.  Otherwise,
+        # only the listed values are used.
+        self.continuous = start is not None and stop is not None
         self.parent = None
         self.reset()
 
@@ -82,6 +92,28 @@ class LoopVariable(Parameter):
     def __len__(self):
         return self.n
 
+    def sample(self, u):
+        """ Returns the value at *u*, a coordinate between 0 and 1.  Continuous variables are interpolated
+        between their first and last values;  otherwise the values are divided into equal bins.
+        """
+        first, last = self.values[0], self.values[-1]
+        if self.continuous and self.space == "log":
+            return float(first*(last/first)**u)
+        elif self.continuous:
+            return float(first + u*(last - first))
+        return self.values[min(int(u*self.n), self.n - 1)]
+
+    def unit(self, i):
+        """Returns the coordinate of the i'th value.  The inverse of sample()."""
+        if not self.continuous:
+            return (i + .5)/self.n
+        first, last, value = self.values[0], self.values[-1], self.values[i]
+        if first == last:
+            return 0.
+        if self.space == "log":
+            return float(np.log(value/first)/np.log(last/first))
+        return float((value - first)/(last - first))
+
     def reset(self):
         self.i = -1
 
@@ -89,6 +121,31 @@ class LoopVariable(Parameter):
         self._value = value
 
 class LoopComponent(BaseComponent):
+
+    # If set, each finished iteration is recorded in this file (JSON lines), along with a fingerprint of the
+    # loop variables.  When the sweep is restarted with the same loop variables, the recorded iterations are
+    # not run again;  their records are added to the results table instead.  Relative paths are in the top
+    # level work directory.  (See BaseComponent.persistent_path)  The copies of a nested loop each get their
+    # own file, named after their path.  (See checkpoint_path)
+    checkpoint = None
+
+    # How the loop variables are sampled.  (See siva.simulation.sampling)  'grid' runs every combination
+    # of their values.  'random', 'lhs', and 'sobol' run num_samples points, drawn with the given seed.
+    sampling = 'grid'
+    num_samples = None
+    seed = None
+
+    # Adaptive refinement.  If set to (measurement name, limit), then after the samples have been run,
+    # new samples are added between neighbors on opposite sides of the limit, refine_samples at a time
+    # (by default, as many as were first run), for refine_rounds rounds.
+    refine = None
+    refine_rounds = 3
+    refine_samples = None
+
+    # If True, iterations are lightweight variants of the loop, which share its parameters and
+    # children until they are changed.  (See Component.variant)
+    lightweight_variants = False
+
     def __init__(self, parent=None, vars=None, children=None, name=None, measurements=None, parallel=True, **kwargs):
 
         if isinstance(vars, LoopVariable):
@@ -98,23 +155,79 @@ class LoopComponent(BaseComponent):
                          parallel=parallel, **kwargs)
 
     def __len__(self):
-        return np.product([len(var) for var in self.loop_vars.values()])
+        """The number of iterations, not counting refinement."""
+        if self.sampling == 'grid':
+            return int(np.prod([len(var) for var in self.loop_vars.values()]))
+        return self.num_samples
 
     def __iter__(self):
         self.debug("{}: Loop __iter__".format(self.inst_name))
-        self._iterators = itertools.product(*self.loop_vars.values())
+        self._iterators = self.points()
         self._i = 0
+        self._samples = []
+        self._completed = self.load_checkpoint()
         return self
 
+    def points(self):
+        """ Generates the values of the loop variables for each iteration, along with their coordinates in
+        the unit hypercube.  Yields None when the next points depend on the results so far.
+        """
+        loop_vars = list(self.loop_vars.values())
+        if self.sampling == 'grid':
+            for i in itertools.product(*[range(len(var)) for var in loop_vars]):
+                yield ([var.values[n] for var, n in zip(loop_vars, i)],
+                       [var.unit(n) for var, n in zip(loop_vars, i)])
+            num_samples = len(self)
+        else:
+            if self.num_samples is None:
+                raise ValueError("{}: num_samples is required for '{}' sampling".format(self.path, self.sampling))
+            num_samples = self.num_samples
+            for u in sampling.unit_samples(self.sampling, self.num_samples, len(loop_vars), seed=self.seed):
+                yield [var.sample(x) for var, x in zip(loop_vars, u)], list(u)
+
+        if self.refine is None:
+            return
+        name, limit = self.refine
+        for i in range(self.refine_rounds):
+            # Wait for the results so far
+            yield None
+            column = self.results.columns.get(name)
+            if column is None:
+                return
+            values = np.full(len(self._samples), np.nan)
+            measured = column.values[:len(self._samples)]
+            values[:len(measured)] = np.where(column.valid[:len(measured)], measured, np.nan)
+
+            new = sampling.refine(self._samples, values, limit, n=self.refine_samples or num_samples)
+            self.info("{}: Refinement {} adds {} samples".format(self.path, i + 1, len(new)))
+            if len(new) == 0:
+                return
+            for u in new:
+                yield [var.sample(x) for var, x in zip(loop_vars, u)], list(u)
+
     def __next__(self):
-        values = self._iterators.__next__()
-        self._i += 1
+        while True:
+            point = self._iterators.__next__()
+            if point is None:
+                return None
+            values, u = point
+            self._samples.append(u)
+            self._i += 1
+
+            # Skip iterations finished by a previous run
+            if self._i - 1 not in self._completed:
+                break
+            self.buffer_record(self._completed[self._i - 1], row=self._i - 1)
 
         self.debug("{}: Loop __next__ ({})".format(self.inst_name, self._i,))
 
         var_vals = list(zip([v.name for v in self.loop_vars.values()], values))
         inst_name = self.name + "_" + str(self._i)
-        loop_iteration = self.clone(inst_name=inst_name, master=self, is_variant=True)
+        if self.lightweight_variants:
+            loop_iteration = self.variant(inst_name=inst_name, master=self, is_variant=True)
+        else:
+            loop_iteration = self.clone(inst_name=inst_name, master=self, is_variant=True)
+        loop_iteration.index = self._i - 1
 
         # TODO:  Can we do this using descriptors?
         for var, val in var_vals:
@@ -123,6 +236,78 @@ class LoopComponent(BaseComponent):
                 self.root.logger.debug("{}:    {} -> {}".format(self.inst_name, var, loop_iteration.params[var].value))
         return loop_iteration
 
+    def fingerprint(self):
+        """ Identifies the sweep:  A hash of the names, targets, and values of the loop variables, and
+        how they are sampled.  (Random samples can only be resumed if a seed is given.)  A nested loop's
+        sweep also depends on the values of the enclosing loops' variables in this iteration.
+        """
+        sweep = [[var.name, var.target, [json_value(v) for v in var.values]] for var in self.loop_vars.values()]
+        if self.sampling != 'grid':
+            sweep.append([self.sampling, self.num_samples, self.seed])
+        if self.refine is not None:
+            sweep.append([list(self.refine), self.refine_rounds, self.refine_samples])
+
+        parent = self.parent
+        while parent is not None:
+            if isinstance(parent, LoopComponent):
+                sweep.append([[name, json_value(parent.params[name].value)] for name in parent.loop_vars])
+            parent = parent.parent
+        return hashlib.sha256(json.dumps(sweep).encode('utf-8')).hexdigest()
+
+    def checkpoint_path(self):
+        """ Returns the path of the checkpoint file.  A nested loop is run once per iteration of the loops
+        above it, so its path is added to the file name.  E.g., 'ck.jsonl' becomes 'ck.Outer_1.Inner.jsonl'
+        """
+        file_name = self.checkpoint
+        if self.parent is not None:
+            base, ext = os.path.splitext(file_name)
+            file_name = "{}.{}{}".format(base, self.path, ext)
+        return self.persistent_path(file_name)
+
+    def load_checkpoint(self):
+        """ Returns the records of the iterations in the checkpoint file, keyed by index.  Starts
+        a new file if there is none, or if it was written by a different sweep or loop.
+        """
+        if self.checkpoint is None:
+            return {}
+
+        path = self.checkpoint_path()
+        fingerprint = self.fingerprint()
+        completed = {}
+        try:
+            with open(path) as fp:
+                header = json.loads(fp.readline())
+                if header.get('fingerprint') == fingerprint and header.get('path') == self.path:
+                    for line in fp:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            # The last line is incomplete if the run was killed while writing it
+                            continue
+                        completed[entry['index']] = entry['record']
+                else:
+                    self.info("{}: {} is from a different sweep or loop.  Starting over.".format(self.path, path))
+                    header = None
+        except (OSError, ValueError):
+            header = None
+
+        if header is None:
+            with open(path, 'w') as fp:
+                fp.write(json.dumps({'fingerprint': fingerprint, 'path': self.path}) + "\n")
+        elif completed:
+            self.info("{}: Resuming.  {} iterations already finished".format(self.path, len(completed)))
+        return completed
+
+    def variant_finished(self, variant):
+        """Adds a finished iteration to the checkpoint file."""
+        if self.checkpoint is None or variant.record is None:
+            return
+        params = collections.OrderedDict((name, json_value(variant.params[name].value)) for name in self.loop_vars)
+        record = collections.OrderedDict((k, json_value(v)) for k, v in variant.record.items())
+        entry = json.dumps({'index': variant.index, 'params': params, 'record': record})
+        with open(self.checkpoint_path(), 'a') as fp:
+            fp.write(entry + "\n")
+
     # BaseComponent interface
     def reset(self):
         """
@@ -132,11 +317,18 @@ class LoopComponent(BaseComponent):
 
     def execute(self):
         self.status = Running
+        namespace = self.scope()
         for param in self.params.values():
             self.debug("{}: Setting {} to {}".format(self.inst_name, param.name, param.value))
-            param.eval(globals(), self.hierarchy_namespace)
-
-
-
-
-
+            param.eval(globals(), namespace)
+
+
+def json_value(value):
+    """Converts a value to one that can be saved as JSON.  Values that can't be (E.g., waveforms) are None."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or isinstance(value, (str, bool, numbers.Integral)):
+        return value
+    if isinstance(value, numbers.Real):
+        return float(value)
+    return None
@@ -1,13 +1,28 @@
 import collections
+import functools
+from collections.abc import Mapping
+
+import numpy as np
+
 from ..components.registered import Registered
+from ..components.expressions import compile_expression
+from ..waveforms.wave import Wave
+from ..waveforms.stack import WaveStack
 
 class Measurement(Registered):
+    """ An expression evaluated after each simulation, whose value is added to the results table.
+
+    Batch measurements are evaluated once, for every row of the master's results table, after all
+    the variants have finished.  Their expressions refer to the table's columns by name.  (See
+    evaluate_batch)
+    """
     registry_name = "measurements"
 
-    def __init__(self, expr, name=None, spec=None):
+    def __init__(self, expr, name=None, spec=None, batch=False):
         self.name = name
         self.expr = expr
         self.spec = spec
+        self.batch = batch
         self.value = None
 
     def _store(self, class_dct, registry_name):
@@ -24,8 +39,115 @@ class Measurement(Registered):
 
     def evaluate(self, namespace):
         try:
-            self.value = eval(self.expr, globals(), namespace)
+            self.value = eval(compile_expression(self.expr), globals(), namespace)
         except Exception as e:
             self.value = e.args
             raise
         return self.value
+
+
+@functools.lru_cache(maxsize=None)
+def compile_measurements(exprs):
+    """Compiles a tuple of measurement expressions into one code object that evaluates all of them."""
+    return compile_expression("({},)".format(", ".join("({})".format(expr) for expr in exprs)))
+
+
+def evaluate_all(measurements, namespace):
+    """ Evaluates a list of measurements with a single call to eval().  If any of them fail, they are
+    evaluated one at a time, so the failing measurement raises its exception.
+    """
+    if not measurements:
+        return
+    try:
+        values = eval(compile_measurements(tuple(m.expr for m in measurements)), globals(), namespace)
+    except Exception:
+        for m in measurements:
+            m.evaluate(namespace)
+        return
+    for m, value in zip(measurements, values):
+        m.value = value
+
+
+class ColumnNamespace(Mapping):
+    """ The columns of a results table, as arrays with one value per row.
+
+    Numeric columns are arrays (missing values are NaN).  Columns of waveforms that share their x
+    values are WaveStacks.  Other columns are object arrays.
+    """
+    def __init__(self, table):
+        self.table = table
+        self._values = {}
+
+    def __getitem__(self, name):
+        if name not in self._values:
+            if name not in self.table.columns:
+                raise KeyError(name)
+            self._values[name] = self.stack(self.table.columns[name])
+        return self._values[name]
+
+    @staticmethod
+    def stack(column):
+        if column.dtype.kind != 'O':
+            return column.values
+        values = column.tolist()
+        if values and all(isinstance(v, Wave) for v in values):
+            stack = WaveStack.from_waves(values)
+            if stack is not None:
+                return stack
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+
+    def __iter__(self):
+        return iter(self.table.columns)
+
+    def __len__(self):
+        return len(self.table.columns)
+
+
+def batch_values(value, n):
+    """ Splits the value of a batch measurement into one value per row, or returns None if it can't be.
+
+    Scalars are repeated.  For arrays, the last axis is the row.
+    """
+    if isinstance(value, WaveStack):
+        return list(value) if len(value) == n else None
+    if isinstance(value, (str, bytes)):
+        return [value]*n
+    array = np.asarray(value)
+    if array.dtype.kind not in 'biufc':
+        return None
+    if array.ndim == 0:
+        return np.full(n, array)
+    if array.shape[-1] != n:
+        return None
+    if array.ndim == 1:
+        return array
+    return [array[..., i] for i in range(n)]
+
+
+def evaluate_batch(measurement, table):
+    """ Evaluates a batch measurement for every row of a results table with one call to eval(), and
+    stores the values in the table's *measurement.name* column.
+
+    If the expression can't be evaluated on the whole columns (E.g., the waveforms of the rows have
+    different x values, or the expression isn't vectorized), it is evaluated for one row at a time,
+    with that row's values.  Rows that fail are left empty.
+    """
+    n = table.num_rows
+    code = compile_expression(measurement.expr)
+    try:
+        values = batch_values(eval(code, globals(), ColumnNamespace(table)), n)
+    except Exception:
+        values = None
+
+    if values is None:
+        values = []
+        for row in range(n):
+            try:
+                values.append(eval(code, globals(), table.get_row(row)))
+            except Exception:
+                values.append(None)
+    measurement.value = values
+    table.set_column(measurement.name, values)
+    return values
@@ -2,10 +2,67 @@
 
 import sys
 import os
+import hashlib
+import threading
 import h5py
 import numpy as np
 
-from ..waveforms import Wave, Diff
+from ..waveforms import Wave, Diff, LazyWave
+
+
+class StorageProfile:
+    """ Describes the on-disk layout of the vectors and waveforms in a Results database.
+
+    :param chunks: Number of points per chunk.  Waveforms are read from disk one chunk at a time,
+        so this should be on the order of the smallest time window that will normally be accessed.
+        None stores the data contiguously (no chunking, no compression).
+    :param compression: HDF5 compression filter: 'gzip', 'lzf' or None.
+    :param compression_opts: Compression level for the gzip filter (0-9).
+    :param shuffle: Enables the byte shuffle filter, which greatly improves the compression of
+        floating point data.
+    """
+    def __init__(self, chunks=None, compression=None, compression_opts=None, shuffle=False):
+        if compression is not None and chunks is None:
+            raise ValueError("Compressed datasets must be chunked.")
+        self.chunks = chunks
+        self.compression = compression
+        self.compression_opts = compression_opts
+        self.shuffle = shuffle
+
+    def dataset_kwargs(self, shape, resizable=False):
+        """Returns the keyword arguments for h5py's create_dataset for data of the given shape.
+        """
+        kwargs = {}
+        if resizable:
+            kwargs['maxshape'] = (None,) + tuple(shape[1:])
+
+        if self.chunks is not None:
+            # Chunks can't be bigger than a fixed size dataset
+            n = self.chunks if resizable else max(1, min(self.chunks, shape[0]))
+            kwargs['chunks'] = (n,) + tuple(shape[1:])
+            if self.compression is not None:
+                kwargs['compression'] = self.compression
+                if self.compression_opts is not None:
+                    kwargs['compression_opts'] = self.compression_opts
+            if self.shuffle:
+                kwargs['shuffle'] = True
+        elif resizable:
+            kwargs['chunks'] = True
+        return kwargs
+
+    def __repr__(self):
+        return "{}(chunks={}, compression={})".format(self.__class__.__name__, self.chunks, self.compression)
+
+
+# Contiguous, uncompressed storage.
+CONTIGUOUS = StorageProfile()
+
+# Fast compression, 16k points (128kB of doubles) per chunk
+LZF = StorageProfile(chunks=16384, compression='lzf', shuffle=True)
+
+# Best compression, 16k points per chunk
+GZIP = StorageProfile(chunks=16384, compression='gzip', compression_opts=4, shuffle=True)
+
 
 class Results(h5py.File):
     """ A wrapper around an HDF5 data set that stored simulation results.
@@ -41,29 +98,91 @@ class Results(h5py.File):
                     net
                         v: [y_values]
                         time: [x_values]
+
+    The results of many simulations (E.g., the variants of a sweep) can be aggregated into
+    a single database, with one group per variant.  Identical index vectors are stored once,
+    in the /_index group, and linked into each variant that uses them.
+
+    variant_name (loop/loop_1/sim)
+        analysis_name
+            time: --> (Link to /_index/<hash>)
+            ...
     """
 
+    # Serializes the creation of shared vectors, which may be requested by
+    # several variants (threads) at once.
+    _shared_lock = threading.RLock()
+
     _analyses = ['op', 'dc', 'ac', 'tran', 'vars']
 
-    def __init__(self, path=None, mode='r', *args, **kwargs):
+    def __init__(self, path=None, mode='r', *args, storage=None, lazy=False, variant=None, **kwargs):
+        """
+        :param storage: A StorageProfile describing how new vectors and waveforms are stored.
+        :param lazy: If True, waveforms are returned as LazyWaves that read data from disk on demand.
+            The database must remain open while they are in use.
+        :param variant: Name of the variant group that holds the analyses.  None uses the root of the file.
+        """
         if path is None:
             raise ValueError("No filename given for Results database.")
 
         super().__init__(path, mode, *args, **kwargs)
 
         self.current_analysis = None
+        self.storage = storage if storage is not None else CONTIGUOUS
+        self.lazy = lazy
+        self.variant = variant
+
+        # Variant views share the file of the Results object that created them
+        self._shared = isinstance(path, h5py.h5f.FileID)
+
+    @property
+    def root_group(self):
+        """The group containing the analyses: The file itself, or the variant's group."""
+        if self.variant is None:
+            return self
+        return self[self.variant]
+
+    def open_variant(self, name):
+        """Returns a Results object for the variant *name*, stored in this database.  The variant's group
+        is created if the database is writable and it doesn't exist yet.
+        """
+        with self._shared_lock:
+            if name not in self and self.mode != 'r':
+                group = self.require_group(name)
+                group.attrs['type'] = 'variant'
+        return Results(self.id, variant=name, storage=self.storage, lazy=self.lazy)
+
+    def variants(self):
+        """Returns the names of all the variants stored in this database."""
+        names = []
+
+        def visit(name, obj):
+            if isinstance(obj, h5py.Group) and obj.attrs.get('type') == 'variant':
+                names.append(name)
+        self.visititems(visit)
+        return names
+
+    def close(self):
+        if self._shared:
+            # The file is owned by the aggregate database
+            if self.id.valid:
+                self.flush()
+        else:
+            super().close()
 
     def select(self, name):
-        if name not in self._analyses:
-            raise ValueError("Analysis {} is not supported.")
+        # Repeated analyses are numbered:  'tran_2'
+        if name.split('_')[0] not in self._analyses:
+            raise ValueError("Analysis {} is not supported.".format(name))
 
         self.current_analysis = name
-        if name in self:
-            self.current_group = self[name]
+        root = self.root_group
+        if name in root:
+            self.current_group = root[name]
         else:
-            self.create_group(name)
+            self.current_group = root.create_group(name)
 
-    def add_waveform(self, path, x, y, y_name="y", x_name="x", attrs=None):
+    def add_waveform(self, path, x, y, y_name="y", x_name="x", attrs=None, resizable=False):
         """Adds waveform data to the results database.
 
         Waveforms must have an X and a Y component.  The Y component may have
@@ -72,13 +191,18 @@ class Results(h5py.File):
 
         For waveform databases that share the same index (Spice simulations, for example)
         an h5py Dataset can be supplied and a softlink will be used for the x component.
+
+        If *resizable* is True, the datasets can be grown with the extend() method as
+        more data becomes available (E.g., while the simulator is still running).
         """
 
-        root = self[self.current_analysis]
         group = self.create_path(path)
 
-        group[y_name] = y
-        group[x_name] = x
+        self._create_dataset(group, y_name, y, resizable)
+        if isinstance(x, h5py.Dataset):
+            group[x_name] = x
+        else:
+            self._create_dataset(group, x_name, x, resizable)
 
         if attrs is None:
             attrs = {"type": "waveform",
@@ -93,19 +217,24 @@ class Results(h5py.File):
 
         return group[x_name], group[y_name]
 
-    def add_vector(self, path, vector, name, attrs=None, index_name=None):
+    def add_vector(self, path, vector, name, attrs=None, index_name=None, resizable=False, shared=False):
         """ Adds a vector (1d array) to the results database
         :param path:
         :param vector:
         :param name:
         :param attrs:
         :param index_name:
+        :param resizable: Allow the vector to be grown with the extend() method
+        :param shared: Store the vector once per database, keyed by its contents, and link to it.
+            Used for index vectors, which are often identical for every variant of a sweep.
         :return:
         """
-        root = self[self.current_analysis]
         group = self.create_path(path)
 
-        group[name] = vector
+        if shared and not resizable:
+            group[name] = self._shared_vector(vector, name)
+        else:
+            self._create_dataset(group, name, vector, resizable)
 
         if attrs is None:
             attrs = {"type": "vector"}
@@ -119,7 +248,6 @@ class Results(h5py.File):
         return group[name]
 
     def add_scalar(self, path, name, value, attrs=None):
-        root = self[self.current_analysis]
         group = self.create_path(path)
         group[name] = value
 
@@ -132,21 +260,60 @@ class Results(h5py.File):
         for attr_name, value in attrs.items():
             group[name].attrs[attr_name] = value
 
+    def _shared_vector(self, vector, name):
+        """Returns the dataset in the /_index group holding *vector*, creating it if needed."""
+        vector = np.ascontiguousarray(vector)
+        digest = hashlib.sha1()
+        digest.update("{}:{}:{}".format(name, vector.dtype.str, vector.shape).encode('utf-8'))
+        digest.update(vector.data)
+        key = digest.hexdigest()
+
+        with self._shared_lock:
+            index = self.require_group('/_index')
+            if key not in index:
+                self._create_dataset(index, key, vector)
+            return index[key]
+
+    def _create_dataset(self, group, name, data, resizable=False):
+        data = np.asarray(data)
+        if data.ndim == 0:
+            group[name] = data
+            return group[name]
+        return group.create_dataset(name, data=data, **self.storage.dataset_kwargs(data.shape, resizable))
+
+    def extend(self, dataset, values):
+        """Appends values to a dataset created with resizable=True.  Since waveforms with a shared
+        index are links to the same dataset, extending the index extends it for all waveforms.
+        """
+        n = dataset.shape[0]
+        dataset.resize(n + len(values), axis=0)
+        dataset[n:] = values
+        return dataset
+
     def create_path(self, path):
-        root = self[self.current_analysis]
-        group = root.get(path)
-        if group is None:
-            group = root.create_group(path)
-        return group
+        """Returns the group for *path*, creating it if needed.  Relative paths are relative to
+        the current analysis, absolute paths are relative to the variant's root group."""
+        if path.startswith('/'):
+            root = self.root_group
+            path = path[1:]
+        else:
+            root = self.root_group[self.current_analysis]
+
+        if path == '':
+            return root
+        # Note: Results.get() is not h5py's Group.get()
+        return root.require_group(path)
 
     # ---------------------------------------------------------
     #                      Access methods
     # ---------------------------------------------------------
-    def get(self, path, analysis=None, output=None):
+    def get(self, path, analysis=None, output=None, lazy=None):
         if analysis is None:
             analysis = self.current_analysis
+        if lazy is None:
+            lazy = self.lazy
 
-        root = self[analysis]
+        root = self.root_group[analysis]
 
         if type(path) is str:
             if "." in path:
@@ -174,6 +341,8 @@ class Results(h5py.File):
             rv = x_ds.value
         elif x_ds.attrs['type'] == 'vector':
             rv = np.array(x_ds[:])
+        elif x_ds.attrs['type'] == 'waveform' and lazy:
+            rv = LazyWave(x=group[x_ds.attrs['index']], y=x_ds, name=path, interp='linear')
         elif x_ds.attrs['type'] == 'waveform':
             y = np.array(x_ds[:])
             x = np.array(group[x_ds.attrs['index']])
@@ -181,8 +350,8 @@ class Results(h5py.File):
             rv = Wave(x=x, y=y, name=path, interp='linear')
         return rv
 
-    def v(self, node, analysis=None):
-        return self.get(node, analysis=analysis, output='v')
+    def v(self, node, analysis=None, lazy=None):
+        return self.get(node, analysis=analysis, output='v', lazy=lazy)
 
     def vdiff(self, pos, neg, analysis=None, output='v'):
         p = self.get(pos, analysis=analysis, output=output)
@@ -0,0 +1,81 @@
+"""
+Sampling strategies for sweeps.  (See LoopComponent.sampling)
+
+Samples are points in the unit hypercube, one dimension per loop variable.  Each
+LoopVariable maps its coordinate to a value (See LoopVariable.sample).
+
+    grid    -- Every combination of the loop variables' values.
+    random  -- Uniform random (Monte Carlo) samples.
+    lhs     -- Latin hypercube samples.  Each variable's range is divided into num_samples
+               strata, and each stratum is sampled once.
+    sobol   -- Scrambled Sobol' sequence.  A low discrepancy sequence, which covers the space
+               more evenly than random samples.  Best with a power of 2 samples.
+
+refine() adds samples around the boundary where a measurement crosses a limit, so a
+coarse sweep can be followed by simulations only where the result changes.
+"""
+import numpy as np
+
+SAMPLINGS = ('grid', 'random', 'lhs', 'sobol')
+
+
+def unit_samples(kind, n, d, seed=None):
+    """Returns *n* samples of the *d* dimensional unit hypercube, as an (n, d) array."""
+    if kind == 'random':
+        return np.random.default_rng(seed).random((n, d))
+
+    from scipy.stats import qmc
+    if kind == 'lhs':
+        return qmc.LatinHypercube(d, seed=seed).random(n)
+    elif kind == 'sobol':
+        sampler = qmc.Sobol(d, scramble=True, seed=seed)
+        m = int(np.log2(n)) if n > 0 else 0
+        if 2**m == n:
+            return sampler.random_base2(m)
+        return sampler.random(n)
+    raise ValueError("Unknown sampling: {}.  Expected one of {}".format(kind, SAMPLINGS))
+
+
+def refine(u, values, limit, n=None, k=None):
+    """ Returns new samples between neighboring samples on opposite sides of *limit*.
+
+    :param u: (N, d) array of samples in the unit hypercube
+    :param values: The measured value at each sample.  NaNs are ignored.
+    :param limit: The boundary to refine around
+    :param n: Maximum number of new samples.  The midpoints of the farthest apart pairs are used first.
+    :param k: Number of neighbors of each sample to compare with.  Defaults to 2*d.
+    """
+    from scipy.spatial import cKDTree
+
+    u = np.asarray(u, dtype=float)
+    values = np.asarray(values, dtype=float)
+    ok = ~np.isnan(values)
+    u, values = u[ok], values[ok]
+    if len(u) < 2:
+        return np.zeros((0, u.shape[1] if u.ndim == 2 else 0))
+
+    d = u.shape[1]
+    k = min(len(u), (k or 2*d) + 1)
+    tree = cKDTree(u)
+    dist, nbrs = tree.query(u, k=k)
+
+    # Pairs of neighbors that straddle the limit
+    above = values > limit
+    i = np.repeat(np.arange(len(u)), k - 1)
+    j = nbrs[:, 1:].ravel()
+    dist = dist[:, 1:].ravel()
+    cross = above[i] != above[j]
+    i, j, dist = i[cross], j[cross], dist[cross]
+
+    order = np.argsort(-dist, kind='mergesort')
+    midpoints = (u[i[order]] + u[j[order]])/2
+
+    # Remove duplicates, and points that have already been sampled
+    midpoints, first = np.unique(np.round(midpoints, 12), axis=0, return_index=True)
+    midpoints = midpoints[np.argsort(first)]
+    if len(midpoints):
+        near, _ = tree.query(midpoints)
+        midpoints = midpoints[near > 1e-12]
+    if n is not None:
+        midpoints = midpoints[:n]
+    return midpoints
@@ -0,0 +1,301 @@
+"""
+Streaming storage of results tables.
+
+A sink is attached to a Table (see Table.attach).  Rows added to the table are buffered,
+and written to disk every *batch_size* rows, so a sweep that stops early keeps the rows
+it has finished.  Each row is saved with its row number.  Reopening a file resumes it:
+rows() returns the row numbers already saved, so they can be skipped.
+
+    HDF5Sink     -- One extendable dataset per column, plus '_row'.
+    ParquetSink  -- A directory of Parquet files, one per batch.  Requires pyarrow.
+
+Numbers are stored as floats (complex numbers as complex floats), with NaN for missing
+values.  Strings are stored as strings, with '' for missing values.  Other values, such
+as waveforms, are not stored.
+"""
+import os
+import numbers
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+ROW = '_row'
+
+logger = logging.getLogger(__name__)
+
+
+def open_sink(path, **kwargs):
+    """Returns a sink for *path*, chosen by its extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.parquet', '.pq'):
+        return ParquetSink(path, **kwargs)
+    return HDF5Sink(path, **kwargs)
+
+
+def to_arrays(records, names=None, kinds=None, skipped=None):
+    """ Converts a list of records (dictionaries) to an OrderedDict of column arrays.
+    Columns holding values other than numbers and strings are left out.
+
+    :param kinds: The dtype kinds of the columns already saved, by name.  A column with only missing
+                  values in *records* keeps its kind.  Otherwise it is taken as numbers.
+    :param skipped: If given, a list that the names of the columns left out are appended to.
+    """
+    if names is None:
+        names = OrderedDict()
+        for record in records:
+            for key in record:
+                names[key] = None
+    if kinds is None:
+        kinds = {}
+
+    columns = OrderedDict()
+    for name in names:
+        values = [record.get(name) for record in records]
+        present = [v for v in values if v is not None]
+        if not present and kinds.get(name) == 'O':
+            columns[name] = np.array(['']*len(values), dtype=object)
+        elif not present and kinds.get(name) == 'c':
+            columns[name] = np.full(len(values), np.nan, dtype=complex)
+        elif all(isinstance(v, numbers.Number) for v in present):
+            dtype = complex if any(isinstance(v, numbers.Complex) and not isinstance(v, numbers.Real)
+                                   for v in present) else float
+            columns[name] = np.array([np.nan if v is None else v for v in values], dtype=dtype)
+        elif all(isinstance(v, str) for v in present):
+            columns[name] = np.array(['' if v is None else v for v in values], dtype=object)
+        elif skipped is not None:
+            skipped.append(name)
+    return columns
+
+
+class TableSink:
+    """ Base class of the result sinks.  Subclasses implement write_batch(), read(), and rows().
+    """
+    def __init__(self, path, batch_size=1000):
+        self.path = path
+        self.batch_size = batch_size
+        self._records = []
+        self._rows = []
+        self._skipped = set()
+
+    def write(self, records, rows):
+        """Buffers rows, and writes them once batch_size rows are waiting."""
+        self._records.extend(records)
+        self._rows.extend(rows)
+        if len(self._records) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._records:
+            return
+        records, rows = self._records, self._rows
+        self._records, self._rows = [], []
+        skipped = []
+        columns = to_arrays(records, kinds=self.kinds(), skipped=skipped)
+        for name in skipped:
+            if name not in self._skipped:
+                self._skipped.add(name)
+                logger.warning("{}: Column '{}' holds values other than numbers and strings.  It is not saved."
+                               .format(self.path, name))
+        self.write_batch(columns, np.asarray(rows, dtype=np.int64))
+
+    def write_batch(self, columns, rows):
+        raise NotImplementedError
+
+    def kinds(self):
+        """Returns the dtype kinds ('f', 'c', or 'O' for strings) of the saved columns, by name."""
+        return {}
+
+    def read(self):
+        """Returns the saved columns, as an OrderedDict of arrays, and their row numbers."""
+        raise NotImplementedError
+
+    def rows(self):
+        """Returns the row numbers that have been saved."""
+        raise NotImplementedError
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class HDF5Sink(TableSink):
+    """ Appends rows to extendable datasets in an HDF5 file.
+
+    :param path: File name.  An existing file is appended to.
+    :param group: Optional group to store the datasets in
+    :param batch_size: Number of rows written at once.  Also the chunk size of the datasets.
+    """
+    def __init__(self, path, group=None, batch_size=1000):
+        super().__init__(path, batch_size=batch_size)
+        import h5py
+        self.file = h5py.File(path, 'a')
+        self.group = self.file if group is None else self.file.require_group(group)
+        if ROW not in self.group:
+            self.create_dataset(ROW, np.dtype(np.int64))
+
+    def create_dataset(self, name, dtype):
+        import h5py
+        n = self.num_rows
+        if dtype.kind == 'O':
+            dtype, fill = h5py.string_dtype(), ''
+        else:
+            fill = np.nan
+        ds = self.group.create_dataset(name, shape=(n,), maxshape=(None,), dtype=dtype,
+                                       chunks=(max(1, self.batch_size),))
+        if n:
+            ds[:] = fill
+        if name != ROW:
+            # HDF5 lists datasets by name.  Keep the table's column order.
+            self.group.attrs['columns'] = self.columns + [name]
+        return ds
+
+    @property
+    def columns(self):
+        return [str(name) for name in self.group.attrs.get('columns', [])]
+
+    @property
+    def num_rows(self):
+        return len(self.group[ROW]) if ROW in self.group else 0
+
+    def kinds(self):
+        return {name: self.group[name].dtype.kind for name in self.columns}
+
+    def write_batch(self, columns, rows):
+        start = self.num_rows
+        stop = start + len(rows)
+
+        for name, values in columns.items():
+            if name not in self.group:
+                self.create_dataset(name, values.dtype)
+            ds = self.group[name]
+            if (ds.dtype.kind == 'O') != (values.dtype.kind == 'O'):
+                raise ValueError("Column '{}' changed between numbers and strings".format(name))
+
+        for name in [ROW] + self.columns:
+            ds = self.group[name]
+            ds.resize((stop,))
+            if name == ROW:
+                ds[start:stop] = rows
+            elif name in columns:
+                ds[start:stop] = columns[name]
+            else:
+                ds[start:stop] = '' if ds.dtype.kind == 'O' else np.nan
+        self.file.flush()
+
+    def read(self):
+        columns = OrderedDict()
+        for name in self.columns:
+            values = self.group[name][()]
+            if values.dtype.kind == 'O':
+                values = np.array([v.decode('utf-8') if isinstance(v, bytes) else v for v in values], dtype=object)
+            columns[name] = values
+        return columns, self.rows()
+
+    def rows(self):
+        return self.group[ROW][()]
+
+    def close(self):
+        if self.file:
+            self.flush()
+            self.file.close()
+            self.file = None
+
+
+class ParquetSink(TableSink):
+    """ Writes each batch of rows as a Parquet file in a directory (a Parquet dataset).
+
+    Each file is complete once written:  it is written under a temporary name and then renamed,
+    so a sweep that is killed keeps every batch written before it, and a partial batch is never
+    read.  The columns are fixed by the first batch.  Reopening a directory resumes it.
+
+    :param path: Directory name
+    :param batch_size: Number of rows per file
+    """
+    def __init__(self, path, batch_size=1000):
+        super().__init__(path, batch_size=batch_size)
+        import pyarrow.parquet as pq
+        self.schema = None
+        self._saved_rows = []
+        self._closed = False
+
+        os.makedirs(path, exist_ok=True)
+        parts = self.parts()
+        if parts:
+            self.schema = pq.read_schema(parts[0])
+            for part in parts:
+                self._saved_rows.append(pq.read_table(part, columns=[ROW]).column(ROW).to_numpy())
+
+    def kinds(self):
+        import pyarrow as pa
+        if self.schema is None:
+            return {}
+        return {field.name: 'O' if pa.types.is_string(field.type) else 'f' for field in self.schema}
+
+    def parts(self):
+        """Returns the files written, in order."""
+        return [os.path.join(self.path, name) for name in sorted(os.listdir(self.path))
+                if name.startswith('part-') and name.endswith('.parquet')]
+
+    def write_batch(self, columns, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._closed:
+            raise ValueError("Parquet sink is closed: {}".format(self.path))
+        if self.schema is None:
+            fields = [pa.field(ROW, pa.int64())]
+            for name, values in columns.items():
+                if values.dtype.kind == 'c':
+                    raise ValueError("Parquet does not support complex values: '{}'".format(name))
+                fields.append(pa.field(name, pa.string() if values.dtype.kind == 'O' else pa.float64()))
+            self.schema = pa.schema(fields)
+
+        for name in columns:
+            if self.schema.get_field_index(name) < 0:
+                raise ValueError("Column '{}' is not in the Parquet dataset".format(name))
+        arrays = []
+        for field in self.schema:
+            if field.name == ROW:
+                arrays.append(pa.array(rows, type=field.type))
+            elif field.name in columns:
+                arrays.append(pa.array(columns[field.name], type=field.type))
+            else:
+                arrays.append(pa.nulls(len(rows), type=field.type))
+
+        # Temporary files start with '.', so Parquet readers skip them
+        name = "part-{:05d}.parquet".format(len(self._saved_rows))
+        tmp_path = os.path.join(self.path, "." + name + ".tmp")
+        pq.write_table(pa.Table.from_arrays(arrays, schema=self.schema), tmp_path)
+        os.replace(tmp_path, os.path.join(self.path, name))
+        self._saved_rows.append(rows)
+
+    def read(self):
+        """Returns the columns and row numbers of the files written."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        parts = self.parts()
+        if not parts:
+            return OrderedDict(), np.zeros(0, dtype=np.int64)
+        table = pa.concat_tables([pq.read_table(part) for part in parts])
+        columns = OrderedDict()
+        for name in table.column_names:
+            if name != ROW:
+                values = table.column(name).to_numpy(zero_copy_only=False)
+                columns[name] = values.astype(object) if values.dtype.kind in 'OU' else values
+        return columns, table.column(ROW).to_numpy()
+
+    def rows(self):
+        if not self._saved_rows:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(self._saved_rows)
+
+    def close(self):
+        """Writes the buffered rows.  Rows already written are readable without closing."""
+        self.flush()
+        self._closed = True
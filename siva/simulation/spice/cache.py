@@ -0,0 +1,182 @@
+"""
+A content addressed cache of simulation results.
+
+A simulation's key is the SHA-256 hash of its netlist, its simulator (path, size, and
+modification time of the executable), and the contents of every model file it includes,
+directly or through nested .INCLUDE/.LIB statements.  When the key of a new simulation is
+found in the cache, its results are copied from the cache instead of running the simulator.
+
+Entries are HDF5 files in a local cache directory.  The directory is kept under *max_size*
+bytes by removing the least recently used entries.
+"""
+import os
+import re
+import shutil
+import hashlib
+import threading
+
+import h5py
+
+# .INCLUDE 'models.sp'   .LIB "corners.lib" tt
+INCLUDE_RE = re.compile(rb"^\s*\.(?:inc\w*|lib)\s+['\"]?([^'\"\s]+)", re.IGNORECASE | re.MULTILINE)
+
+
+class ResultCache:
+    """ A size bounded, least recently used, cache of simulation results.
+
+        cache = ResultCache('~/.siva/cache', max_size=20e9)
+        key = cache.key(netlist, simulator_path, include_files)
+        if not cache.load(key, results.root_group):
+            ... run the simulator ...
+            cache.store(key, results.root_group)
+    """
+    suffix = ".hdf5"
+
+    def __init__(self, path, max_size=10e9):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.max_size = max_size
+        os.makedirs(self.path, exist_ok=True)
+
+        self.lock = threading.RLock()
+
+        # File hashes, keyed by (path, size, mtime), so unchanged model files are only read once
+        self._file_hashes = {}
+
+    def key(self, netlist, simulator_path=None, include_files=()):
+        """Returns the cache key of a simulation."""
+        h = hashlib.sha256()
+        h.update(netlist.encode('utf-8') if isinstance(netlist, str) else netlist)
+
+        h.update(b'\0simulator\0')
+        if simulator_path is not None:
+            h.update(str(simulator_path).encode('utf-8'))
+            exe = shutil.which(simulator_path) or simulator_path
+            if os.path.exists(exe):
+                stat = os.stat(exe)
+                h.update("{}:{}".format(stat.st_size, stat.st_mtime_ns).encode('utf-8'))
+
+        for path in self.model_files(include_files):
+            h.update(b'\0include\0')
+            h.update(path.encode('utf-8'))
+            h.update(self.file_hash(path))
+        return h.hexdigest()
+
+    def model_files(self, include_files):
+        """Returns the included files, and the files they include, in a consistent order."""
+        found = []
+        todo = [os.path.abspath(str(f)) for f in include_files]
+        while todo:
+            path = todo.pop(0)
+            if path in found or not os.path.isfile(path):
+                continue
+            found.append(path)
+
+            with open(path, 'rb') as fp:
+                text = fp.read()
+            base = os.path.dirname(path)
+            for match in INCLUDE_RE.finditer(text):
+                name = match.group(1).decode('utf-8', errors='replace')
+                todo.append(os.path.normpath(os.path.join(base, name)))
+        return found
+
+    def file_hash(self, path):
+        stat = os.stat(path)
+        file_id = (path, stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            if file_id not in self._file_hashes:
+                h = hashlib.sha256()
+                with open(path, 'rb') as fp:
+                    for block in iter(lambda: fp.read(1 << 20), b''):
+                        h.update(block)
+                self._file_hashes[file_id] = h.digest()
+            return self._file_hashes[file_id]
+
+    def entry_path(self, key):
+        return os.path.join(self.path, key + self.suffix)
+
+    def __contains__(self, key):
+        return os.path.exists(self.entry_path(key))
+
+    def open(self, key):
+        """ Opens a cache entry for reading, and marks it as recently used.  Returns None if *key*
+        isn't cached.
+        """
+        path = self.entry_path(key)
+        try:
+            src = h5py.File(path, 'r')
+        except (OSError, IOError):
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return src
+
+    @staticmethod
+    def copy(src, dst):
+        """Copies the contents and attributes of one HDF5 group into another."""
+        for name in src:
+            src.copy(src[name], dst, name=name)
+        dst.attrs.update(src.attrs)
+
+    def load(self, key, group):
+        """ Copies the cached results into an HDF5 group.  Returns False if *key* isn't cached.
+        """
+        src = self.open(key)
+        if src is None:
+            return False
+        with src:
+            self.copy(src, group)
+        return True
+
+    def store(self, key, group):
+        """ Saves the contents of an HDF5 group under *key*, then evicts old entries.
+        """
+        path = self.entry_path(key)
+        tmp = "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+
+        with h5py.File(tmp, 'w') as dst:
+            self.copy(group, dst)
+
+        # Atomic, so readers never see a partial entry
+        os.replace(tmp, path)
+        self.evict()
+        return path
+
+    def entries(self):
+        """Returns a list of (path, size, last used time) for each cache entry."""
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(self.suffix):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    @property
+    def size(self):
+        return sum(size for path, size, used in self.entries())
+
+    def evict(self):
+        """Removes the least recently used entries until the cache is smaller than max_size."""
+        if self.max_size is None:
+            return
+
+        with self.lock:
+            entries = sorted(self.entries(), key=lambda e: e[2])
+            total = sum(e[1] for e in entries)
+            for path, size, used in entries:
+                if total <= self.max_size:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def clear(self):
+        for path, size, used in self.entries():
+            os.remove(path)
@@ -31,15 +31,20 @@ class Circuit(Design, metaclass=CircuitMeta):
         return [" ".join(txt)]
 
 
-    def subckt_card(self):
+    def subckt_card(self, card=None):
+        """ Returns the subcircuit definition.  *card* returns the card of each instance.  (See Netlister)
+        """
+        if card is None:
+            card = lambda inst: inst.card()
         txt = []
         pin_txt = " ".join(self.ports)
         txt.append(".SUBCKT {} {}".format(self.cell_name, pin_txt))
         for inst in self.instances.values():
-            txt.extend(inst.card())
+            txt.extend(card(inst))
 
-        for source in self.sources.values():
-            txt.extend(source.card())
+        if hasattr(self, 'sources'):
+            for source in self.sources.values():
+                txt.extend(card(source))
 
         txt.append(".ENDS")
         return txt
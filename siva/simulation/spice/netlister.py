@@ -0,0 +1,109 @@
+"""
+A cache of netlist cards, shared by the variants of a sweep.
+
+Formatting a card (see Primitive.card_dict) converts every parameter to text, which is most of
+the cost of netlisting a large design.  Between the variants of a sweep, only a few parameters
+change, so most cards are the same.
+
+Cards are cached by a key made of the instance's type, name, connections, and evaluated
+parameter values.  A subcircuit's key is its cell name, pins, and the keys of its instances and
+sources.  When a swept parameter changes, only the cards of the instances that use it, and the
+definitions of the subcircuits that hold them, are formatted again.  Only the first instance of
+each cell is visited to find the subcircuits.
+
+    Simulation.netlister = Netlister()
+"""
+import threading
+from collections import OrderedDict
+
+from .primitives import Primitive
+
+
+class Netlister:
+    """ A size bounded, least recently used, cache of instance cards and subcircuit definitions.
+
+    :param max_entries: Number of cards (and, separately, subcircuit definitions) kept
+    """
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self.lock = threading.RLock()
+        self._cards = OrderedDict()
+        self._subckts = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(inst):
+        """Returns the key of an instance's card.  Cards whose parameter values aren't hashable aren't cached."""
+        return (type(inst), inst.name,
+                tuple([pin.conn.name if pin.conn is not None else None for pin in inst.ports.values()]),
+                tuple([param.evaluated_value for param in inst.params.values()]))
+
+    @staticmethod
+    def designs(top):
+        """ Returns the first instance of each cell in *top*'s hierarchy, in the order of
+        Simulation.instance_designs().  Only the first instance of a cell is searched, since
+        instances of the same cell have the same instances.
+        """
+        designs = OrderedDict()
+
+        def visit(design):
+            for inst in design.instances.values():
+                name = inst.cell_name
+                if name not in designs:
+                    designs[name] = inst
+                    if not isinstance(inst, Primitive):
+                        visit(inst)
+        if top.instances:
+            visit(top)
+        return list(designs.values())
+
+    def card(self, inst, key=None):
+        """Returns an instance's card.  (See Primitive.card)"""
+        if key is None:
+            key = self.key(inst)
+        return self._lookup(self._cards, key, inst.card)
+
+    def subckt_card(self, design):
+        """Returns a design's subcircuit definition, or None for primitives.  (See Circuit.subckt_card)
+
+        The key of a subcircuit is made of its instances' keys, so they are only found once.
+        """
+        if isinstance(design, Primitive):
+            return None
+        members = list(design.instances.values())
+        if hasattr(design, 'sources'):
+            members.extend(design.sources.values())
+        keys = dict((id(inst), self.key(inst)) for inst in members)
+
+        key = (type(design), design.cell_name, tuple(design.ports), tuple(keys.values()))
+        return self._lookup(self._subckts, key,
+                            lambda: design.subckt_card(card=lambda inst: self.card(inst, keys[id(inst)])))
+
+    def _lookup(self, cache, key, create):
+        with self.lock:
+            try:
+                lines = cache.get(key)
+            except TypeError:
+                # Unhashable parameter values
+                lines = key = None
+            if lines is not None:
+                cache.move_to_end(key)
+                self.hits += 1
+                return lines
+            self.misses += 1
+
+        lines = create()
+        if key is None:
+            return lines
+        with self.lock:
+            cache[key] = lines
+            while len(cache) > self.max_entries:
+                cache.popitem(last=False)
+        return lines
+
+    def clear(self):
+        with self.lock:
+            self._cards.clear()
+            self._subckts.clear()
+            self.hits = self.misses = 0
@@ -0,0 +1,251 @@
+"""
+In process simulation with the ngspice shared library (libngspice).
+
+Launching 'ngspice -b' for every simulation costs a process start and a model load, and the
+results are written to a raw file and then read back.  For short analyses (AC, OP, small
+transients) that is most of the run time.  Instead, the library is loaded once per process,
+each circuit is sent to it with ngSpice_Circ(), and the vectors of each plot are copied from
+memory into Numpy arrays with ngGet_Vec_Info().
+
+    ngspice = NgSpiceShared.load()      # None if libngspice is not available
+    if ngspice is not None:
+        plots, output = ngspice.run(netlist.splitlines())
+
+A parameter sweep of one circuit can be run without parsing it again, by altering device
+parameters between runs (See NgSpiceShared.sweep).
+
+ngspice keeps its state in globals, so a process holds one instance, and simulations in
+the same process are run one at a time.  Use the 'process' executor to run them in parallel.
+
+The library is found from the NGSPICE_LIBRARY environment variable, or the system's library
+search path.
+"""
+import os
+import re
+import threading
+import ctypes
+import ctypes.util
+from collections import OrderedDict
+
+import numpy as np
+
+from .raw_file import PLOT_NAMES
+
+# Vector types.  (ngspice's sim.h)
+SV_VOLTAGE = 3
+SV_CURRENT = 4
+
+ANALYSES = set(PLOT_NAMES.values())
+
+
+class NgSpiceError(RuntimeError):
+    pass
+
+
+class VectorInfo(ctypes.Structure):
+    """ngspice's vector_info.  Complex data is an array of (real, imaginary) pairs."""
+    _fields_ = [('vname', ctypes.c_char_p),
+                ('vtype', ctypes.c_int),
+                ('vflags', ctypes.c_short),
+                ('vrealdata', ctypes.POINTER(ctypes.c_double)),
+                ('vcompdata', ctypes.POINTER(ctypes.c_double)),
+                ('vlength', ctypes.c_int)]
+
+
+SendChar = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_void_p)
+SendStat = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_void_p)
+ControlledExit = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_int, ctypes.c_bool, ctypes.c_bool, ctypes.c_int,
+                                  ctypes.c_void_p)
+
+
+def find_library():
+    """Returns the path of libngspice, or None if it can't be found."""
+    path = os.environ.get('NGSPICE_LIBRARY')
+    if path:
+        return path
+    return ctypes.util.find_library('ngspice')
+
+
+def entry_name(name, vtype):
+    """ Returns the name a vector has in a raw file.  In memory, node voltages are named by the node
+    ('out'), and branch currents by the device ('v1#branch').  Raw files name them 'v(out)' and 'i(v1)'.
+    """
+    if vtype == SV_VOLTAGE and '(' not in name:
+        return "v({})".format(name)
+    if vtype == SV_CURRENT and name.endswith('#branch'):
+        return "i({})".format(name[:-len('#branch')])
+    return name
+
+
+class NgSpiceShared:
+    """ A loaded ngspice shared library.  Use load() to get the process's instance.
+    """
+    _instances = {}
+    _load_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path=None):
+        """Returns the instance for *path* (default: find_library()), or None if it can't be loaded."""
+        with cls._load_lock:
+            if path is None:
+                path = find_library()
+                if path is None:
+                    return None
+            if path not in cls._instances:
+                try:
+                    cls._instances[path] = cls(path)
+                except (OSError, AttributeError):
+                    # Not found, or not the ngspice shared library.  Not tried again.
+                    cls._instances[path] = None
+            ngspice = cls._instances[path]
+            if ngspice is None or ngspice.exited:
+                return None
+            return ngspice
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.output = []
+        self.last_output = []
+        self.exited = False
+
+        # The loaded netlist, and whether its devices have been altered since
+        self.circuit = None
+        self.altered = False
+
+        lib = self.lib = ctypes.CDLL(path)
+        lib.ngSpice_Init.argtypes = [SendChar, SendStat, ControlledExit, ctypes.c_void_p, ctypes.c_void_p,
+                                     ctypes.c_void_p, ctypes.c_void_p]
+        lib.ngSpice_Init.restype = ctypes.c_int
+        lib.ngSpice_Circ.argtypes = [ctypes.POINTER(ctypes.c_char_p)]
+        lib.ngSpice_Circ.restype = ctypes.c_int
+        lib.ngSpice_Command.argtypes = [ctypes.c_char_p]
+        lib.ngSpice_Command.restype = ctypes.c_int
+        lib.ngGet_Vec_Info.argtypes = [ctypes.c_char_p]
+        lib.ngGet_Vec_Info.restype = ctypes.POINTER(VectorInfo)
+        lib.ngSpice_AllPlots.argtypes = []
+        lib.ngSpice_AllPlots.restype = ctypes.POINTER(ctypes.c_char_p)
+        lib.ngSpice_AllVecs.argtypes = [ctypes.c_char_p]
+        lib.ngSpice_AllVecs.restype = ctypes.POINTER(ctypes.c_char_p)
+
+        # The callbacks must be kept as long as the library is loaded
+        self._callbacks = (SendChar(self._send_char), SendStat(self._send_stat), ControlledExit(self._exit))
+        lib.ngSpice_Init(*self._callbacks, None, None, None, None)
+
+    def _send_char(self, text, id, user):
+        self.output.append(text.decode('utf-8', errors='replace'))
+        return 0
+
+    def _send_stat(self, text, id, user):
+        return 0
+
+    def _exit(self, status, unload, quit, id, user):
+        # ngspice can't be used again in this process
+        self.exited = True
+        return 0
+
+    def command(self, cmd):
+        with self.lock:
+            start = len(self.output)
+            if self.lib.ngSpice_Command(cmd.encode('utf-8')) != 0 or self.exited:
+                raise NgSpiceError("ngspice command failed: {}".format(cmd))
+            self._check(start, cmd)
+
+    def _check(self, start, what):
+        errors = [line[len('stderr '):] for line in self.output[start:] if line.startswith('stderr Error')]
+        if errors:
+            raise NgSpiceError("{}:\n    {}".format(what, "\n    ".join(errors)))
+
+    def load_circuit(self, lines):
+        """Parses a netlist.  If it is the circuit already loaded (and not altered), it is not parsed again."""
+        lines = tuple(lines)
+        with self.lock:
+            if lines == self.circuit and not self.altered:
+                return
+            if self.circuit is not None:
+                self.command('remcirc')
+                self.circuit = None
+
+            array = (ctypes.c_char_p*(len(lines) + 1))(*[line.encode('utf-8') for line in lines], None)
+            start = len(self.output)
+            if self.lib.ngSpice_Circ(array) != 0 or self.exited:
+                raise NgSpiceError("ngspice could not load the circuit")
+            self._check(start, "Circuit errors")
+            self.circuit = lines
+            self.altered = False
+
+    def alter(self, device, **params):
+        """Changes parameters of a device of the loaded circuit.  E.g., alter('m.x_dut.mmn', w=2e-6)"""
+        with self.lock:
+            self.altered = True
+            for name, value in params.items():
+                self.command("alter {} {}={}".format(device, name, value))
+
+    def run(self, lines=None):
+        """ Runs the analyses of a netlist (or, with no *lines*, the loaded circuit).
+
+        :return: The results of each analysis, in the form read from a raw file (See
+                 Simulation.load_raw_results), and the simulator's output.
+        """
+        with self.lock:
+            try:
+                if lines is not None:
+                    self.load_circuit(lines)
+                self.command('destroy all')
+                self.command('run')
+                plots = self.plots()
+            finally:
+                # The output of the last run is kept, for error messages
+                self.last_output = list(self.output)
+                del self.output[:]
+            return plots, self.last_output
+
+    def sweep(self, lines, alters):
+        """ Loads a netlist once, and runs it for each of *alters*:  dictionaries of
+        {device: {parameter: value}}.  Alterations are kept for the following runs.  Returns the
+        results of each run.  (See run)
+        """
+        results = []
+        with self.lock:
+            self.load_circuit(lines)
+            for alter in alters:
+                for device, params in alter.items():
+                    self.alter(device, **params)
+                results.append(self.run())
+        return results
+
+    def plots(self):
+        """Copies the vectors of every plot, except 'const', into Numpy arrays."""
+        plots = OrderedDict()
+        for plot in reversed(self._strings(self.lib.ngSpice_AllPlots())):
+            analysis = re.sub(r'\d+$', '', plot)
+            if analysis not in ANALYSES:
+                continue
+            vectors = OrderedDict()
+            for name in self._strings(self.lib.ngSpice_AllVecs(plot.encode('utf-8'))):
+                info = self.lib.ngGet_Vec_Info("{}.{}".format(plot, name).encode('utf-8'))
+                if not info:
+                    continue
+                info = info.contents
+                n = info.vlength
+                if info.vrealdata:
+                    data = np.ctypeslib.as_array(info.vrealdata, shape=(n,)).copy()
+                elif info.vcompdata:
+                    data = np.ctypeslib.as_array(info.vcompdata, shape=(2*n,)).view(complex).copy()
+                else:
+                    continue
+                vectors[entry_name(name, info.vtype)] = data
+            plots[analysis] = vectors
+        return plots
+
+    @staticmethod
+    def _strings(array):
+        """Converts a NULL terminated array of strings."""
+        strings = []
+        if not array:
+            return strings
+        i = 0
+        while array[i] is not None:
+            strings.append(array[i].decode('utf-8'))
+            i += 1
+        return strings
@@ -0,0 +1,228 @@
+"""
+Reader for Spice "raw" output files (ngspice, Xyce, Spice3).
+
+A raw file is a sequence of plots, one per analysis.  Each plot has an ASCII header
+followed by either a binary or an ASCII data section:
+
+    Title: * A simple test circuit
+    Date: Thu Jan  1 00:00:00  2015
+    Plotname: Transient Analysis
+    Flags: real
+    No. Variables: 3
+    No. Points: 201
+    Variables:
+            0       time    time
+            1       v(a)    voltage
+            2       v(b)    voltage
+    Binary:
+    <No. Points x No. Variables doubles, or pairs of doubles for complex data>
+
+Binary data sections are not read into memory.  They are memory mapped and exposed as a
+(points x vars) Numpy view, so every column handed to the rest of the program is a view
+onto the operating system's page cache rather than a heap copy.
+"""
+import os
+import mmap
+
+import numpy as np
+
+# Maps the 'Plotname' header to the analysis names used by the Results database
+PLOT_NAMES = {'Transient Analysis': 'tran',
+              'AC Analysis': 'ac',
+              'DC transfer characteristic': 'dc',
+              'Operating Point': 'op',
+              'AC Operating Point': 'op',
+              }
+
+
+class RawPlot:
+    """ A single plot (analysis) from a Spice raw file.
+
+    *data* is a (num_points, num_vars) array, either a real or complex view onto the file.
+    *number* counts the plots of the same analysis in the file.  The second and later are
+    named with their number:  E.g., 'tran', 'tran_2', 'tran_3'.
+    """
+    def __init__(self, plotname, flags, variables, data, title=None, number=1):
+        self.plotname = plotname
+        self.flags = flags
+        self.variables = variables
+        self.data = data
+        self.title = title
+        self.number = number
+
+    @property
+    def analysis(self):
+        try:
+            name = PLOT_NAMES[self.plotname]
+        except KeyError:
+            raise ValueError("Unsupported Spice plot: {}".format(self.plotname))
+        if self.number > 1:
+            name = "{}_{}".format(name, self.number)
+        return name
+
+    @property
+    def is_complex(self):
+        return self.flags == "complex"
+
+    @property
+    def num_points(self):
+        return self.data.shape[0]
+
+    @property
+    def num_vars(self):
+        return len(self.variables)
+
+    def __getitem__(self, name):
+        return self.data[:, self.variables.index(name)]
+
+    def __contains__(self, name):
+        return name in self.variables
+
+    def keys(self):
+        return list(self.variables)
+
+    def items(self):
+        return [(name, self.data[:, n]) for n, name in enumerate(self.variables)]
+
+    def as_dict(self):
+        """Returns a dictionary mapping each variable name to its column of data.
+        The columns are views, no data is copied."""
+        return dict(self.items())
+
+    def __repr__(self):
+        return "{}({}, vars={}, points={})".format(self.__class__.__name__, self.plotname,
+                                                   self.num_vars, self.num_points)
+
+
+def read_header(fp):
+    """ Reads a plot header, starting at the current file position, and leaves the file
+    positioned at the first byte of the data section.
+
+    Returns a dictionary of the header fields, or None if the end of the file has been reached.
+    """
+    header = {'variables': [], 'num_points': None}
+    in_vars = False
+
+    while True:
+        line = fp.readline()
+        if not line:
+            return None
+
+        text = line.decode('utf-8', errors='replace').strip()
+        if text in ("Binary:", "Values:"):
+            header['format'] = text[:-1].lower()
+            return header
+        elif in_vars:
+            # 0	frequency	frequency	grid=3
+            n, name, *rest = text.split()
+            header['variables'].append(name)
+            continue
+
+        key, _, value = text.partition(":")
+        value = value.strip()
+        if key == "Title":
+            header['title'] = value
+        elif key == "Plotname":
+            header['plotname'] = value
+        elif key == "Flags":
+            header['flags'] = value.split()[0]
+        elif key == "No. Variables":
+            header['num_vars'] = int(value)
+        elif key == "No. Points":
+            try:
+                header['num_points'] = int(value)
+            except ValueError:
+                # XYCE doesn't always fill in this field
+                header['num_points'] = None
+        elif key == "Variables":
+            in_vars = True
+
+
+def _next_title(mm, start):
+    """Returns the offset of the next plot header after *start*, or the size of the file."""
+    loc = mm.find(b'Title:', start)
+    return len(mm) if loc == -1 else loc
+
+
+def read_raw(path):
+    """ Reads all the plots from a Spice raw file.
+
+    Binary plots are memory mapped.  The last plot of a file that is still being written
+    (or was truncated) is clipped to the number of complete points on disk.
+
+    :param path: Path to the raw file
+    :return: A list of RawPlot objects, in the order they appear in the file.
+    """
+    size = os.path.getsize(path)
+    plots = []
+    counts = {}
+    if size == 0:
+        return plots
+
+    with open(path, "rb") as fp, mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        offset = 0
+        while offset < size:
+            fp.seek(offset)
+            header = read_header(fp)
+            if header is None:
+                break
+            start = fp.tell()
+
+            flags = header.get('flags', 'real')
+            if flags not in ("real", "complex"):
+                raise ValueError("Spice results were not formatted correctly: Flags={}".format(flags))
+
+            num_vars = header['num_vars']
+            num_points = header['num_points']
+
+            if header['format'] == "binary":
+                dtype = np.dtype(np.complex128 if flags == "complex" else np.float64)
+                row_size = num_vars*dtype.itemsize
+
+                if num_points:
+                    end = start + num_points*row_size
+                else:
+                    end = _next_title(mm, start)
+
+                # Clip to the data actually present on disk
+                end = min(end, size)
+                num_points = (end - start)//row_size
+                end = start + num_points*row_size
+
+                if num_points > 0:
+                    data = np.memmap(path, dtype=dtype, mode='r', offset=start, shape=(num_points, num_vars))
+                else:
+                    data = np.empty((0, num_vars), dtype=dtype)
+            else:
+                end = _next_title(mm, start)
+                data = parse_values(mm[start:end], num_vars, flags)
+
+            plotname = header.get('plotname')
+            kind = PLOT_NAMES.get(plotname, plotname)
+            counts[kind] = counts.get(kind, 0) + 1
+            plots.append(RawPlot(plotname=plotname, flags=flags, variables=header['variables'], data=data,
+                                 title=header.get('title'), number=counts[kind]))
+            offset = end
+
+    return plots
+
+
+def parse_values(block, num_vars, flags="real"):
+    """ Parses the data section of an ASCII raw file:
+
+        0	0.000000000000000e+00
+            1.200000000000000e+00
+        1	1.000000000000000e-10
+            1.199999999999999e+00
+
+    Complex values are written as 'real,imag' pairs.  Incomplete trailing points are dropped.
+    """
+    words = block.split()
+    cols = num_vars + 1
+    num_points = len(words)//cols
+    words = np.array(words[:num_points*cols]).reshape((num_points, cols))[:, 1:]
+
+    if flags == "complex":
+        parts = np.char.partition(words, b',')
+        return parts[..., 0].astype(float) + 1j*parts[..., 2].astype(float)
+    return words.astype(float)
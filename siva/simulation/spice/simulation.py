@@ -1,19 +1,48 @@
 import os
 import subprocess
-import struct
-import pdb
 
 import numpy as np
 
-from ..base_component import BaseComponent, ExecutionError
+from ..base_component import BaseComponent, ExecutionError, remove_work_area
 from .save import Save
 from ..base_component import Error
 from ..results import Results
+from .raw_file import read_raw
+from .ngspice_shared import NgSpiceShared, NgSpiceError
 
 class Simulation(BaseComponent):
 
     simulator_path = None
 
+    # When True, results are converted while the simulator is running so they
+    # can be inspected (and the simulation stopped) before it completes.
+    stream = False
+
+    # How often a streaming simulation checks for new results (in seconds)
+    poll_interval = 1.0
+
+    # StorageProfile (chunking/compression) of the results database.  None stores data contiguously.
+    storage = None
+
+    # Resources requested from the root's SlotManager before the simulator is launched.
+    # (Memory in the units of BaseComponent.max_memory, licenses as {feature: tokens})
+    slot_memory = 0
+    slot_licenses = None
+    slot_priority = 0
+
+    # A ResultCache.  When set, a simulation whose netlist, simulator and model files are unchanged
+    # reuses the cached results instead of running the simulator.
+    result_cache = None
+
+    # A Netlister.  When set, instance cards and subcircuit definitions are cached, and only
+    # those whose parameters changed are formatted again.
+    netlister = None
+
+    # Run simulations in this process with the ngspice shared library (See ngspice_shared), instead
+    # of launching simulator_path for each one.  True, or the path of libngspice.  If the library
+    # can't be loaded, simulator_path is used.
+    shared_library = False
+
     def __init__(self, parent=None, children=None, name='Simulation', params=None, measurements=None, work_dir=".",
                  log_file=None, disk_mgr=None, parallel=False):
 
@@ -24,6 +53,10 @@ class Simulation(BaseComponent):
 
         self.results_file = "sim.raw"
 
+        self._process = None
+        self._aborted = False
+        self._rows_loaded = {}
+
     def validate(self):
         """Ensure the simulation is setup correctly before processing to the netlist/simulation phase
         """
@@ -67,18 +100,23 @@ class Simulation(BaseComponent):
             txt.append('')
 
         if hasattr(self, 'instances'):
+            netlister = self.netlister
             if self.instances:
                 txt.append("** Instances **")
                 for inst in self.instances.values():
-                    txt.extend(inst.card())
+                    txt.extend(netlister.card(inst) if netlister else inst.card())
                 txt.append('')
 
             txt.append("** Subcircuit Definitions **")
-            for inst_list in self.instance_designs().values():
-                if inst_list[0]:
-                    card = inst_list[0].subckt_card()
+            if netlister:
+                designs = netlister.designs(self)
+            else:
+                designs = [inst_list[0] for inst_list in self.instance_designs().values()]
+            for design in designs:
+                if design:
+                    card = netlister.subckt_card(design) if netlister else design.subckt_card()
                     if card:
-                        txt.extend(inst_list[0].subckt_card())
+                        txt.extend(card)
             txt.append('')
 
         if hasattr(self,'saves'):
@@ -123,8 +161,9 @@ class Simulation(BaseComponent):
 
         path = os.path.join(self._work_dir, file_name)
         self.netlist_path = path
+        self._netlist = self.netlist()
         with open(path,'w') as netlist:
-            netlist.write(self.netlist())
+            netlist.write(self._netlist)
             self._files.append(path)
         return path
 
@@ -138,8 +177,24 @@ class Simulation(BaseComponent):
         self.info("Starting simulation: {}".format(self.path))
         self.validate()
         self.create_netlist()
+
+        cache = self.result_cache
+        if cache is not None:
+            cache_key = self.cache_key(cache)
+            if self.load_cached_results(cache, cache_key):
+                self.info("Using cached results: {}".format(self.path))
+                return
+
         self.log_file = os.path.join(self._work_dir, "sim.log")
 
+        ngspice = self.load_shared_library()
+        if ngspice is not None:
+            self.execute_shared(ngspice)
+            if cache is not None:
+                self.simulation_data.flush()
+                cache.store(cache_key, self.simulation_data.root_group)
+            return
+
         # The component is leaking file descriptors somewhere.  Perhaps the STDERR and STDOUT used by
         # the subprocess model are the problem.
         # Creating explicit STDERR and STDOUT files so they can be manually closed after the simulation is run.
@@ -151,19 +206,25 @@ class Simulation(BaseComponent):
         self.out_path = out_path
 
         self._files.extend([self.results_file, self.log_file, self.err_path, self.out_path, self.netlist_path])
+
+        # XYCE:
+        # cmd = [self.simulator_path, "-l", self.log_file, "-o", self.results_file, self.netlist_path]
+        # NGspice
+        cmd = [self.simulator_path, "-b", "-o", self.log_file, "-r", self.results_file, self.netlist_path]
         try:
-            # XYCE:
-            # result = subprocess.check_output([self.simulator_path, "-l", self.log_file, "-o", self.results_file, self.netlist_path], stderr=subprocess.STDOUT)
-            # NGspice
             """
             Need to take special care here on Windows machines:
             http://mihalop.blogspot.gr/2014/05/python-subprocess-and-file-descriptors.html
 
             """
-            result = subprocess.check_output([self.simulator_path, "-b", "-o", self.log_file, "-r", self.results_file, self.netlist_path],
-                                             stderr=err_fp, cwd=self._work_dir)
+            # Wait for a free CPU slot (and memory/licenses) before launching the simulator
+            with self.request_slot(memory=self.slot_memory, licenses=self.slot_licenses,
+                                   priority=self.slot_priority):
+                if self.stream:
+                    self.run_streaming(cmd, stdout=out_fp, stderr=err_fp)
+                else:
+                    result = subprocess.check_output(cmd, stderr=err_fp, cwd=self._work_dir)
 
-            pass
         except subprocess.CalledProcessError as e:
             msg = ["Simulation failed with error:", "    " +str(e.output), "    Return code: {}".format(e.returncode)]
             self.error("\n".join(msg))
@@ -180,13 +241,76 @@ class Simulation(BaseComponent):
             raise
         self.info("Simulation finished: {}".format(self.path))
         try:
-            self.sim_results = self.load_results(self.results_file)
+            if self.stream:
+                # Pick up whatever was written between the last poll and the end of the simulation
+                self.update_results(final=True)
+            else:
+                self.sim_results = self.load_results(self.results_file)
         except FileNotFoundError:
             self.error("No results for:", self._work_dir)
             raise ExecutionError("Results file not found.")
         except Exception as e:
             raise ExecutionError("Could not parse results: {} -- {}: {}/{}".format(e.args, self.path, self._work_dir, self.results_file))
 
+        if cache is not None:
+            self.simulation_data.flush()
+            cache.store(cache_key, self.simulation_data.root_group)
+
+    def load_shared_library(self):
+        """Returns the ngspice shared library, if shared_library is set and it can be loaded."""
+        if not self.shared_library:
+            return None
+        ngspice = NgSpiceShared.load(None if self.shared_library is True else self.shared_library)
+        if ngspice is None:
+            self.info("ngspice shared library not found.  Using {}".format(self.simulator_path))
+        return ngspice
+
+    def execute_shared(self, ngspice):
+        """ Runs the netlist in this process, with the ngspice shared library.  The results are
+        read from memory, instead of a raw file.  The simulator's output is saved in the log file.
+        """
+        self._files.extend([self.log_file, self.netlist_path])
+        output = []
+        try:
+            with self.request_slot(memory=self.slot_memory, licenses=self.slot_licenses,
+                                   priority=self.slot_priority):
+                plots, output = ngspice.run(self._netlist.splitlines())
+        except NgSpiceError as e:
+            output = ngspice.last_output
+            self.error("Simulation failed with error:\n    {}".format(e))
+            raise ExecutionError("Simulation failed: {}".format(self.path))
+        finally:
+            with open(self.log_file, 'w') as fp:
+                fp.write("\n".join(output))
+
+        self.info("Simulation finished: {}".format(self.path))
+        self.save_results(plots)
+
+    def model_files(self):
+        """Returns the paths of the files included by the netlist."""
+        files = [include.path for include in getattr(self, 'includes', None) or []]
+        files.extend(lib.path for lib in getattr(self, 'libs', None) or [])
+        return files
+
+    def cache_key(self, cache):
+        """Returns the key of this simulation in a ResultCache."""
+        with open(self.netlist_path, 'rb') as fp:
+            netlist = fp.read()
+        return cache.key(netlist, self.simulator_path, self.model_files())
+
+    def load_cached_results(self, cache, key, output_file="sim.hdf5"):
+        """Copies cached results into this simulation's Results database.  Returns False on a cache miss.
+        """
+        src = cache.open(key)
+        if src is None:
+            return False
+        with src:
+            results = self.open_results(output_file)
+            cache.copy(src, results.root_group)
+        results.flush()
+        self.simulation_data = results
+        return True
+
     def load_results(self, results_file, output_file="sim.hdf5"):
         """Reads the Python native, but simulator specific simulation results
         and converts it into a high level set of simulation results.
@@ -195,52 +319,195 @@ class Simulation(BaseComponent):
         assert os.path.exists(results_path)
 
         sim_results = self.load_raw_results(results_file)
+        self.save_results(sim_results, output_file)
 
-        results = Results(os.path.join(self._work_dir,output_file),'w-')
+    def save_results(self, sim_results, output_file="sim.hdf5"):
+        """Stores the results of each analysis (See load_raw_results) in this simulation's Results database."""
+        results = self.open_results(output_file)
 
         for results_name, raw_data in sim_results.items():
-            root = results.select(results_name)     #Tran, AC, DC, etc
+            self.store_results(results, results_name, raw_data)
+
+        results.flush()
+        self.simulation_data = results
+
+    def open_results(self, output_file="sim.hdf5"):
+        """Creates the Results database for this simulation.
+
+        If the root component aggregates results, they are stored in this simulation's
+        variant group of the aggregate database, rather than in a file in the work area.
+        """
+        archive = self.results_archive
+        if archive is not None:
+            return archive.open_variant(self.path.replace('.', '/'))
+        return Results(os.path.join(self._work_dir, output_file), 'w-', storage=self.storage)
 
-            if results_name == "op":
-                # Operating point data is a scalar, without an index
-                for entry in raw_data:
+    def store_results(self, results, results_name, raw_data, resizable=False):
+        """Adds the raw data of one analysis to the Results database.
+        """
+        root = results.select(results_name)     #Tran, AC, DC, etc
+
+        if results_name == "op":
+            # Operating point data is a scalar, without an index
+            for entry in raw_data:
+                (output_type, path, node) = self.parse_results_entry(entry)
+                full_path = "/".join(path + [node])
+                # Operating point paths can be a little weird.  E.g.:  'm.x_dut.m1_p#dbody'
+                # Lets make the path a little friendlier
+                results.add_scalar(path=full_path, name=output_type, value=raw_data[entry][0])
+        else:
+            index=None
+            # Search for the index first
+            for entry in raw_data:
+                # Entry will be either a keyword:  TIME, FREQ, V etc.
+                if entry.lower() in ("time","frequency"):
+                    # Set the shared index as a vector in the root of the hierarchy.  Variants of an aggregate
+                    # database store identical indices once.
+                    index = results.add_vector(path="/{}".format(results_name),
+                                               vector=self._index_data(entry, raw_data[entry]),
+                                               name=entry.lower(), resizable=resizable,
+                                               shared=results.variant is not None)
+                    index.attrs['name']=entry.lower()
+
+            if index is None:
+                raise ValueError("Results database does not have in index")
+
+            for entry in raw_data:
+                if '(' in entry:
+                    # For the remaining waveforms, add them as a waveform, but provide
+                    # a reference to the shared index.
                     (output_type, path, node) = self.parse_results_entry(entry)
                     full_path = "/".join(path + [node])
-                    # Operating point paths can be a little weird.  E.g.:  'm.x_dut.m1_p#dbody'
-                    # Lets make the path a little friendlier
-                    results.add_scalar(path=full_path, name=output_type, value=raw_data[entry][0])
-            else:
-                index=None
-                # Search for the index first
-                for entry in raw_data:
-                    # Entry will be either a keyword:  TIME, FREQ, V etc.
-                    if entry.lower() in ("time","frequency"):
-                        # AC simulation data is complex, which doesn't really make sense for the index
-                        # and prevents interpolation methods from working correctly.
-                        if entry.lower() == "frequency":
-                            data = abs(raw_data[entry])
-                        else:
-                            data = raw_data[entry]
-
-                        # Set the shared index as a vector in the root of the hierarchy
-                        index = results.add_vector(path="/{}".format(results_name),
-                                                   vector=data, name=entry.lower())
-                        index.attrs['name']=entry.lower()
-
-                if index is None:
-                    raise ValueError("Results database does not have in index")
-
-                for entry in raw_data:
-                    if '(' in entry:
-                        # For the remaining waveforms, add them as a waveform, but provide
-                        # a reference to the shared index.
-                        (output_type, path, node) = self.parse_results_entry(entry)
-                        full_path = "/".join(path + [node])
-                        results.add_waveform(path=full_path, y=raw_data[entry], x=index,
-                                             y_name=output_type, x_name=index.attrs['name'])
+                    results.add_waveform(path=full_path, y=raw_data[entry], x=index,
+                                         y_name=output_type, x_name=index.attrs['name'], resizable=resizable)
 
-        results.flush()
-        self.simulation_data = results
+    @staticmethod
+    def _index_data(entry, data):
+        # AC simulation data is complex, which doesn't really make sense for the index
+        # and prevents interpolation methods from working correctly.
+        if entry.lower() == "frequency":
+            return abs(data)
+        return data
+
+    # ---------------------------------------------------------
+    #                      Streaming
+    # ---------------------------------------------------------
+    def run_streaming(self, cmd, stdout=None, stderr=None):
+        """Runs the simulator in the background, converting the raw file into the Results
+        database every *poll_interval* seconds while the simulator is running.
+
+        After each update, the *on_progress* method is called with the partial results.
+        If it returns False the simulation is killed and an ExecutionError is raised.
+        """
+        # A new run:  Nothing has been loaded, and it hasn't been killed
+        if self.simulation_data is not None:
+            self.simulation_data.close()
+            self.simulation_data = None
+        self._rows_loaded = {}
+        self._aborted = False
+
+        self._process = subprocess.Popen(cmd, stdout=stdout, stderr=stderr, cwd=self._work_dir)
+        try:
+            while True:
+                try:
+                    returncode = self._process.wait(timeout=self.poll_interval)
+                    break
+                except subprocess.TimeoutExpired:
+                    pass
+
+                self.update_results()
+                if self.simulation_data is not None and self.on_progress(self.simulation_data) is False:
+                    self.kill()
+        finally:
+            if self._process.poll() is None:
+                self._process.kill()
+                self._process.wait()
+
+        if self._aborted:
+            raise ExecutionError("Simulation aborted: {}".format(self.path))
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd)
+
+    def update_results(self, final=False, output_file="sim.hdf5"):
+        """Appends the points written to the raw file since the last update to the Results database.
+
+        Operating point results are only stored once the simulation is finished.
+        """
+        results_path = os.path.join(self._work_dir, self.results_file)
+        if not os.path.exists(results_path):
+            return
+
+        with self.lock:
+            if self.simulation_data is None:
+                self.simulation_data = self.open_results(output_file)
+                self._rows_loaded = {}
+            results = self.simulation_data
+
+            for plot in read_raw(results_path):
+                name = plot.analysis
+                if name == "op" and not final:
+                    continue
+
+                start = self._rows_loaded.get(name)
+                if start is None:
+                    self.store_results(results, name, plot.as_dict(), resizable=(name != "op"))
+                elif plot.num_points > start:
+                    self.append_results(results, name, plot, start)
+                self._rows_loaded[name] = plot.num_points
+                del plot
+
+            results.flush()
+
+    def append_results(self, results, results_name, plot, start):
+        """Extends the (resizable) datasets of an analysis with the points of *plot* from *start* onwards.
+        """
+        root = results.root_group[results_name]
+        for entry, data in plot.items():
+            if entry.lower() in ("time", "frequency"):
+                results.extend(root[entry.lower()], self._index_data(entry, data[start:]))
+            elif '(' in entry:
+                (output_type, path, node) = self.parse_results_entry(entry)
+                results.extend(root["/".join(path + [node, output_type])], data[start:])
+
+    def partial_results(self):
+        """Returns the results collected so far.  While a streaming simulation is running,
+        this is a Results database that grows as the simulator writes more data.
+        """
+        return self.simulation_data
+
+    @property
+    def progress(self):
+        """Fraction of the transient simulation that has completed, or None if unknown.
+        """
+        results = self.simulation_data
+        if results is None:
+            return None
+        root = results.root_group
+        if 'tran' not in root or 'time' not in root['tran']:
+            return None
+
+        stop = None
+        for analysis in self.analyses:
+            if analysis.analysis_name == "tran":
+                stop = analysis.stop
+        time = root['tran']['time']
+        if not stop or time.shape[0] == 0:
+            return None
+        return min(time[-1]/stop, 1.0)
+
+    def on_progress(self, results):
+        """Called with the partial results each time a streaming simulation is updated.
+        Subclasses can override this to inspect early data, and return False to stop a
+        simulation that has obviously failed.
+        """
+        return True
+
+    def kill(self):
+        """Stops a running streaming simulation."""
+        if self._process is not None and self._process.poll() is None:
+            self._aborted = True
+            self.warn("Killing simulation: {}".format(self.path))
+            self._process.kill()
 
     @staticmethod
     def parse_results_entry(entry):
@@ -282,120 +549,24 @@ class Simulation(BaseComponent):
 
             return (output_type.lower(), path, node_net.lower())
 
-    def load_raw_results(self, results_file, format="binary",):
+    def load_raw_results(self, results_file):
         """Parse the Spice output file and converts it into a low level, simulator specific,
         native Python format (Numpy arrays)
+
+        The binary section of the raw file is memory mapped, so the arrays returned are
+        views onto the file rather than copies held in memory.
         """
         results_path = os.path.join(self._work_dir, results_file)
-        if format == "binary":
-            with open(results_path, "rb") as fp:
-                byte_block = fp.read()
-
-            # See how many different analyses results are present
-            loc = 0
-            locs = []
-            while True:
-                loc = byte_block.find(bytes('Title:', "utf-8"), loc)
-                if loc == -1:
-                    break
-                locs.append(loc)
-                loc += 1
-                
-            blocks = []
-
-            for i in range(len(locs[:-1])):
-                blocks.append(byte_block[locs[i]:locs[i-1]])
-            blocks.append(byte_block[locs[-1]:])
-
-            results = {}
-            for block in blocks:
-                name, data = self.parse_byte_block(block)
-                results[name] = data
-
-        return results
-
-    def parse_byte_block(self, byte_block):
-        marker = bytes('Binary:\n', "utf-8")
-        start = byte_block.find(marker) + len(marker)
-        header = str(byte_block[:start])
-        lines = header.split("\\n")
-        data = byte_block[start:]
-
-        size = len(data)/len(struct.pack('d',0.0))
-        format = "{}d".format(int(size))
-
-        # Parse the header to get wave names, number of vars and points
-        headers = {}
-        VARS_FOUND = False
-        data_format = None
-        for line in lines:
-            if line == "Binary:":
-                break
-            elif "No. Variables:" in line:
-                num_vars = int(line.split(":")[1])
-            elif "No. Points:" in line:
-                try:
-                    num_points = int([l for l in lines if "No. Points" in l][0].split(":")[1])
-                except ValueError:
-                    # XYCE doesn't always fill in this field
-                    num_points = None
-            elif "Flags:" in line:
-                data_format = line.split(":")[1].strip()
-            elif "Plotname:" in line:
-                key = line.split(":")[1].strip()
-                analysis = {'AC Analysis':'ac',
-                            'AC Operating Point':'op',
-                            }[key]
-
-            elif line == "Variables:":
-                VARS_FOUND = True
-                continue
-            elif VARS_FOUND:
-                """
-                Variables:
-                0	frequency	frequency	grid=3
-                1	v(g)	voltage
-                2	v(d)	voltage
-                3	v(s)	voltage
-                4	v(vdd)	voltage
-                5	v(m_dut#gate)	voltage
-                """
-                txt = line.replace("\\t", " ")
-                n, *rest = txt.split()
-                headers[int(n)] = (int(n), rest[0], rest[1])
-            else:
-                continue
-
-        if data_format == "real":
-            cols_per_value = 1
-        elif data_format == "complex":
-            cols_per_value = 2
-        else:
-            self.error("Spice results file were not formatted properly. ({})".format(self.path))
-            raise ValueError("Spice results were not formatted correctly.")
-
         try:
-            array = np.array(struct.unpack(format, bytes(data)))
-        except:
-            self.error("Cannot parse sim results: {}".format(self.path))
+            plots = read_raw(results_path)
+        except ValueError:
+            self.error("Spice results file were not formatted properly. ({})".format(self.path))
             raise
 
-        if num_points is None:
-            num_points = int(len(array)/(num_vars*cols_per_value))
-
-        try:
-            data = array.reshape((num_points, num_vars*cols_per_value))
-        except:
-            raise
         results = {}
-        for n in headers:
-            n, name, sig_type = headers[n]
-            if data_format == "real":
-                results[name] = data[:,n]
-            else:
-                results[name] = data[:,2*n] + data[:,2*n+1]*1j
-        return analysis, results
-
+        for plot in plots:
+            results[plot.analysis] = plot.as_dict()
+        return results
 
     def clean(self):
         if self.simulation_data:
@@ -405,3 +576,19 @@ class Simulation(BaseComponent):
             super().clean()
         except PermissionError:
             self.error("Could not delete {}.  Moving on...".format(self._work_dir))
+
+    def deferred_clean(self):
+        simulation_data = self.simulation_data
+        work_dir = self._work_dir
+        work_dir_resource = self._work_dir_resource
+        # Not self.error, which would keep this component
+        error = self.root.master.error
+
+        def clean():
+            if simulation_data:
+                simulation_data.close()
+            try:
+                remove_work_area(work_dir, work_dir_resource)
+            except PermissionError:
+                error("Could not delete {}.  Moving on...".format(work_dir))
+        return clean
@@ -1,19 +1,215 @@
 import os
+import numbers
 
 from collections import OrderedDict
 from siva.utilities.conversions import float_to_eng
 import numpy as np
 
+
+class Column:
+    """ A column of table data, stored in a typed Numpy array.
+
+    The array's capacity doubles as rows are added.  Cells that have not been assigned a value
+    are marked as missing in a validity mask, and are returned as None.  The data type is
+    inferred from the values:  bool, int64, float64, complex128, or object for anything else
+    (strings, waveforms, etc.).  Integer columns are promoted to float, and numeric columns to
+    object, if incompatible values are added.
+
+    *values* is a zero-copy view of the data.  Missing cells are NaN in float columns.  Integer and
+    bool arrays can't mark missing cells, so while cells are missing their values are a float copy,
+    with NaN in the missing cells.  (A failed variant is NaN, not a measurement of 0.)  The column
+    itself keeps its type.
+    """
+    def __init__(self, values=None, table=None):
+        self.table = table
+        self._data = np.empty(0, dtype=float)
+        self._valid = np.zeros(0, dtype=bool)
+        self._len = 0
+        self._has_values = False
+        if values is not None:
+            self.extend(values)
+
+    @staticmethod
+    def dtype_of(value):
+        if isinstance(value, (bool, np.bool_)):
+            return np.dtype(bool)
+        elif isinstance(value, numbers.Integral):
+            return np.dtype(np.int64)
+        elif isinstance(value, numbers.Real):
+            return np.dtype(np.float64)
+        elif isinstance(value, numbers.Complex):
+            return np.dtype(np.complex128)
+        return np.dtype(object)
+
+    @staticmethod
+    def missing_value(dtype):
+        if dtype.kind in 'fc':
+            return np.nan
+        elif dtype.kind == 'O':
+            return None
+        return 0
+
+    @property
+    def dtype(self):
+        return self._data.dtype
+
+    @property
+    def values(self):
+        values = self._data[:self._len]
+        if self.dtype.kind in 'biu':
+            valid = self._valid[:self._len]
+            if not valid.all():
+                values = values.astype(np.float64)
+                values[~valid] = np.nan
+        return values
+
+    @property
+    def valid(self):
+        return self._valid[:self._len]
+
+    def __len__(self):
+        return self._len
+
+    def __array__(self, dtype=None):
+        if dtype is None:
+            return self.values
+        return self.values.astype(dtype)
+
+    def __getitem__(self, key):
+        if isinstance(key, numbers.Integral):
+            if key < 0:
+                key += self._len
+            if not 0 <= key < self._len:
+                raise IndexError("Column only has {} rows. Row {} requested.".format(self._len, key + 1))
+            if not self._valid[key]:
+                return None
+            value = self._data[key]
+            return value if self.dtype.kind == 'O' else value.item()
+        return self.values[key]
+
+    def __setitem__(self, row, value):
+        if row < 0:
+            row += self._len
+        self._set_dtype(self.dtype_of(value))
+        if row >= self._len:
+            self.resize(row + 1)
+        self._data[row] = value
+        self._valid[row] = True
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield self[i]
+
+    def tolist(self):
+        return list(self)
+
+    def append(self, value):
+        self[self._len] = value
+
+    def extend(self, values, rows=None):
+        """ Sets many cells at once.  If *rows* is None, *values* are appended to the column.
+        """
+        if isinstance(values, np.ndarray) and values.ndim == 1 and values.dtype.kind in 'biufc':
+            if values.dtype.kind in 'iu':
+                values = values.astype(np.int64, copy=False)
+        else:
+            values = list(values)
+            dtypes = set(self.dtype_of(v) for v in values)
+            if all(dtype.kind in 'bifc' for dtype in dtypes) and dtypes:
+                values = np.array(values, dtype=np.result_type(*dtypes))
+            else:
+                # Keep strings and other objects (arrays, waveforms) as Python objects
+                obj = np.empty(len(values), dtype=object)
+                for i, value in enumerate(values):
+                    obj[i] = value
+                values = obj
+
+        if rows is None:
+            rows = np.arange(self._len, self._len + len(values))
+        else:
+            rows = np.asarray(rows, dtype=np.int64)
+        if len(rows) == 0:
+            return
+        self._set_dtype(values.dtype)
+
+        stop = int(rows.max()) + 1
+        if stop > self._len:
+            self.resize(stop)
+        self._data[rows] = values
+        self._valid[rows] = True
+
+    def resize(self, length):
+        """Grows the column to *length* rows.  New cells are missing."""
+        if length <= self._len:
+            return
+        self._reserve(length)
+        self._data[self._len:length] = self.missing_value(self.dtype)
+        self._len = length
+        if self.table is not None and length > self.table._num_rows:
+            self.table._num_rows = length
+
+    def take(self, index):
+        """Reorders the rows of the column."""
+        index = np.asarray(index)
+        self._data[:len(index)] = self._data[index]
+        self._valid[:len(index)] = self._valid[index]
+
+    def _reserve(self, length):
+        capacity = len(self._data)
+        if length <= capacity:
+            return
+        while capacity < length:
+            capacity = max(16, 2*capacity)
+        self._realloc(capacity, self.dtype)
+
+    def _realloc(self, capacity, dtype):
+        data = np.empty(capacity, dtype=dtype)
+        if dtype.kind == 'O' and self.dtype.kind != 'O':
+            # Convert Numpy scalars back to Python values
+            data[:self._len] = [v if ok else None for v, ok in zip(self._data[:self._len].tolist(),
+                                                                   self._valid[:self._len])]
+        else:
+            data[:self._len] = self._data[:self._len]
+        valid = np.zeros(capacity, dtype=bool)
+        valid[:self._len] = self._valid[:self._len]
+        self._data, self._valid = data, valid
+
+    def _set_dtype(self, dtype):
+        """Changes the column's data type, if needed, to hold values of *dtype*."""
+        current = self.dtype
+        if not self._has_values:
+            # No data yet.  Use the new values' type.
+            new = dtype
+        elif current == dtype or current.kind == 'O':
+            return
+        elif current.kind in 'biufc' and dtype.kind in 'biufc':
+            new = np.result_type(current, dtype)
+            if new == current:
+                return
+        else:
+            new = np.dtype(object)
+
+        self._has_values = True
+        if new != current:
+            self._realloc(len(self._data), new)
+            self._data[~self._valid] = self.missing_value(new)
+
+
 class Table:
-    """ Simple table structure implemented a table as a dict of lists.
+    """ A table of data, stored as a dictionary of typed, growable columns. (See Column)
     Used as a temporary storage for simulation data for conversion to
     pytables or h5py
     """
     def __init__(self, columns=None):
         self.columns = OrderedDict()
+        self._num_rows = 0
+
+        # Streaming storage (See attach).  If retain is False, rows are only written to the sink.
+        self.sink = None
+        self.retain = True
         if columns is not None:
             for col_name in columns:
-                self.columns[col_name] = []
+                self.columns[col_name] = Column(table=self)
         # Default printed column width.  Place holder for more explicit formatting
         # options that will be developed later
         self.w = 8
@@ -33,7 +229,7 @@ class Table:
             for key in values_dict.keys():
                 # Create the column dict if it does not already exist.
                 if key not in self.columns:
-                    self.columns[key] = []
+                    self.columns[key] = Column(table=self)
         # Handle a list of values
         else:
             values_list = columns
@@ -44,14 +240,82 @@ class Table:
 
         # Now handle the row argument.  If the row is None, append the data
         if row is None:
-            for key in self.columns.keys():
-                self.columns[key].append(values_dict[key])
+            row = self._num_rows
+
+        if self.sink is not None:
+            self.sink.write([values_dict], [row])
+            if not self.retain:
+                self._num_rows = max(self._num_rows, row + 1)
+                return
+
+        for key, col in self.columns.items():
+            if key in values_dict:
+                col[row] = values_dict[key]
+            else:
+                col.resize(row + 1)
+
+    def add_rows(self, records, rows=None):
+        """ Adds many rows at once.  *records* is a list of dictionaries of column/value pairs, and
+        *rows* the row number of each.  If *rows* is None, the records are appended to the table.
+
+        Each column is updated with a single vectorized assignment.
+        """
+        if len(records) == 0:
+            return
+        if rows is None:
+            rows = np.arange(self._num_rows, self._num_rows + len(records))
         else:
-            for key, col in self.columns.items():
-                while len(col) < row + 1:
-                    col.append(None)
-                if key in values_dict:
-                    col[row] = values_dict[key]
+            rows = np.asarray(rows, dtype=np.int64)
+
+        stop = int(rows.max()) + 1
+        if self.sink is not None:
+            self.sink.write(records, rows)
+            if not self.retain:
+                self._num_rows = max(self._num_rows, stop)
+                return
+
+        names = OrderedDict()
+        for record in records:
+            for key in record:
+                names[key] = None
+        for key in names:
+            if key not in self.columns:
+                self.columns[key] = Column(table=self)
+
+        for key, col in self.columns.items():
+            if key in names:
+                have = [i for i, record in enumerate(records) if key in record]
+                if len(have) == len(records):
+                    col.extend([record[key] for record in records], rows)
+                else:
+                    col.extend([records[i][key] for i in have], rows[have])
+            col.resize(stop)
+
+    def attach(self, sink, retain=True):
+        """ Streams the rows of this table to a sink (See siva.simulation.sinks), as they are added.
+
+        Rows already saved by the sink are loaded into the table.  If *retain* is False, rows
+        are not kept in memory, only written to the sink.
+        """
+        self.sink = sink
+        self.retain = retain
+
+        columns, rows = sink.read()
+        if len(rows) == 0:
+            return
+        self._num_rows = max(self._num_rows, int(rows.max()) + 1)
+        if retain:
+            for name, values in columns.items():
+                if name not in self.columns:
+                    self.columns[name] = Column(table=self)
+                self.columns[name].extend(values, rows)
+            for col in self.columns.values():
+                col.resize(self._num_rows)
+
+    def flush(self):
+        """Writes the rows buffered by the sink."""
+        if self.sink is not None:
+            self.sink.flush()
 
     def add_column(self, column):
         """ Adds one or more columns to this table.  Columns must be specified
@@ -62,9 +326,15 @@ class Table:
             if name in self.columns:
                 raise ValueError("Column {} already exists in this table.".format(name))
 
-            self.columns[name] = column[name]
+            self.columns[name] = Column(column[name], table=self)
 
 
+    def set_column(self, name, values):
+        """Sets a column to *values*, one per row, replacing the column if it already exists."""
+        column = Column(table=self)
+        column.extend(values, rows=np.arange(len(values)))
+        column.resize(self._num_rows)
+        self.columns[name] = column
 
     def __str__(self):
         # Check for empty table
@@ -87,9 +357,8 @@ class Table:
             # line = "  ".join(col_format.format(c[row_num]) for c in self.columns.values())
             for col in self.columns.values():
                 # Handle missing data
-                if len(col) > row_num:
-                    value = col[row_num]
-                else:
+                value = col[row_num] if len(col) > row_num else None
+                if value is None:
                     value = "----"
                 if not type(value) is str:
                     try:
@@ -107,17 +376,16 @@ class Table:
 
     @property
     def num_rows(self):
-        if len(self.columns) == 0:
-            return 0
-        return max([len(col) for col in self.columns.values()])
+        return self._num_rows
 
     @property
     def is_empty(self):
         return self.num_rows == 0
 
     def __getitem__(self, item):
+        """Returns a column's values as an array.  The array is a view, not a copy."""
         if item in self.columns:
-            return np.array(self.columns[item])
+            return self.columns[item].values
 
         raise KeyError("Table does not have a column named {}".format(item))
 
@@ -128,8 +396,8 @@ class Table:
         if row > len(self) - 1:
             raise IndexError("Table only has {} rows. Row {} requested.".format(len(self), row + 1))
         row_dict = OrderedDict()
-        for column in self.columns:
-            row_dict[column] = self.columns[column][row]
+        for name, column in self.columns.items():
+            row_dict[name] = column[row] if row < len(column) else None
         return row_dict
 
     def __iter__(self):
@@ -184,7 +452,7 @@ class Table:
             ds = fp.create_group(group)
 
         for col in self.columns:
-            data = self.columns[col]
+            data = self.columns[col].values
 
             try:
                 ds[col] = data
@@ -192,7 +460,7 @@ class Table:
                 # HDF5 does not support Numpy's unicode strings directly.
                 # See http://docs.h5py.org/en/latest/strings.html#exceptions-for-python-3 for more info
                 if type(data[0]) is str:
-                    ds[col] = np.string_(data)
+                    ds[col] = np.array([str(v) for v in data], dtype='S')
         fp.close()
         return True
 
@@ -210,17 +478,17 @@ class Table:
     def sort(self, column):
         """Sorts the rows in a table by the values in the given column
         """
-        import numpy as np
-        index = np.array(self.columns[column]).argsort()
-        for column in self.columns:
-            self.columns[column] = np.array(self.columns[column])[index]
+        index = self.columns[column].values.argsort(kind='mergesort')
+        for column in self.columns.values():
+            column.resize(self._num_rows)
+            column.take(index)
 
 
     def dataframe(self):
         """Returns the table data as a Pandas DataFrame object
         """
         import pandas as pd
-        return pd.DataFrame(self.columns)
+        return pd.DataFrame(OrderedDict((name, col.values) for name, col in self.columns.items()))
 
 
     def select(self, columns, where=True, group_by=None):
@@ -237,6 +505,8 @@ class Table:
 
 
     def close(self):
-        pass
+        if self.sink is not None:
+            self.sink.close()
+            self.sink = None
 
 
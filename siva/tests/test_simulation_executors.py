@@ -0,0 +1,63 @@
+import time
+import threading
+
+import pytest
+
+from siva.simulation import executors
+from siva.simulation.executors import WorkerPoolExecutor
+
+
+def shutdown_within(executor, timeout=30):
+    thread = threading.Thread(target=executor.shutdown, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return not thread.is_alive()
+
+
+def square(x):
+    return x*x
+
+
+@pytest.fixture
+def slow_workers(monkeypatch):
+    # Workers connect after the executor is shut down
+    serve = executors.serve
+
+    def slow_serve(*args):
+        time.sleep(0.5)
+        serve(*args)
+    monkeypatch.setattr(executors, 'serve', slow_serve)
+
+
+def test_pool_shutdown_without_jobs(slow_workers):
+    # Workers that haven't connected yet are still accepted, and told to stop
+    pool = WorkerPoolExecutor(max_workers=8)
+    assert shutdown_within(pool)
+    assert [p.exitcode for p in pool._processes] == [0]*8
+
+
+def test_pool_short_sweep(slow_workers):
+    # Fewer jobs than workers
+    pool = WorkerPoolExecutor(max_workers=4)
+    futures = [pool.submit(square, i) for i in range(2)]
+    assert shutdown_within(pool)
+    assert [f.result() for f in futures] == [0, 1]
+
+    with pytest.raises(RuntimeError):
+        pool.submit(square, 3)
+
+
+def test_pool_unpicklable_job():
+    # A job that can't be sent fails its future.  The worker takes the next job.
+    pool = WorkerPoolExecutor(max_workers=1)
+    try:
+        bad = pool.submit(lambda: 1)
+        with pytest.raises(Exception):
+            bad.result(timeout=30)
+        assert pool.submit(square, 3).result(timeout=30) == 9
+
+        # Nor can a result that can't be returned
+        assert isinstance(pool.submit(threading.Lock).exception(timeout=30), RuntimeError)
+        assert pool.submit(square, 4).result(timeout=30) == 16
+    finally:
+        assert shutdown_within(pool)
@@ -1,5 +1,6 @@
 import pytest
 import logging
+import json
 import os
 
 xfail = pytest.mark.xfail
@@ -245,3 +246,215 @@ def test_hierarchical_loops(hierarchical_loops):
 
 
 
+
+
+def test_checkpoint(tmpdir):
+    path = str(tmpdir.join('loop.ckpt'))
+
+    def run(loop):
+        finished = []
+        variant_finished = loop.variant_finished
+        loop.variant_finished = lambda v: finished.append(v.index) or variant_finished(v)
+        loop.checkpoint = path
+        loop.start()
+        return finished
+
+    def make_loop():
+        a = LoopVariable(name='int', target='Loop.int_var', start=1, stop=9, step=2)
+        b = LoopVariable(name='float', target='Loop.float_var', start=-2., stop=2., n=3)
+        m1 = Measurement(name='int_result', expr='Loop.int_var')
+        return LoopComponent(parent=None, vars=[a, b], name='Loop', measurements=[m1], work_dir=None)
+
+    assert len(run(make_loop())) == 15
+
+    # Simulate a run that was killed part way through writing an entry
+    with open(path) as fp:
+        lines = fp.readlines()
+    with open(path, 'w') as fp:
+        fp.writelines(lines[:7])
+        fp.write(lines[7][:10])
+
+    kept = set(json.loads(line)['index'] for line in lines[1:7])
+
+    loop = make_loop()
+    assert sorted(run(loop)) == sorted(set(range(15)) - kept)
+    assert len(loop.results) == 15
+    assert list(loop.results['int']) == [1]*3 + [3]*3 + [5]*3 + [7]*3 + [9]*3
+    assert list(loop.results['float']) == [-2., 0., 2.]*5
+
+    # A different sweep starts over
+    loop = make_loop()
+    loop.loop_vars['float'].values = np.array([-1., 0., 1.])
+    assert len(run(loop)) == 15
+
+
+def test_lightweight_variants(simple_loop):
+    simple_loop.lightweight_variants = True
+    simple_loop.start()
+    results = simple_loop.results
+
+    assert len(results) == 45
+    assert list(results['int'][:9]) == [1]*9
+    assert list(results['int_result']) == list(results['int'])
+    assert list(results['str_result']) == list(results['str'])
+    assert list(simple_loop.results['float'][:4]) == [-2., -2., -2., 0.]
+
+
+def test_batch_measurements():
+    from siva.waveforms import Wave
+    t = np.linspace(0, 1, 51)
+
+    class WaveLoop(LoopComponent):
+        @property
+        def out(self):
+            return Wave(x=t, y=self.float_var*t + self.int_var)
+
+    a = LoopVariable(name='int', target='Loop.int_var', start=1, stop=9, step=2)
+    b = LoopVariable(name='float', target='Loop.float_var', start=-2., stop=2., n=3)
+    out = Measurement(name='out', expr='Loop.out')
+    final = Measurement(name='final', expr='out(1.0) - int', batch=True)
+    peak = Measurement(name='peak', expr='out.max()', batch=True)
+    loop = WaveLoop(parent=None, vars=[a, b], name='Loop', measurements=[out, final, peak], work_dir=None)
+    loop.start()
+
+    results = loop.results
+    assert len(results) == 15
+    np.testing.assert_allclose(results['final'], results['float'])
+    np.testing.assert_allclose(results['peak'], results['int'] + np.maximum(results['float'], 0))
+
+
+def test_clean_after_final():
+    events = []
+
+    class CleanLoop(LoopComponent):
+        def final(self):
+            events.append('final')
+
+        def clean(self):
+            events.append('clean')
+
+    def make_loop():
+        a = LoopVariable(name='int', target='Loop.int_var', start=1, stop=9, step=2)
+        m1 = Measurement(name='int_result', expr='Loop.int_var')
+        return CleanLoop(parent=None, vars=[a], name='Loop', measurements=[m1], work_dir=None)
+
+    make_loop().start()
+    assert events == ['final'] + ['clean']*5
+
+    del events[:]
+    loop = make_loop()
+    loop.clean_early = True
+    loop.start()
+    assert events == ['clean']*5 + ['final']
+
+
+def test_nested_lightweight_variants():
+    x = LoopVariable(name='x', target='Outer.xv', values=[1, 2])
+    y = LoopVariable(name='y', target='Inner.yv', values=[10, 20, 30])
+    prod = Measurement(name='prod', expr='Inner.yv * Outer.xv')
+
+    inner = LoopComponent(parent=None, vars=[y], name='Inner', measurements=[prod], work_dir=None)
+    outer = LoopComponent(parent=None, vars=[x], name='Outer', children=[inner], work_dir=None)
+    inner.lightweight_variants = True
+    outer.lightweight_variants = True
+
+    products = {}
+    variant_finished = outer.variant_finished
+    outer.variant_finished = lambda v: products.update({v.index: list(v.Inner.results['prod'])}) or variant_finished(v)
+    outer.start()
+
+    # Each outer iteration's copy of the inner loop has its own results, as with clone()
+    assert len(inner.results) == 0
+    assert products == {0: [10, 20, 30], 1: [20, 40, 60]}
+
+
+def test_nested_checkpoint(tmpdir):
+    def make_loop(xs=(1, 2)):
+        x = LoopVariable(name='x', target='Outer.xv', values=list(xs))
+        y = LoopVariable(name='y', target='Inner.yv', values=[10, 20, 30])
+        prod = Measurement(name='prod', expr='Inner.yv * Outer.xv')
+        inner = LoopComponent(parent=None, vars=[y], name='Inner', measurements=[prod], work_dir=str(tmpdir))
+        inner.checkpoint = 'ck.jsonl'
+        outer = LoopComponent(parent=None, vars=[x], name='Outer', children=[inner], work_dir=str(tmpdir))
+
+        products = {}
+        variant_finished = outer.variant_finished
+        outer.variant_finished = lambda v: products.update({v.index: list(v.Inner.results['prod'])}) or variant_finished(v)
+        return outer, products
+
+    # Each copy of the inner loop has its own checkpoint, and resumes from it
+    for i in range(2):
+        outer, products = make_loop()
+        outer.start()
+        assert products == {0: [10, 20, 30], 1: [20, 40, 60]}
+    assert sorted(f for f in os.listdir(str(tmpdir)) if f.startswith('ck.')) == ['ck.Outer_1.Inner.jsonl',
+                                                                               'ck.Outer_2.Inner.jsonl']
+
+    # A checkpoint written by another loop is not used
+    with open(str(tmpdir.join('ck.Outer_1.Inner.jsonl'))) as fp:
+        lines = fp.readlines()
+    with open(str(tmpdir.join('ck.Outer_2.Inner.jsonl')), 'w') as fp:
+        fp.writelines(lines)
+    outer, products = make_loop()
+    outer.start()
+    assert products == {0: [10, 20, 30], 1: [20, 40, 60]}
+
+    # Nor one written for other values of the outer loop's variables
+    outer, products = make_loop(xs=(5, 6))
+    outer.start()
+    assert products == {0: [50, 100, 150], 1: [60, 120, 180]}
+
+
+def test_failed_variant():
+    from siva.simulation.base_component import ExecutionError
+
+    class FailingLoop(LoopComponent):
+        def execute(self):
+            super().execute()
+            if self.int_var == 5:
+                raise ValueError("Bad point")
+
+    a = LoopVariable(name='int', target='Loop.int_var', start=1, stop=9, step=2)
+    m1 = Measurement(name='int_result', expr='Loop.int_var')
+    loop = FailingLoop(parent=None, vars=[a], name='Loop', measurements=[m1], work_dir=None)
+    with pytest.raises(ExecutionError, match="Bad point"):
+        loop.start()
+    # The other iterations still ran
+    values = np.asarray(loop.results['int_result'])
+    assert list(values[[0, 1, 3, 4]]) == [1, 3, 7, 9]
+    assert np.isnan(values[2])
+
+    # A failure in a nested loop reaches the outer loop
+    x = LoopVariable(name='x', target='Outer.xv', values=[1, 2])
+    y = LoopVariable(name='int', target='Loop.int_var', values=[3, 5])
+    inner = FailingLoop(parent=None, vars=[y], name='Loop', measurements=[m1], work_dir=None)
+    outer = LoopComponent(parent=None, vars=[x], name='Outer', children=[inner], work_dir=None)
+    with pytest.raises(ExecutionError, match="Bad point"):
+        outer.start()
+
+
+def test_finished_variants_released():
+    import gc
+    import weakref
+    variants = []
+    alive = []
+
+    class ReleasedLoop(LoopComponent):
+        def __next__(self):
+            variant = super().__next__()
+            if variant is not None:
+                variants.append(weakref.ref(variant))
+            return variant
+
+        def final(self):
+            gc.collect()
+            alive.append(sum(ref() is not None for ref in variants))
+
+    a = LoopVariable(name='int', target='Loop.int_var', values=list(range(20)))
+    m1 = Measurement(name='int_result', expr='Loop.int_var')
+    loop = ReleasedLoop(parent=None, vars=[a], name='Loop', measurements=[m1], work_dir=None, parallel=False)
+    loop.start()
+
+    # Only the last few, still referenced by start(), are left when final() is called
+    assert len(variants) == 20
+    assert alive[0] <= 3
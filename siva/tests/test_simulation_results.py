@@ -2,7 +2,8 @@ import pytest
 import tempfile
 import os
 
-from siva.simulation.results import Results
+from siva.simulation.results import Results, StorageProfile, GZIP
+from siva.waveforms import LazyWave
 
 def test_results():
     with tempfile.TemporaryDirectory() as work_dir:
@@ -19,3 +20,91 @@ def test_results():
 
             assert 'tran' in list(results.keys())
 
+
+def test_extend_waveform():
+    import numpy as np
+    with tempfile.TemporaryDirectory() as work_dir:
+        with Results(os.path.join(work_dir, 'results.hdf'), 'w') as results:
+            results.select('tran')
+            index = results.add_vector(path='/tran', vector=[0., 1.], name='time', resizable=True)
+            x, y = results.add_waveform(path='out', x=index, y=[0., 2.], y_name='v', x_name='time', resizable=True)
+
+            results.extend(index, [2., 3.])
+            results.extend(y, [4., 6.])
+
+            # The waveform's x vector is a link to the shared index
+            assert (x[:] == np.array([0., 1., 2., 3.])).all()
+            assert (results['tran/out/v'][:] == np.array([0., 2., 4., 6.])).all()
+
+
+def test_lazy_waveform():
+    import numpy as np
+    t = np.linspace(0, 1e-6, 10001)
+    v = np.sin(2*np.pi*1e6*t)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        with Results(os.path.join(work_dir, 'results.hdf'), 'w', storage=GZIP) as results:
+            results.select('tran')
+            index = results.add_vector(path='/tran', vector=t, name='time')
+            index.attrs['name'] = 'time'
+            results.add_waveform(path='dut/out', x=index, y=v, y_name='v', x_name='time')
+
+            ds = results['tran/dut/out/v']
+            assert ds.compression == 'gzip'
+            assert ds.chunks == (10001,)
+
+            w = results.v('dut.out', lazy=True)
+            assert isinstance(w, LazyWave)
+            assert not w.is_loaded
+            assert len(w) == 10001
+
+            window = w[0.25e-6:0.5e-6]
+            assert not w.is_loaded
+            assert window.x[0] >= 0.25e-6
+            assert window.x[-1] <= 0.5e-6
+            assert len(window) == 2501
+
+            assert (w[10:20].y == v[10:20]).all()
+            assert w[5].y == v[5]
+
+
+def test_storage_profile():
+    profile = StorageProfile(chunks=1000, compression='lzf', shuffle=True)
+    kwargs = profile.dataset_kwargs((10,))
+    assert kwargs['chunks'] == (10,)
+    assert kwargs['compression'] == 'lzf'
+
+    kwargs = profile.dataset_kwargs((10,), resizable=True)
+    assert kwargs['chunks'] == (1000,)
+    assert kwargs['maxshape'] == (None,)
+
+
+def test_aggregate_variants():
+    import numpy as np
+    freq = np.logspace(0, 9, 91)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        with Results(os.path.join(work_dir, 'results.hdf'), 'w') as archive:
+            for i in range(3):
+                results = archive.open_variant('loop/loop_{}/sim'.format(i))
+                results.select('ac')
+                index = results.add_vector(path='/ac', vector=freq, name='frequency', shared=True)
+                index.attrs['name'] = 'frequency'
+                results.add_waveform(path='out', x=index, y=freq*i, y_name='v', x_name='frequency')
+                results.close()
+
+            assert sorted(archive.variants()) == ['loop/loop_0/sim', 'loop/loop_1/sim', 'loop/loop_2/sim']
+
+            # Only one copy of the index is stored
+            assert len(archive['_index']) == 1
+            assert archive['loop/loop_0/sim/ac/frequency'] == archive['loop/loop_2/sim/ac/frequency']
+
+            y = archive.open_variant('loop/loop_2/sim')['loop/loop_2/sim/ac/out/v'][:]
+            assert (y == 2*freq).all()
+
+        # Variants of a read-only database can be read
+        with Results(os.path.join(work_dir, 'results.hdf'), 'r') as archive:
+            results = archive.open_variant('loop/loop_1/sim')
+            assert (results.root_group['ac/out/v'][:] == freq).all()
+            with pytest.raises(KeyError):
+                archive.open_variant('loop/loop_3/sim').root_group
@@ -0,0 +1,94 @@
+import numpy as np
+
+from siva.simulation.loop_component import LoopVariable, LoopComponent
+from siva.simulation.measurement import Measurement
+from siva.simulation import sampling
+
+
+def test_unit_samples():
+    for kind in ('random', 'lhs', 'sobol'):
+        u = sampling.unit_samples(kind, 16, 3, seed=1)
+        assert u.shape == (16, 3)
+        assert ((u >= 0) & (u < 1)).all()
+        np.testing.assert_array_equal(u, sampling.unit_samples(kind, 16, 3, seed=1))
+
+    # Latin hypercube:  One sample in each of the 16 strata of each dimension
+    u = sampling.unit_samples('lhs', 16, 3, seed=1)
+    for d in range(3):
+        assert sorted(np.floor(u[:, d]*16)) == list(range(16))
+
+
+def test_refine():
+    x, y = np.meshgrid(np.linspace(0, 1, 5), np.linspace(0, 1, 5))
+    u = np.column_stack([x.ravel(), y.ravel()])
+    new = sampling.refine(u, u.sum(axis=1), limit=1.1)
+    assert len(new)
+    # Midpoints of neighbors that straddle the line x + y = 1.1
+    assert (abs(new.sum(axis=1) - 1.1) < .25).all()
+    assert len(sampling.refine(u, u.sum(axis=1), limit=1.1, n=3)) == 3
+    assert len(sampling.refine(u, u.sum(axis=1), limit=5)) == 0
+
+
+def test_loop_variable_sample():
+    v = LoopVariable(name='v', start=1, stop=3, n=3)
+    assert v.sample(.25) == 1.5
+    assert [v.unit(i) for i in range(3)] == [0, .5, 1]
+
+    v = LoopVariable(name='v', values=['a', 'b', 'c', 'd'])
+    assert [v.sample(u) for u in (0, .3, .6, .99, 1)] == ['a', 'b', 'c', 'd', 'd']
+    assert v.sample(v.unit(2)) == 'c'
+
+
+def make_loop(**kwargs):
+    x = LoopVariable(name='x', target='Loop.x', start=0., stop=1., n=5)
+    y = LoopVariable(name='y', target='Loop.y', start=0., stop=1., n=5)
+    m = Measurement(name='sum', expr='Loop.x + Loop.y')
+    loop = LoopComponent(parent=None, vars=[x, y], name='Loop', measurements=[m], work_dir=None)
+    for name, value in kwargs.items():
+        setattr(loop, name, value)
+    return loop
+
+
+def test_sampled_loop():
+    loop = make_loop(sampling='lhs', num_samples=8, seed=2)
+    assert len(loop) == 8
+    loop.start()
+    results = loop.results
+    assert len(results) == 8
+    np.testing.assert_allclose(results['sum'], results['x'] + results['y'])
+    assert sorted(np.floor(results['x']*8)) == list(range(8))
+
+
+def test_refined_loop():
+    loop = make_loop(refine=('sum', 1.1), refine_rounds=2, refine_samples=6)
+    loop.start()
+    results = loop.results
+    assert len(results) == 25 + 12
+    np.testing.assert_allclose(results['sum'], results['x'] + results['y'])
+
+    # The new points are near the boundary
+    assert (abs(results['sum'][25:] - 1.1) < .25).all()
+
+
+def test_submission_window():
+    class Loop(LoopComponent):
+        def __next__(self):
+            variant = super().__next__()
+            in_progress.append(variant.index)
+            peak[0] = max(peak[0], len(in_progress))
+            return variant
+
+        def variant_finished(self, variant):
+            in_progress.remove(variant.index)
+
+    in_progress = []
+    peak = [0]
+    x = LoopVariable(name='x', target='Loop.x', start=0., stop=1., n=50)
+    m = Measurement(name='x2', expr='Loop.x*2')
+    loop = Loop(parent=None, vars=[x], name='Loop', measurements=[m], work_dir=None)
+    loop.num_threads = 4
+    loop.window = 2
+    loop.start()
+
+    assert len(loop.results) == 50
+    assert peak[0] <= 8
@@ -6,6 +6,7 @@ from siva.simulation.loop_component import LoopComponent, LoopVariable
 from siva.simulation.base_component import BaseComponent
 from siva.simulation.measurement import Measurement
 
+import os
 import time
 import tempfile
 
@@ -97,3 +98,62 @@ def print_log(root):
 
 
 
+
+@pytest.mark.parametrize('executor', ['process', 'pool'])
+def test_char_executors(executor):
+    # Variants are pickled, run in worker processes, and their records sent back to the master
+    c = Char(name="Char", work_dir=tempfile.mkdtemp())
+    c.executor = executor
+    c.num_workers = 2
+    try:
+        c.start()
+    finally:
+        c.disk_mgr.stop()
+
+    assert len(c.results) == 10
+    for i, row in enumerate(c.results):
+        assert row['x'] == i + 1
+        assert row['m1'] == (i+1)*2.
+
+
+def test_char_buffered_results():
+    # Threaded variants buffer their records, which are merged during the sweep and at the end
+    c = Char(name="Char", work_dir=tempfile.mkdtemp(), parallel=True)
+    c.flush_interval = 0
+    flushes = []
+    flush_results = c.flush_results
+    c.flush_results = lambda: flushes.append(len(c.results)) or flush_results()
+    try:
+        c.start()
+    finally:
+        c.disk_mgr.stop()
+
+    assert len(flushes) > 1
+    assert len(c.results) == 10
+    for i, row in enumerate(c.results):
+        assert row['m1'] == (i+1)*2.
+
+
+def test_char_resume():
+    # Variants already in the results file are skipped when the sweep is restarted
+    from siva.simulation.sinks import HDF5Sink
+    work_dir = tempfile.mkdtemp()
+    with HDF5Sink(os.path.join(work_dir, 'results.hdf5')) as sink:
+        sink.write([{'x': i + 1., 'm1': (i + 1)*2.} for i in range(4)], rows=range(4))
+
+    c = Char(name="Char", work_dir=work_dir)
+    c.results_sink = 'results.hdf5'
+    run = []
+    c.buffer_record = lambda record, row: run.append(row) or BaseComponent.buffer_record(c, record, row)
+    try:
+        c.start()
+    finally:
+        c.disk_mgr.stop()
+
+    assert sorted(run) == [4, 5, 6, 7, 8, 9]
+    assert len(c.results) == 10
+    for i, row in enumerate(c.results):
+        assert row['m1'] == (i+1)*2.
+
+    with HDF5Sink(os.path.join(work_dir, 'results.hdf5')) as sink:
+        assert sorted(sink.rows()) == list(range(10))
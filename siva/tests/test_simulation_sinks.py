@@ -0,0 +1,97 @@
+import os
+import tempfile
+
+import numpy as np
+import pytest
+
+from siva.simulation.table import Table
+from siva.simulation.sinks import HDF5Sink, ParquetSink, open_sink
+
+
+def test_hdf5_sink():
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, 'results.hdf5')
+
+        t = Table()
+        t.attach(HDF5Sink(path, batch_size=4))
+        for i in range(10):
+            t.add_row({'x': i, 'y': i*2.}, row=9 - i)
+
+        # Rows are written in batches
+        assert len(t.sink.rows()) == 8
+        t.add_rows([{'x': 10, 'name': 'a'}, {'x': 11, 'wave': np.ones(3)}], rows=[10, 11])
+        t.close()
+
+        sink = open_sink(path)
+        columns, rows = sink.read()
+        assert list(rows) == [9, 8, 7, 6, 5, 4, 3, 2, 1, 0, 10, 11]
+        assert list(columns) == ['x', 'y', 'name']
+        assert np.isnan(columns['y'][-1])
+        assert columns['name'][-2] == 'a' and columns['name'][0] == ''
+        sink.close()
+
+
+def test_resume():
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, 'results.hdf5')
+        with HDF5Sink(path) as sink:
+            sink.write([{'x': 1.}, {'x': 3.}], rows=[1, 3])
+
+        # Saved rows are loaded into the table
+        t = Table()
+        t.attach(HDF5Sink(path))
+        assert len(t) == 4
+        assert t.get_row(3) == {'x': 3.}
+        assert t.get_row(2) == {'x': None}
+        assert sorted(t.sink.rows()) == [1, 3]
+
+        t.add_row({'x': 2.}, row=2)
+        t.close()
+
+        # Unless the table doesn't retain its rows
+        t = Table()
+        t.attach(HDF5Sink(path), retain=False)
+        assert len(t) == 4 and not t.columns
+        t.add_row({'x': 4.})
+        t.close()
+
+        with HDF5Sink(path) as sink:
+            assert list(sink.rows()) == [1, 3, 2, 4]
+
+
+def test_missing_values(caplog):
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, 'results.hdf5')
+        with HDF5Sink(path, batch_size=2) as sink:
+            sink.write([{'x': 1., 'name': 'a', 'mixed': 1.}, {'x': 2., 'mixed': 2.}], rows=[0, 1])
+            # A batch with no names is still a string column, and mixed values are left out and logged
+            sink.write([{'x': 3., 'mixed': 'b'}, {'x': 4., 'mixed': 4.}], rows=[2, 3])
+            sink.write([{'x': 5., 'mixed': 'c'}, {'x': 6., 'mixed': 6.}], rows=[4, 5])
+
+        with open_sink(path) as sink:
+            columns, rows = sink.read()
+        assert list(columns['name']) == ['a', '', '', '', '', '']
+        assert list(columns['mixed'][:2]) == [1., 2.] and np.isnan(columns['mixed'][2:]).all()
+        assert len([r for r in caplog.records if "'mixed'" in r.getMessage()]) == 1
+
+
+def test_parquet_resume_unclosed():
+    pytest.importorskip('pyarrow')
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, 'results.parquet')
+        sink = ParquetSink(path, batch_size=2)
+        sink.write([{'x': 0., 'name': 'a'}, {'x': 1.}, {'x': 2.}], rows=[0, 1, 2])
+        # Killed before close():  the written batch is kept, the buffered row and a partial file are not
+        del sink
+        with open(os.path.join(path, '.part-00001.parquet.tmp'), 'wb') as fp:
+            fp.write(b'PAR1')
+
+        sink = open_sink(path)
+        assert list(sink.rows()) == [0, 1]
+        sink.write([{'x': 2.}, {'x': 3.}], rows=[2, 3])
+        sink.close()
+
+        columns, rows = ParquetSink(path).read()
+        assert list(rows) == [0, 1, 2, 3]
+        assert list(columns['x']) == [0., 1., 2., 3.]
+        assert columns['name'][0] == 'a'
@@ -0,0 +1,75 @@
+import os
+import time
+import tempfile
+
+import numpy as np
+
+from siva.simulation.results import Results
+from siva.simulation.spice.cache import ResultCache
+
+
+def test_key():
+    with tempfile.TemporaryDirectory() as work_dir:
+        cache = ResultCache(os.path.join(work_dir, 'cache'))
+
+        models = os.path.join(work_dir, 'models.sp')
+        nested = os.path.join(work_dir, 'nmos.sp')
+        with open(models, 'w') as fp:
+            fp.write(".include 'nmos.sp'\n")
+        with open(nested, 'w') as fp:
+            fp.write(".model n nmos level=1\n")
+
+        key = cache.key("V1 a 0 1\n.END", None, [models])
+        assert key == cache.key("V1 a 0 1\n.END", None, [models])
+        assert key != cache.key("V1 a 0 2\n.END", None, [models])
+        assert cache.model_files([models]) == [models, nested]
+
+        # Changing a nested model file changes the key
+        time.sleep(.01)
+        with open(nested, 'w') as fp:
+            fp.write(".model n nmos level=2\n")
+        assert key != cache.key("V1 a 0 1\n.END", None, [models])
+
+
+def test_store_and_load():
+    with tempfile.TemporaryDirectory() as work_dir:
+        cache = ResultCache(os.path.join(work_dir, 'cache'))
+        t = np.linspace(0, 1e-9, 11)
+
+        results = Results(os.path.join(work_dir, 'a.hdf5'), 'w')
+        results.select('tran')
+        index = results.add_vector(path='/tran', vector=t, name='time')
+        index.attrs['name'] = 'time'
+        results.add_waveform(path='out', x=index, y=np.sin(t), y_name='v', x_name='time')
+        cache.store('abc', results.root_group)
+        results.close()
+
+        assert 'abc' in cache
+        assert 'xyz' not in cache
+
+        copy = Results(os.path.join(work_dir, 'b.hdf5'), 'w')
+        assert cache.load('abc', copy.root_group)
+        copy.select('tran')
+        np.testing.assert_allclose(copy.v('out').y, np.sin(t))
+        copy.close()
+
+
+def test_eviction():
+    with tempfile.TemporaryDirectory() as work_dir:
+        cache = ResultCache(os.path.join(work_dir, 'cache'), max_size=None)
+        for i, key in enumerate(['a', 'b', 'c']):
+            results = Results(os.path.join(work_dir, key + '.hdf5'), 'w')
+            results.select('tran')
+            results.add_vector(path='tran', vector=np.arange(10000.), name='time')
+            cache.store(key, results.root_group)
+            results.close()
+            os.utime(cache.entry_path(key), (i, i))
+
+        # Using 'a' makes 'b' the least recently used
+        cache.open('a').close()
+        entry_size = os.path.getsize(cache.entry_path('a'))
+        cache.max_size = 2*entry_size
+        cache.evict()
+
+        assert 'a' in cache and 'c' in cache
+        assert 'b' not in cache
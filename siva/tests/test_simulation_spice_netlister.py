@@ -0,0 +1,64 @@
+from siva.simulation.spice import Tran, Simulation, Circuit
+from siva.simulation.spice.primitives import Nmos, Pmos, R
+from siva.simulation.spice.sources import Vdc
+from siva.simulation.spice.connections import Net, Input, Output, GND
+from siva.simulation.spice.netlister import Netlister
+
+
+class Inv(Circuit):
+    i = Input('i')
+    o = Output('o')
+    vdd = Input('vdd')
+    mp = Pmos(s=vdd, g=i, d=o, b=vdd, w=2e-6, l=100e-9, m=1, model="pch")
+    mn = Nmos(s=GND, g=i, d=o, b=GND, w=1e-6, l=100e-9, m=1, model="nch")
+
+
+class Buf(Circuit):
+    i = Input('i')
+    o = Output('o')
+    vdd = Input('vdd')
+    m = Net('m')
+    x1 = Inv(i, m, vdd)
+    x2 = Inv(m, o, vdd)
+    r1 = R(o, GND, r=1e3)
+
+
+class Sim(Simulation):
+    Tran(step=1e-12, stop=1e-9)
+    vdd = Net('vdd')
+    a = Net('a')
+    b = Net('b')
+    dut = Buf(a, b, vdd)
+    v_vdd = Vdc(vdd, v=1.0)
+
+Sim.simulator_path = ''
+
+
+def test_netlister():
+    sim = Sim(name='sim', work_dir=None)
+    expected = sim.netlist()
+    assert ".SUBCKT Buf i o vdd" in expected
+    assert ".SUBCKT Inv i o vdd" in expected
+
+    sim.netlister = Netlister()
+    assert sim.netlist() == expected
+    assert sim.netlister.hits == 0
+    assert sim.netlist() == expected
+    assert sim.netlister.misses > 0 and sim.netlister.hits > 0
+
+    # Only the changed card, and the subcircuit holding it, are formatted again
+    misses = sim.netlister.misses
+    sim.dut.r1.params['r'].value = 2e3
+    text = sim.netlist()
+    assert sim.netlister.misses == misses + 2
+
+    sim.netlister = None
+    assert sim.netlist() == text
+    assert text != expected
+
+
+def test_designs():
+    sim = Sim(name='sim', work_dir=None)
+    designs = Netlister.designs(sim)
+    assert [d.cell_name for d in designs] == list(sim.instance_designs())
+    assert [id(d) for d in designs] == [id(dl[0]) for dl in sim.instance_designs().values()]
@@ -0,0 +1,69 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from siva.simulation.spice import Tran, Simulation
+from siva.simulation.spice.primitives import R
+from siva.simulation.spice.sources import Vdc
+from siva.simulation.spice.connections import Net, GND
+from siva.simulation.spice import ngspice_shared
+from siva.simulation.spice.ngspice_shared import NgSpiceShared, entry_name, SV_VOLTAGE, SV_CURRENT
+
+
+class Divider(Simulation):
+    Tran(step=1e-9, stop=10e-9)
+    vdd = Net('vdd')
+    out = Net('out')
+    r1 = R(vdd, out, r=1e3)
+    r2 = R(out, GND, r=1e3)
+    v_vdd = Vdc(vdd, v=1.0)
+
+Divider.simulator_path = 'ngspice'
+
+
+class FakeNgSpice:
+    """Returns the vectors ngspice would, without running it."""
+    def __init__(self):
+        self.netlists = []
+        self.last_output = []
+
+    def run(self, lines):
+        self.netlists.append(lines)
+        t = np.linspace(0, 10e-9, 11)
+        return OrderedDict([('tran', OrderedDict([('time', t), ('v(out)', 0.5 + 0*t)]))]), ["Note: simulated"]
+
+
+def test_entry_name():
+    assert entry_name('out', SV_VOLTAGE) == 'v(out)'
+    assert entry_name('v_vdd#branch', SV_CURRENT) == 'i(v_vdd)'
+    assert entry_name('time', 1) == 'time'
+
+
+def test_load_missing_library(tmpdir):
+    path = str(tmpdir.join('libngspice.so'))
+    assert NgSpiceShared.load(path) is None
+    assert NgSpiceShared._instances[path] is None
+
+
+def test_execute_shared(tmpdir, monkeypatch):
+    fake = FakeNgSpice()
+    monkeypatch.setattr(NgSpiceShared, 'load', classmethod(lambda cls, path=None: fake))
+
+    sim = Divider(name='sim', work_dir=str(tmpdir))
+    sim.shared_library = True
+    sim.execute()
+
+    assert len(fake.netlists) == 1
+    assert fake.netlists[0][-1] == '.END'
+    sim.simulation_data.select('tran')
+    np.testing.assert_allclose(sim.simulation_data.v('out').y, 0.5)
+    with open(sim.log_file) as fp:
+        assert fp.read() == "Note: simulated"
+    sim.simulation_data.close()
+
+
+def test_fallback(monkeypatch):
+    monkeypatch.setattr(ngspice_shared, 'find_library', lambda: None)
+    sim = Divider(name='sim', work_dir=None)
+    sim.shared_library = True
+    assert sim.load_shared_library() is None
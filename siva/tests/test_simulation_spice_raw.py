@@ -0,0 +1,85 @@
+import os
+import tempfile
+
+import numpy as np
+
+from siva.simulation.spice.raw_file import read_raw
+
+
+def header(plotname, flags, names, num_points, format="Binary"):
+    lines = ["Title: * test", "Date: today", "Plotname: {}".format(plotname),
+             "Flags: {}".format(flags), "No. Variables: {}".format(len(names)),
+             "No. Points: {}".format(num_points), "Variables:"]
+    for i, name in enumerate(names):
+        lines.append("\t{}\t{}\tvoltage".format(i, name))
+    lines.append("{}:".format(format))
+    return ("\n".join(lines) + "\n").encode('utf-8')
+
+
+def write_raw(path, blocks):
+    with open(path, 'wb') as fp:
+        for block in blocks:
+            fp.write(block)
+    return path
+
+
+def test_binary_multi_plot():
+    op = np.array([[1.2, 0.6]])
+    ac = np.array([[1+0j, 0.5+0.5j], [10+0j, 0.25-0.1j], [100+0j, 0.1-0.2j]])
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = write_raw(os.path.join(work_dir, 'sim.raw'),
+                         [header('Operating Point', 'real', ['v(vdd)', 'v(out)'], 1), op.tobytes(),
+                          header('AC Analysis', 'complex', ['frequency', 'v(out)'], 3), ac.tobytes()])
+        plots = read_raw(path)
+
+        assert [p.analysis for p in plots] == ['op', 'ac']
+        assert plots[0]['v(out)'][0] == 0.6
+
+        assert plots[1].is_complex
+        assert plots[1].data.shape == (3, 2)
+        np.testing.assert_allclose(plots[1]['v(out)'], ac[:, 1])
+
+        # The data should be a view onto the file, not a copy
+        assert isinstance(plots[1].data, np.memmap)
+        del plots
+
+
+def test_truncated_binary():
+    tran = np.arange(10, dtype=float).reshape((5, 2))
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Simulator still running: Only 2.5 points have been written
+        path = write_raw(os.path.join(work_dir, 'sim.raw'),
+                         [header('Transient Analysis', 'real', ['time', 'v(a)'], 0), tran.tobytes()[:40]])
+        plots = read_raw(path)
+        assert plots[0].num_points == 2
+        np.testing.assert_allclose(plots[0]['v(a)'], [1, 3])
+        del plots
+
+
+def test_ascii_values():
+    values = b"0\t0.0\n\t1.0\n1\t1e-9\n\t2.0\n"
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = write_raw(os.path.join(work_dir, 'sim.raw'),
+                         [header('Transient Analysis', 'real', ['time', 'v(a)'], 2, format="Values"), values])
+        plots = read_raw(path)
+        np.testing.assert_allclose(plots[0]['time'], [0, 1e-9])
+        np.testing.assert_allclose(plots[0]['v(a)'], [1, 2])
+
+
+def test_repeated_analyses():
+    tran = np.arange(6, dtype=float).reshape((3, 2))
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = write_raw(os.path.join(work_dir, 'sim.raw'),
+                         [header('Transient Analysis', 'real', ['time', 'v(a)'], 3), tran.tobytes(),
+                          header('Transient Analysis', 'real', ['time', 'v(a)'], 3), (2*tran).tobytes(),
+                          header('Operating Point', 'real', ['v(a)'], 1), tran[0, :1].tobytes()])
+        plots = read_raw(path)
+
+        # The second transient doesn't replace the first
+        assert [p.analysis for p in plots] == ['tran', 'tran_2', 'op']
+        np.testing.assert_allclose(plots[1]['v(a)'], 2*tran[:, 1])
+        del plots
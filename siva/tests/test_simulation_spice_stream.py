@@ -0,0 +1,83 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pytest
+
+from siva.simulation.base_component import ExecutionError
+from siva.simulation.spice import Tran, Simulation
+from siva.tests.test_simulation_spice_raw import header
+
+
+class Stream(Simulation):
+    Tran(step=1.0, stop=4.0)
+
+
+def tran_points(start, stop):
+    t = np.arange(start, stop, dtype=float)
+    return np.column_stack((t, 2*t)).tobytes()
+
+
+def test_update_results():
+    with tempfile.TemporaryDirectory() as work_dir:
+        sim = Stream(name='sim', work_dir=work_dir)
+        path = os.path.join(work_dir, sim.results_file)
+
+        # Nothing written yet
+        sim.update_results()
+        assert sim.simulation_data is None and sim.progress is None
+
+        # The simulator has written 2.5 points
+        with open(path, 'wb') as fp:
+            fp.write(header('Transient Analysis', 'real', ['time', 'v(out)'], 0) + tran_points(0, 3)[:40])
+        sim.update_results()
+        root = sim.simulation_data.root_group
+        assert list(root['tran/time'][:]) == [0., 1.]
+        assert sim.progress == 0.25
+
+        # The rest, and the final update
+        with open(path, 'ab') as fp:
+            fp.write(tran_points(0, 5)[40:])
+        sim.update_results()
+        sim.update_results(final=True)
+        assert list(root['tran/time'][:]) == [0., 1., 2., 3., 4.]
+        assert list(root['tran/out/v'][:]) == [0., 2., 4., 6., 8.]
+        assert sim.progress == 1.0
+        assert '_index' not in sim.simulation_data
+        sim.simulation_data.close()
+
+
+def test_run_streaming_after_kill():
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, 'sim.raw')
+        with open(path, 'wb') as fp:
+            fp.write(header('Transient Analysis', 'real', ['time', 'v(out)'], 0) + tran_points(0, 2))
+
+        sim = Stream(name='sim', work_dir=work_dir)
+        sim.poll_interval = 0.05
+        sim.on_progress = lambda results: False
+        with pytest.raises(ExecutionError):
+            sim.run_streaming([sys.executable, '-c', 'import time; time.sleep(30)'])
+
+        # The next run starts over
+        os.remove(os.path.join(work_dir, 'sim.hdf5'))
+        sim.on_progress = lambda results: True
+        sim.run_streaming([sys.executable, '-c', 'pass'])
+        sim.update_results(final=True)
+        assert list(sim.simulation_data.root_group['tran/time'][:]) == [0., 1.]
+        sim.simulation_data.close()
+
+
+def test_load_repeated_analyses():
+    with tempfile.TemporaryDirectory() as work_dir:
+        with open(os.path.join(work_dir, 'sim.raw'), 'wb') as fp:
+            for n in (3, 2):
+                fp.write(header('Transient Analysis', 'real', ['time', 'v(out)'], n) + tran_points(0, n))
+
+        sim = Stream(name='sim', work_dir=work_dir)
+        sim.load_results(sim.results_file)
+        root = sim.simulation_data.root_group
+        assert list(root['tran/out/v'][:]) == [0., 2., 4.]
+        assert list(root['tran_2/out/v'][:]) == [0., 2.]
+        sim.simulation_data.close()
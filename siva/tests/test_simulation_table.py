@@ -1,6 +1,8 @@
 import pytest
+import numpy as np
 
 from siva.simulation.table import Table
+from siva.simulation.measurement import ColumnNamespace
 
 @pytest.fixture
 def simple_table():
@@ -74,4 +76,85 @@ def test_add_column(simple_table):
 
 
 def test_write_csv(simple_table):
-    simple_table.save_as_csv("test.csv", dir=r"P:\work")
\ No newline at end of file
+    simple_table.save_as_csv("test.csv", dir=r"P:\work")
+
+def test_columns():
+    t = Table()
+    t.add_row({'x': 1, 'y': 0.5}, row=2)
+    t.add_row({'x': 0}, row=0)
+
+    assert len(t) == 3
+    assert t.columns['x'].dtype == np.int64
+    assert t.get_row(1) == {'x': None, 'y': None}
+    assert t.get_row(2) == {'x': 1, 'y': 0.5}
+
+    # Missing float values are NaN in the array view
+    y = t['y']
+    assert np.isnan(y[0]) and y[2] == 0.5
+    assert list(t.columns['y'].valid) == [False, False, True]
+
+    # Views share memory with the table
+    t.add_row({'y': 1.5}, row=0)
+    assert y[0] == 1.5
+
+    # Integers are promoted to floats, and numbers to objects
+    t.add_row({'x': 2.5}, row=1)
+    assert t.columns['x'].dtype == np.float64
+    t.add_row({'x': 'many'}, row=1)
+    assert t['x'].dtype == object
+    assert t.get_row(1)['x'] == 'many'
+
+
+def test_missing_integers():
+    # Missing int and bool cells are NaN, not 0
+    t = Table()
+    t.add_row({'n': 1, 'ok': True}, row=0)
+    t.add_row({'n': 3, 'ok': False}, row=2)
+    n = t['n']
+    assert n.dtype == np.float64
+    assert n[0] == 1 and np.isnan(n[1]) and n[2] == 3
+    ok = t['ok']
+    assert ok[0] == 1 and np.isnan(ok[1]) and ok[2] == 0
+    assert t.get_row(1) == {'n': None, 'ok': None}
+    assert t.get_row(2)['n'] == 3
+
+    # Batch measurements see the same values
+    assert np.isnan(ColumnNamespace(t)['n'][1])
+
+    # Reading doesn't change the column's type.  Once every cell is filled, the values are integers again.
+    assert t.columns['n'].dtype == np.int64
+    t.add_row({'n': 2, 'ok': True}, row=1)
+    t.add_row({'i': 5}, row=1)
+    assert t['n'][1] == 2
+    assert t['n'].dtype == np.int64 and t['ok'].dtype == bool
+    t = Table()
+    t.add_rows([{'i': 1}, {'i': 2}])
+    assert t['i'].dtype == np.int64
+
+
+def test_large_table():
+    t = Table()
+    for i in range(10000):
+        t.add_row({'i': i, 'v': i*2.}, row=9999 - i)
+    assert len(t) == 10000
+    assert t['i'][0] == 9999
+
+    t.sort('i')
+    np.testing.assert_array_equal(t['v'], np.arange(10000)*2.)
+
+
+def test_add_rows():
+    t = Table()
+    t.add_row({'x': 0, 'y': 0.5}, row=0)
+    t.add_rows([{'x': 3, 'y': 1.5}, {'x': 1, 'w': np.ones(3)}, {'x': 2, 'name': 'b'}], rows=[3, 1, 2])
+
+    assert len(t) == 4
+    assert list(t['x']) == [0, 1, 2, 3]
+    assert t.columns['x'].dtype == np.int64
+    assert t.get_row(1)['y'] is None
+    assert t.get_row(2)['name'] == 'b'
+    np.testing.assert_array_equal(t.get_row(1)['w'], np.ones(3))
+
+    # Without row numbers, records are appended
+    t.add_rows([{'x': 4}, {'x': 5}])
+    assert list(t['x']) == [0, 1, 2, 3, 4, 5]
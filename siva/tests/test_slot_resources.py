@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from siva.resources.slot_resources import SlotManager
+
+
+class Job:
+    def __init__(self, name):
+        self.name = name
+
+
+def test_slot_limit():
+    mgr = SlotManager(slots=2)
+    running = []
+    max_running = []
+    lock = threading.Lock()
+
+    def job(n):
+        with mgr.request(Job(n)):
+            with lock:
+                running.append(n)
+                max_running.append(len(running))
+            time.sleep(.05)
+            with lock:
+                running.remove(n)
+
+    threads = [threading.Thread(target=job, args=(n,)) for n in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    mgr.stop()
+
+    assert max(max_running) == 2
+    stats = mgr.stats()
+    assert stats['num_granted'] == 6
+    assert stats['slots_in_use'] == 0
+    assert stats['max_wait'] > 0
+
+
+def test_licenses_and_memory():
+    mgr = SlotManager(slots=8, memory=10, licenses={'spice': 1})
+    a = mgr.request(Job('a'), memory=6, licenses={'spice': 1})
+
+    # No license token left
+    with pytest.raises(TimeoutError):
+        mgr.request(Job('b'), licenses={'spice': 1}, timeout=.1)
+
+    # Not enough memory
+    with pytest.raises(TimeoutError):
+        mgr.request(Job('c'), memory=6, timeout=.1)
+
+    a.release()
+    b = mgr.request(Job('b'), licenses={'spice': 1}, timeout=1)
+    assert mgr.licenses_in_use['spice'] == 1
+
+    with pytest.raises(ValueError):
+        mgr.request(Job('d'), memory=11)
+    mgr.stop()
+
+
+def test_priority_and_fairness():
+    mgr = SlotManager(slots=1)
+    first = mgr.request(Job('first'), group='loop_1')
+
+    # Queue up requests while the only slot is busy
+    order = []
+    requests = [('loop_1', 0), ('loop_1', 0), ('loop_2', 0), ('urgent', 1)]
+
+    def job(group, priority):
+        with mgr.request(Job(group), group=group, priority=priority):
+            order.append(group)
+            time.sleep(.02)
+
+    threads = []
+    for group, priority in requests:
+        t = threading.Thread(target=job, args=(group, priority))
+        t.start()
+        threads.append(t)
+        time.sleep(.02)
+
+    assert mgr.queue_depth == 4
+    first.release()
+    for t in threads:
+        t.join()
+    mgr.stop()
+
+    assert order[0] == 'urgent'
+    # loop_1 already had a turn
+    assert order[1:] == ['loop_2', 'loop_1', 'loop_1']
+
+
+def test_event_driven():
+    # Requests and releases wake the manager, it doesn't wait for the next poll
+    mgr = SlotManager(slots=1, polling_time=10)
+    t0 = time.time()
+    a = mgr.request(Job('a'), timeout=1)
+
+    threading.Timer(.05, a.release).start()
+    b = mgr.request(Job('b'), timeout=1)
+    assert time.time() - t0 < 1
+    b.release()
+    mgr.stop()
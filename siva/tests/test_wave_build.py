@@ -0,0 +1,68 @@
+import numpy as np
+
+from siva.waveforms.wave import Wave
+
+
+def test_append():
+    w = Wave()
+    assert w.build_mode
+    assert len(w) == 0
+    for i in range(2000):
+        w.append(i*1e-9, i % 7)
+    # In build mode, x and y are the most recent values
+    assert w.x == 1999*1e-9
+    assert w.y == 1999 % 7
+    assert len(w) == 2000
+
+    w.finalize()
+    assert not w.build_mode
+    assert len(w) == 2000
+    np.testing.assert_allclose(w.x, np.arange(2000)*1e-9)
+    np.testing.assert_array_equal(w.y, np.arange(2000) % 7)
+    assert w.order == 'ascending'
+
+
+def test_set_x_and_y():
+    w = Wave()
+    w.x = 0.5
+    w.y = 1.0
+    w.y = 2.0
+    w.finalize()
+    assert list(w.x) == [0.5, 1]
+    assert list(w.y) == [1.0, 2.0]
+
+
+def test_extend():
+    w = Wave()
+    w.reserve(10)
+    w.append(0, 0)
+    w.extend(np.arange(1, 2001), np.ones(2000))
+    w.append(2001, 1j)
+    w.finalize()
+
+    assert len(w) == 2002
+    assert w.y.dtype.kind == 'c'
+    assert w.y[-1] == 1j
+    np.testing.assert_array_equal(w.x, np.arange(2002))
+
+
+def test_finalize_without_copy():
+    w = Wave()
+    w.extend(np.arange(100.), np.arange(100.))
+    buffer = w._x
+    w.finalize()
+    assert np.shares_memory(w.x, buffer)
+
+
+def test_append_after_build():
+    w = Wave(x=[0, 1], y=[1., 2.])
+    w.append(2, 5.)
+    w.extend([3, 4], [6., 7.])
+    assert list(w.x) == [0, 1, 2, 3, 4]
+    assert list(w.y) == [1., 2., 5., 6., 7.]
+
+    # Back to build mode, and finalized again
+    w.build_mode = True
+    w.append(5, 8.)
+    w.finalize()
+    assert list(w.y) == [1., 2., 5., 6., 7., 8.]
@@ -1,7 +1,7 @@
 import pytest
 
 from siva.waveforms.wave import Wave
-from siva.waveforms.clock import ClockSource
+from siva.waveforms.clock import ClockSource, Clock
 
 import numpy as np
 
@@ -46,3 +46,75 @@ def test_jitter():
 
 
 
+
+
+def test_clock_source_both():
+    clk = ClockSource(period=0.5, stop=1.2, phase=.1, duty=0.25)
+    np.testing.assert_allclose(clk.ticks(edge='both'), [0.1, 0.225, 0.6, 0.725, 1.1])
+    np.testing.assert_allclose(clk.ticks(edge='both', n=3), [0.1, 0.225, 0.6])
+    np.testing.assert_allclose(clk.ticks(stop=0.7), [0.1, 0.6])
+
+
+class JitteredClock(ClockSource):
+    def __init__(self, jitter, **kwargs):
+        super().__init__(**kwargs)
+        self.tie = jitter
+
+    def ticks(self, n=None, edge='rising', stop=None):
+        return super().ticks(n=len(self.tie), edge=edge) + self.tie
+
+
+def test_jitter_types():
+    tie = np.array([0, .01, -.01, 0, .02, 0])
+    clk = JitteredClock(tie, period=1.0)
+
+    # The ideal clock's phase is fit to the edges
+    np.testing.assert_allclose(clk.jitter(ideal=1.0, type="tie").y, tie - tie.mean())
+    np.testing.assert_allclose(clk.jitter(ideal=1.0).y, np.diff(tie))
+    np.testing.assert_allclose(clk.jitter(ideal=1.0, n_cycles=2).y, tie[2:] - tie[:-2])
+    np.testing.assert_allclose(clk.jitter(type="cycle").y, np.diff(tie, 2))
+    np.testing.assert_allclose(clk.jitter(type="cycle").x, np.arange(4) + tie[:4])
+
+    periods = clk.periods()
+    np.testing.assert_allclose(periods.y, 1 + np.diff(tie))
+    assert len(periods.x) == len(periods.y)
+
+    # A fitted ideal clock removes a frequency offset
+    ramp = JitteredClock(0.001*np.arange(6), period=1.0)
+    np.testing.assert_allclose(ramp.jitter(type="tie").y, 0, atol=1e-12)
+
+    with pytest.raises(ValueError):
+        clk.jitter(type="TIE")
+
+
+def test_jitter_spectrum():
+    rng = np.random.default_rng(0)
+    tie = 1e-12*rng.standard_normal(2**14)
+    clk = JitteredClock(tie, period=1e-9)
+
+    psd = clk.jitter_spectrum(ideal=1e-9)
+    assert psd.x[-1] == pytest.approx(0.5e9)
+    # The area under the spectrum is the TIE's variance
+    area = np.sum(psd.y)*psd.x[1]
+    assert area == pytest.approx(np.var(tie), rel=0.05)
+
+    # White TIE: flat phase noise
+    pn = clk.phase_noise(ideal=1e-9)
+    expected = 10*np.log10((2*np.pi/1e-9)**2*np.var(tie)/0.5e9/2)
+    assert np.median(pn.y) == pytest.approx(expected, abs=2)
+
+
+def test_clock_wave():
+    x = np.linspace(0, 4, 4001)
+    clk = Clock(x=x, y=np.sin(2*np.pi*x - 0.1))
+    np.testing.assert_allclose(clk.ticks(), 0.1/(2*np.pi) + np.arange(4), atol=1e-6)
+    np.testing.assert_allclose(clk.ticks(edge='falling', stop=2), 0.1/(2*np.pi) + np.array([0.5, 1.5]), atol=1e-6)
+    assert len(clk.ticks(edge='both')) == 8
+    assert list(clk.phase().y) == [0, 1, 2, 3]
+
+    jitter = clk.jitter()
+    np.testing.assert_allclose(jitter.y, 0, atol=1e-6)
+
+    # Sampling another waveform at the clock's ticks
+    w = Wave(x=x, y=x)
+    np.testing.assert_allclose(w.sample(clock=clk).y, clk.ticks(), atol=1e-6)
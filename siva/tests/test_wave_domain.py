@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from siva.waveforms.wave import Wave
+from siva.waveforms.interpolation import resample
+
+
+def test_union():
+    a = Wave(x=[0., 1., 2.], y=[0., 1., 2.])
+    b = Wave(x=[0.5, 1.5], y=[10., 20.])
+
+    c = a + b
+    assert list(c.x) == [0., 0.5, 1., 1.5, 2.]
+    # b is held outside of its domain, and linearly interpolated inside it
+    np.testing.assert_allclose(c.y, [10., 10.5, 16., 21.5, 22.])
+
+
+def test_policies():
+    a = Wave(x=[0., 1., 2., 3.], y=[0., 1., 2., 3.])
+    b = Wave(x=[1.5, 2.5, 3.5], y=[1., 1., 1.], interp='step')
+
+    assert list(a.combine(b, '__mul__', domain='left').x) == [0., 1., 2., 3.]
+    assert list(a.combine(b, '__mul__', domain='right').x) == [1.5, 2.5, 3.5]
+    assert list(a.combine(b, '__mul__', domain='intersection').x) == [1.5, 2., 2.5, 3.]
+
+    c = a.combine(b, '__sub__', domain=0.5)
+    np.testing.assert_allclose(c.x, np.arange(0, 3.75, 0.5))
+
+    with pytest.raises(ValueError):
+        a.combine(b, '__add__', domain='everything')
+
+
+def test_resample_kinds():
+    x = np.array([0., 1., 2.])
+    y = np.array([0., 10., 20.])
+    xi = np.array([-1., 0.4, 0.6, 1., 1.5, 3.])
+
+    np.testing.assert_allclose(resample(x, y, xi, 'linear'), [0., 4., 6., 10., 15., 20.])
+    np.testing.assert_allclose(resample(x, y, xi, 'step'), [0., 0., 0., 10., 10., 20.])
+    np.testing.assert_allclose(resample(x, y, xi, 'nearest'), [0., 0., 10., 10., 10., 20.])
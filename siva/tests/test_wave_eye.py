@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from siva.waveforms import Wave, EyeDiagram
+from siva.waveforms.clock import ClockSource
+
+UI = 1e-9
+
+
+def nrz(n_bits=400, samples_per_ui=20, seed=0, amplitude=1.0):
+    """An NRZ waveform with linear transitions of 0.2 UI, centered on the UI boundaries."""
+    bits = np.random.default_rng(seed).integers(0, 2, n_bits)*2 - 1.0
+    x = np.arange(n_bits*samples_per_ui)*(UI/samples_per_ui)
+    levels = amplitude*np.repeat(bits, samples_per_ui)
+    # Transitions between x = (k - 0.1)UI and (k + 0.1)UI
+    t = (x % UI)/UI
+    previous = np.concatenate(([levels[0]]*samples_per_ui, levels[:-samples_per_ui]))
+    ramp = np.clip((t + 0.1)/0.2, 0, 1)
+    y = np.where(t < 0.1, previous + (levels - previous)*ramp, levels)
+    ramp = np.clip((t - 0.9)/0.2, 0, 1)
+    following = np.concatenate((levels[samples_per_ui:], [levels[-1]]*samples_per_ui))
+    y = np.where(t > 0.9, levels + (following - levels)*ramp, y)
+    return Wave(x=x, y=y)
+
+
+def test_wave_statistics():
+    w = Wave(x=np.arange(4.), y=[1., -1., 1., -1.])
+    assert w.rms() == 1.0
+
+    h = w.histogram(bins=2, range=(-2, 2))
+    assert list(h.x) == [-1, 1]
+    assert list(h.y) == [2, 2]
+
+    p = w.pdf(bins=4, range=(-2, 2))
+    assert np.sum(p.y)*1.0 == pytest.approx(1.0)
+
+    c = w.cdf()
+    assert list(c.x) == [-1, -1, 1, 1]
+    assert c.y[-1] == 1.0
+
+
+def test_eye():
+    w = nrz()
+    eye = w.eye(ui=UI, y_range=(-1.5, 1.5), bins=(100, 60))
+
+    # Transitions are at the edges of the eye, the center is half a UI in
+    assert eye.center(level=0) == pytest.approx(UI/2, abs=2*eye.dt)
+    assert eye.clipped == 0
+    assert eye.height(level=0) == pytest.approx(2.0, abs=2*eye.dy)
+    # Without jitter, every edge crosses the level at the UI boundary
+    assert eye.width(level=0) == pytest.approx(UI, abs=2*eye.dt)
+
+    pdf = eye.pdf()
+    assert np.sum(pdf.y)*eye.dy == pytest.approx(1.0)
+    # Only the rails at the center
+    assert pdf.y[np.abs(pdf.x) < 0.9].sum() == 0
+
+    tub = eye.bathtub(level=0)
+    assert len(tub) == 100
+    assert tub.y[0] == 0.5
+    assert tub.y[50] == 0
+
+
+def test_bathtub_jitter():
+    # Edges spread over +/- 0.1 UI:  the bathtub rises over the first and last 0.1 UI
+    w = nrz(n_bits=2000)
+    jitter = np.random.default_rng(1).uniform(-0.1, 0.1, len(w))*UI
+    w = Wave(x=w.x + np.repeat(jitter[::20], 20), y=w.y)
+    eye = EyeDiagram(ui=UI, y_range=(-1.5, 1.5), bins=(100, 60), resample=False)
+    eye.add(w)
+
+    tub = eye.bathtub(level=0)
+    assert tub.y[0] > 0.1 and tub.y[-1] > 0.1
+    assert tub.y[15:85].max() == 0
+    assert eye.width(level=0) == pytest.approx(0.8*UI, abs=0.1*UI)
+
+
+def test_eye_chunks():
+    # Adding a waveform in chunks is the same as adding it at once
+    w = nrz(n_bits=100)
+    whole = EyeDiagram.from_wave(w, ui=UI, y_range=(-1.5, 1.5), bins=(50, 30))
+
+    eye = EyeDiagram(clock=ClockSource(period=UI), y_range=(-1.5, 1.5), bins=(50, 30), chunk_size=37)
+    eye.extend((w.x[i:i + 333], w.y[i:i + 333]) for i in range(0, len(w.x), 333))
+    np.testing.assert_array_equal(eye.counts, whole.counts)
+    assert eye.total == whole.total
+
+
+def test_eye_samples():
+    # Without resampling, every sample is counted once
+    w = nrz(n_bits=50, amplitude=2.0)
+    eye = EyeDiagram(ui=UI, y_range=(-1.5, 1.5), bins=(20, 30), resample=False)
+    eye.add(w)
+    assert eye.total + eye.clipped == len(w)
+    assert eye.clipped > 0
+
+    with pytest.raises(ValueError):
+        EyeDiagram()
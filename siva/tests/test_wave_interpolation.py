@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from siva.waveforms.wave import Wave
+from siva.waveforms.interpolation import Interpolator
+
+
+def test_fast_kinds():
+    w = Wave(x=[0., 1., 2.], y=[0., 10., 20.])
+
+    # Linear extrapolates
+    np.testing.assert_allclose(w([-1., 0.5, 3.]).y, [-10., 5., 30.])
+
+    # Step is undefined outside of the domain
+    y = w([-1., 0.5, 1., 2.], kind='step').y
+    assert np.isnan(y[0])
+    np.testing.assert_allclose(y[1:], [0., 10., 20.])
+
+    np.testing.assert_allclose(w([0.4, 0.6, 5.], kind='nearest').y, [0., 10., 20.])
+
+    with pytest.raises(ValueError):
+        w([3.], bounds_error=True)
+
+
+def test_unsorted():
+    f = Interpolator([2., 0., 1.], [20., 0., 10.])
+    np.testing.assert_allclose(f([0.5, 1.5]), [5., 15.])
+
+
+def test_memoized():
+    x = np.linspace(0, 1, 101)
+    w = Wave(x=x, y=x**2, interp='cubic')
+
+    f = w.interpolator()
+    assert w.interpolator() is f
+    np.testing.assert_allclose(w(0.5).y, [0.25])
+
+    # Assigning new data discards the fitted spline
+    w.y = x**3
+    assert w.interpolator() is not f
+    np.testing.assert_allclose(w(0.5).y, [0.125])
@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+
+from siva.waveforms import PackedPattern, Pattern, Logic
+
+
+def test_creation():
+    p = PackedPattern([0, 1, 2, 3, 4])
+    assert p.width == 3
+    assert p.words.dtype == np.uint8
+    assert list(p) == [0, 1, 2, 3, 4]
+    assert len(p) == 5
+
+    assert PackedPattern([1], width=12).words.dtype == np.uint16
+    assert PackedPattern([1], width=64).words.dtype == np.uint64
+
+    for p in (PackedPattern(), PackedPattern([], width=4), PackedPattern(np.array([]), format="twos_complement")):
+        assert len(p) == 0
+        assert list(p) == []
+        assert p.words.dtype == np.uint8
+        assert len(p.values) == 0
+    assert PackedPattern().width == 1
+    assert PackedPattern([], width=4).width == 4
+    assert PackedPattern([-4, 3], format="twos_complement").width == 3
+    assert PackedPattern([-4, 3], format="sign_magnitude").width == 4
+
+    with pytest.raises(ValueError):
+        PackedPattern([1], width=65)
+    with pytest.raises(ValueError):
+        PackedPattern([1], format="ones_complement")
+
+
+def test_signed_formats():
+    p = PackedPattern([0x12, 0xff, 0x80, 0x7f], width=8, format="twos_complement")
+    assert list(p.values) == [18, -1, -128, 127]
+
+    # Encoded words
+    words = np.array([0x12, 0xff, 0x80, 0x7f], dtype=np.uint8)
+    p = PackedPattern(words, width=8, format="sign_magnitude")
+    assert list(p.values) == [18, -127, 0, 127]
+
+    # Negative values are encoded
+    p = PackedPattern([-1, -3, 3], width=4, format="twos_complement")
+    assert list(p.words) == [0b1111, 0b1101, 0b0011]
+    p = PackedPattern([-1, -3, 3], width=4, format="sign_magnitude")
+    assert list(p.words) == [0b1001, 0b1011, 0b0011]
+
+    p = PackedPattern([-1, 2**62], width=64, format="twos_complement")
+    assert list(p.values) == [-1, 2**62]
+    assert p.words[0] == 2**64 - 1
+    p = PackedPattern([-5], width=64, format="sign_magnitude")
+    assert list(p.values) == [-5]
+
+
+def test_bit_selection():
+    p = PackedPattern([0b10110010, 0b01001111], width=8)
+    assert list(p.bits[7:4]) == [0b1011, 0b0100]
+    assert p.bits[7:4].width == 4
+    assert list(p.bits[3:0]) == [0b0010, 0b1111]
+    assert list(p.bits[1]) == [1, 1]
+    assert list(p.bits[7]) == [1, 0]
+    assert list(p.bits[0:3]) == [0b0100, 0b1111]
+    assert list(p.bits[:4]) == [0b1011, 0b0100]
+
+    with pytest.raises(IndexError):
+        p.bits[8]
+    with pytest.raises(IndexError):
+        p.bits[9:4]
+
+    assert list(PackedPattern.concat(p.bits[3:0], p.bits[7:4])) == [0b00101011, 0b11110100]
+
+
+def test_operations():
+    p = PackedPattern([0b0101, 0b1100], width=4)
+    assert list(~p) == [0b1010, 0b0011]
+    assert list(p & 0b0110) == [0b0100, 0b0100]
+    assert list(p | PackedPattern([0b0010, 0b0001], width=4)) == [0b0111, 0b1101]
+    assert list(p ^ p) == [0, 0]
+    assert list(p << 1) == [0b1010, 0b1000]
+    assert list(p >> 2) == [0b0001, 0b0011]
+
+    # Arithmetic wraps at the width
+    assert list(p + 5) == [10, 1]
+    assert list(p - 6) == [15, 6]
+    assert list(3 - p) == [14, 7]
+    assert list(-p) == [11, 4]
+    assert list(p == [5, 0]) == [True, False]
+
+    s = PackedPattern([-8, 7], width=4, format="twos_complement")
+    assert list(s + 1) == [-7, -8]
+    assert list(s > 0) == [False, True]
+    assert s.min() == -8
+
+    m = PackedPattern([-3, 3], width=4, format="sign_magnitude")
+    assert list(m*2) == [-6, 6]
+    assert list(-m) == [3, -3]
+
+    # Selection keeps the width and format
+    assert s[0] == -8
+    assert list(s[::-1]) == [7, -8]
+    assert s[1:].format == "twos_complement"
+
+
+def test_pack():
+    bits = np.array([1, 0, 1, 1, 0, 0, 1, 0, 1, 1])
+    p = PackedPattern.pack(bits, width=3)
+    assert list(p) == [0b101, 0b100, 0b101]
+    np.testing.assert_array_equal(p.unpack(), bits[:9])
+
+    p = PackedPattern.pack(bits, width=5, msb_first=False)
+    assert list(p) == [0b01101, 0b11010]
+    np.testing.assert_array_equal(p.unpack(msb_first=False), bits)
+
+
+def test_pattern():
+    p = PackedPattern.from_pattern(Pattern([0, 1, 2, 3, 4], width=4))
+    assert p.width == 4
+    assert list(p) == [0, 1, 2, 3, 4]
+    assert [int(b) for b in p.to_pattern()] == [0, 1, 2, 3, 4]
+
+
+def test_logic():
+    p = PackedPattern([1, 1, 0, 3, 3, 3, 2], width=2)
+    l = p.to_logic(period=1e-9)
+    assert isinstance(l, Logic)
+    np.testing.assert_allclose(l.x, [0, 2e-9, 3e-9, 6e-9])
+    assert list(l.y) == [1, 0, 3, 2]
+    assert len(p.to_logic(reduce=False)) == 7
+
+    # Sampled once per period, back to the words
+    l = Logic(x=np.append(l.x, 7e-9), y=np.append(l.y, 2))
+    assert list(PackedPattern.from_logic(l, period=1e-9)) == list(p)
+    assert list(PackedPattern.from_logic(l, width=2)) == [1, 0, 3, 2, 2]
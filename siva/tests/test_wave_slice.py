@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from siva.waveforms.wave import Wave
+from siva.waveforms.logic import Logic
+
+
+def test_pam2():
+    w = Wave(x=[0, 1, 2, 3, 4, 5], y=[-1., 1., 1., -1., -1., 1.])
+    l = w.slice([0], values=[-1, 1])
+    assert isinstance(l, Logic)
+    np.testing.assert_allclose(l.x, [0, 0.5, 2.5, 4.5])
+    assert list(l.y) == [-1, 1, -1, 1]
+
+
+def test_pam4():
+    # Rises through each level, then falls from the top to the bottom in one step
+    w = Wave(x=[0, 1, 2, 3, 4], y=[-3., -1., 1., 3., -3.])
+    l = w.slice([-2, 0, 2], values=[-3, -1, 1, 3])
+    np.testing.assert_allclose(l.x, [0, 0.5, 1.5, 2.5, 3.5])
+    assert list(l.y) == [-3, -1, 1, 3, -3]
+
+    # Default values are the symbol numbers
+    assert list(w.slice([-2, 0, 2]).y) == [0, 1, 2, 3, 0]
+
+
+def test_level_boundary():
+    # Samples on a level are in the region below it.  Touching a level is not a change.
+    w = Wave(x=[0, 1, 2, 3], y=[0., 1., 0., -1.])
+    l = w.slice([0])
+    assert list(l.x) == [0, 0, 2]
+    assert list(l.y) == [0, 1, 0]
+
+    w = Wave(x=[0, 1, 2], y=[-1., 0., -1.])
+    assert list(w.slice([0]).y) == [0]
+
+
+def test_many_levels():
+    y = np.linspace(0, 1, 101)
+    levels = np.linspace(0.005, 0.995, 100)
+    l = Wave(x=np.arange(101.), y=y).slice(levels)
+    np.testing.assert_array_equal(l.y, np.arange(101))
+    np.testing.assert_allclose(l.x[1:], np.arange(100) + 0.5)
+
+
+def test_errors():
+    w = Wave(x=[0, 1], y=[0., 1.])
+    with pytest.raises(ValueError):
+        w.slice([0.5], values=[0, 1, 2])
+    with pytest.raises(ValueError):
+        w.slice([0.5, 0.2])
+    with pytest.raises(ValueError):
+        w.slice()
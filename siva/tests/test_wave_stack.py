@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from siva.waveforms import Wave, WaveStack
+from siva.simulation.measurement import Measurement, evaluate_batch
+from siva.simulation.table import Table
+
+
+@pytest.fixture
+def waves():
+    x = np.linspace(0, 1, 101)
+    return [Wave(x=x, y=np.sin(2*np.pi*f*x) + offset) for f, offset in ((1, 0.), (2, 0.5), (3, -0.25))]
+
+
+def test_from_waves(waves):
+    s = WaveStack.from_waves(waves)
+    assert len(s) == 3
+    assert s.y.shape == (101, 3)
+    np.testing.assert_array_equal(s[1].y, waves[1].y)
+
+    assert WaveStack.from_waves(waves + [Wave(x=np.linspace(0, 2, 101), y=np.zeros(101))]) is None
+    assert WaveStack.from_waves([]) is None
+
+
+def test_operations(waves):
+    s = WaveStack.from_waves(waves)
+    offsets = np.array([1., 2., 3.])
+
+    np.testing.assert_allclose(s.max(), [w.max() for w in waves])
+    np.testing.assert_allclose((s - offsets).min(), [w.min() - o for w, o in zip(waves, offsets)])
+    np.testing.assert_allclose((2*s + s).mean(), [3*w.mean() for w in waves], atol=1e-12)
+    np.testing.assert_allclose((-s).ptp(), [w.ptp() for w in waves])
+    np.testing.assert_allclose(s.xmax(), [w.xmax() for w in waves])
+    np.testing.assert_allclose(s(0.25), [np.interp(0.25, w.x, w.y) for w in waves])
+    assert s([0.1, 0.2]).shape == (2, 3)
+
+
+def test_cross(waves):
+    s = WaveStack.from_waves(waves)
+    rising = s.cross(0.1, 'rising')
+
+    for i, w in enumerate(waves):
+        # Crossings, by linear interpolation between the samples on each side
+        y = w.y - 0.1
+        j = np.nonzero((y[:-1] < 0) & (y[1:] >= 0))[0]
+        expected = w.x[j] + (w.x[j + 1] - w.x[j])*-y[j]/(y[j + 1] - y[j])
+        np.testing.assert_allclose(rising[:len(expected), i], expected)
+        assert np.isnan(rising[len(expected):, i]).all()
+
+    assert np.isnan(s.cross(10)[0]).all()
+
+
+def test_evaluate_batch(waves):
+    t = Table()
+    for i, w in enumerate(waves):
+        t.add_row({'vdd': 1.0 + i, 'out': w})
+
+    m = Measurement('(out - vdd).max()', name='margin', batch=True)
+    evaluate_batch(m, t)
+    np.testing.assert_allclose(t['margin'], [w.max() - 1 - i for i, w in enumerate(waves)])
+
+    m = Measurement("out.cross(0.5, 'rising')[0]", name='t_cross', batch=True)
+    evaluate_batch(m, t)
+    assert t.columns['t_cross'].dtype == float
+    assert len(t['t_cross']) == 3
+
+    # A scalar is repeated for every row
+    evaluate_batch(Measurement('vdd.mean()', name='avg', batch=True), t)
+    assert list(t['avg']) == [2.0]*3
+
+
+def test_evaluate_batch_fallback(waves):
+    # Waves with different x values can't be stacked.  They are measured one row at a time.
+    t = Table()
+    t.add_row({'out': waves[0]})
+    t.add_row({'out': Wave(x=np.linspace(0, 2, 11), y=np.arange(11.))})
+    t.add_row({'out': waves[2]})
+
+    evaluate_batch(Measurement('out.max()', name='peak', batch=True), t)
+    np.testing.assert_allclose(t['peak'], [waves[0].max(), 10., waves[2].max()])
+
+    evaluate_batch(Measurement('out.nonexistent()', name='bad', batch=True), t)
+    assert t.columns['bad'].tolist() == [None]*3
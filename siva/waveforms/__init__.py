@@ -1,6 +1,10 @@
 from .wave import Wave
+from .lazy import LazyWave
 from .logic import Logic
 from .diff import Diff
-from .clock import ClockSource
+from .clock import ClockSource, Clock
 from .pattern import Pattern
-from .binary import Binary
\ No newline at end of file
+from .binary import Binary
+from .stack import WaveStack
+from .eye import EyeDiagram
+from .packed import PackedPattern
@@ -1,25 +1,26 @@
 import numpy as np
 from ..waveforms import Wave
 
+EDGES = ('rising', 'falling', 'both')
+
+
 class ClockBase:
     """ A mixin class for adding clock like behavior to a waveform.
 
+    Subclasses implement ticks(), which returns the times of the clock's edges as an array.
+    Periods, phase and jitter are computed from the ticks with array operations.
     """
 
-    def ticks(self):
+    def ticks(self, n=None, edge='rising', stop=None):
         """Returns the first n ticks of the clock.
         """
         raise NotImplementedError
 
-    def periods(self):
-        ticks = self.ticks()
-        periods = np.diff(ticks)
-        x = np.array(ticks)
-        y = periods
-        np.append(y, y[-1])
+    def periods(self, edge='rising'):
+        """Returns the period starting at each tick, as a waveform."""
+        ticks = self.ticks(edge=edge)
         name = "Periods({})".format(self.name)
-        w = Wave(name=name, x=x, y=y)
-        return w
+        return Wave(name=name, x=ticks[:-1], y=np.diff(ticks))
 
     def phase(self):
         """Returns the phase of this clock as a waveform.  The Y values of the waveform
@@ -27,7 +28,7 @@ class ClockBase:
         completed.
         """
         x = self.ticks()
-        y = np.range(len(x))
+        y = np.arange(len(x))
         name = "Phase({})".format(self.name)
         w = Wave(name=name, x=x, y=y)
         return w
@@ -36,36 +37,46 @@ class ClockBase:
         """ Calculates different types of clock jitter.
 
         period:  Period jitter is measured as the difference between a given clock period and the ideal period.
+        With *n_cycles* > 1, the span of n_cycles periods is compared to n_cycles ideal periods (N-period jitter).
 
-        cycle: (Cycle-cycle jitter) is measured as the difference between two adjacent periods
+        cycle: (Cycle-cycle jitter) is measured as the difference between two adjacent periods (or spans of
+        n_cycles periods).
 
         tie:  (Time interval error):  Measures the time difference between an edge of the jittered
-        clock and the corresponding edge of the ideal clock.
+        clock and the corresponding edge of the ideal clock.  The ideal clock's phase (and, if *ideal* is
+        None, its period) is fit to the edges by least squares.
 
+        :param ideal: Ideal period.  If None, the average period.
+        :param n: Number of ticks used.  If None, all of them.
+        :return: A waveform of the jitter at the tick starting each measurement.
         """
 
         # Get a list of all the clock crossings
-        ticks = self.ticks(edge=edge)
-
-        periods = np.diff(ticks)
+        ticks = np.asarray(self.ticks(edge=edge), dtype=float)
+        if n is not None:
+            ticks = ticks[:n]
 
-        if ideal is None:
-            ideal = np.average(periods)
+        if edge == "both":
+            # Ticks are half a period apart
+            n_cycles = 2*n_cycles
+            if ideal is not None:
+                ideal = ideal/2
 
         if type == "period":
-            x = np.array(ticks)
-
-            y = periods - ideal
-
-            # y[n] represents the period between x[n] and x[n+1].
-            # Repeat the last yvalue so the x and y vectors have the same length
-            np.append(y, y[-1])
-
+            if ideal is None:
+                ideal = (ticks[-1] - ticks[0])/(len(ticks) - 1)
+            x = ticks[:-n_cycles]
+            y = (ticks[n_cycles:] - ticks[:-n_cycles]) - n_cycles*ideal
             name = "Period Jitter({})".format(self.name)
         elif type == "cycle":
-            raise NotImplementedError("Cycle cycle jitter is not implemented")
+            spans = ticks[n_cycles:] - ticks[:-n_cycles]
+            x = ticks[:-2*n_cycles]
+            y = spans[n_cycles:] - spans[:-n_cycles]
+            name = "Cycle Jitter({})".format(self.name)
         elif type == "tie":
-            raise NotImplementedError("Time Interval Error jitter is not implemented")
+            x = ticks
+            y = ticks - self._ideal_ticks(ticks, ideal)
+            name = "TIE({})".format(self.name)
         else:
             raise ValueError("Jitter type uknown: {}".format(type))
 
@@ -73,6 +84,49 @@ class ClockBase:
 
         return w
 
+    @staticmethod
+    def _ideal_ticks(ticks, period=None):
+        """The ideal clock closest (least squares) to *ticks*, with the given *period* or a fitted one."""
+        k = np.arange(len(ticks), dtype=float)
+        k_mean = k.mean()
+        t_mean = ticks.mean()
+        if period is None:
+            dk = k - k_mean
+            period = np.dot(dk, ticks - t_mean)/np.dot(dk, dk)
+        return t_mean + (k - k_mean)*period
+
+    def jitter_spectrum(self, ideal=None, n=None, edge="rising"):
+        """ Returns the power spectral density of the time interval error, in s^2/Hz, as a waveform.  The
+        TIE is sampled once per period, so the spectrum extends to half the clock's frequency.  A Hann
+        window is applied.
+        """
+        tie = self.jitter(ideal=ideal, n=n, edge=edge, type="tie")
+        period = (tie.x[-1] - tie.x[0])/(len(tie.x) - 1)
+
+        window = np.hanning(len(tie.y))
+        spectrum = np.abs(np.fft.rfft(tie.y*window))**2*period/np.dot(window, window)
+        # One sided
+        spectrum[1:len(tie.y) - len(spectrum) + 1] *= 2
+
+        x = np.fft.rfftfreq(len(tie.y), period)
+        name = "Jitter Spectrum({})".format(self.name)
+        return Wave(name=name, x=x, y=spectrum)
+
+    def phase_noise(self, ideal=None, n=None, edge="rising"):
+        """ Returns the single sideband phase noise, L(f) in dBc/Hz, of the clock as a waveform.  (See
+        jitter_spectrum)
+        """
+        psd = self.jitter_spectrum(ideal=ideal, n=n, edge=edge)
+        period = ideal
+        if period is None:
+            ticks = self.ticks()
+            period = (ticks[-1] - ticks[0])/(len(ticks) - 1)
+        with np.errstate(divide='ignore'):
+            y = 10*np.log10((2*np.pi/period)**2*psd.y/2)
+        name = "Phase Noise({})".format(self.name)
+        return Wave(name=name, x=psd.x[1:], y=y[1:])
+
+
 class ClockSource(ClockBase):
     def __init__(self, period=None, frequency=None, phase=0, duty=0.5, stop=None, name=None):
         """
@@ -104,29 +158,68 @@ class ClockSource(ClockBase):
             name = "Clk"
         self.name = name
 
-    def ticks(self, n=None, edge='rising'):
-        if n is None and self.stop is None:
+    def ticks(self, n=None, edge='rising', stop=None):
+        """ Returns the times of the clock's edges, as an array.
+
+        :param n: Number of ticks.  If None, the ticks up to *stop*.
+        :param edge: 'rising', 'falling', or 'both'
+        :param stop: Time of the last tick.  Defaults to the clock's stop time.
+        """
+        if edge not in EDGES:
+            raise ValueError("Edge type must be 'rising', 'falling', or 'both")
+
+        if stop is None:
+            stop = self.stop
+        if n is None and stop is None:
             raise ValueError("Need to provide number of desired clock ticks")
 
         if n is None:
-            n_rise = int((self.stop-self.phase)/self.period) + 1
-            n_fall = int((self.stop-self.phase-self.period*0.5)/self.period) + 1
+            n_rise = int((stop-self.phase)/self.period) + 1
+            n_fall = int((stop-self.phase-self.period*self.duty)/self.period) + 1
         else:
             n_rise = n
             n_fall = n
 
-        ticks = []
-        if edge == 'rising' or edge == 'both':
-            ticks.extend([self.phase + i*self.period for i in range(n_rise)])
-        elif edge == 'falling' or edge == 'both':
-            assert self.duty is not None
-            ticks.extend([self.phase + i*self.period + self.period*self.duty for i in range(n_fall)])
+        rising = self.phase + np.arange(max(n_rise, 0))*self.period
+        falling = rising[:max(n_fall, 0)] + self.period*self.duty
+
+        if edge == 'rising':
+            ticks = rising
+        elif edge == 'falling':
+            ticks = falling
         else:
-            raise ValueError("Edge type must be 'rising', 'falling', or 'both")
+            # Edges alternate, starting with a rising edge
+            ticks = np.empty(len(rising) + len(falling))
+            ticks[0::2] = rising
+            ticks[1::2] = falling
 
         if n is not None:
-            ticks = [ticks[i] for i in range(n)]
+            ticks = ticks[:n]
 
         return ticks
 
 
+class Clock(ClockBase, Wave):
+    """ A waveform used as a clock, such as a simulated clock signal.  Its ticks are its crossings of its
+    threshold (Default: halfway between its minimum and maximum).
+    """
+
+    def ticks(self, n=None, edge='rising', stop=None):
+        if edge not in EDGES:
+            raise ValueError("Edge type must be 'rising', 'falling', or 'both")
+
+        threshold = self.threshold
+        if threshold is None:
+            threshold = (self.y.min() + self.y.max())/2
+
+        ticks = self.cross(threshold, edge=edge)
+
+        # A sample at the threshold is found by the crossings before and after it
+        if len(ticks) > 1:
+            ticks = ticks[np.concatenate(([True], np.diff(ticks) > 0))]
+
+        if stop is not None:
+            ticks = ticks[:np.searchsorted(ticks, stop, side='right')]
+        if n is not None:
+            ticks = ticks[:n]
+        return ticks
@@ -0,0 +1,239 @@
+"""
+Eye diagrams of long transients.
+
+A waveform is folded at a unit interval (UI) and accumulated into a 2-D histogram of
+(time within the UI, y) counts.  Only the histogram is kept, so a capture can be added in
+chunks, and never needs to be in memory at once:
+
+    >>> eye = EyeDiagram(ui=100e-12, y_range=(-0.6, 0.6))
+    >>> for x, y in chunks:             # E.g., slices of an HDF5 dataset
+    ...     eye.add(x, y)
+    >>> eye.height(), eye.width()
+    >>> eye.bathtub()                   # BER vs. sampling time, as a Wave
+
+By default, each chunk is resampled to one point per time bin, so the variable time steps of
+a spice transient don't weight the histogram.
+"""
+import math
+
+import numpy as np
+
+from .wave import Wave
+
+
+class EyeDiagram:
+    """ A density histogram of a waveform folded at a unit interval.
+
+    :param ui: Unit interval, in seconds.
+    :param clock: A ClockSource.  Its period is the unit interval, and its phase the time of the eye's left edge.
+    :param y_range: (min, max) of the y bins.  If None, the range of the first chunk, with a margin of 10%.
+                    Samples outside the range are counted in *clipped*.
+    :param bins: Number of (time, y) bins.
+    :param n_ui: Number of unit intervals the time bins span.
+    :param offset: Time of the eye's left edge.
+    :param resample: Resample the waveform to one point per time bin.  If False, each sample is counted.
+    :param chunk_size: Number of points binned at once.
+    """
+    def __init__(self, ui=None, clock=None, y_range=None, bins=(100, 100), n_ui=1, offset=None, resample=True,
+                 chunk_size=1000000):
+        if clock is not None:
+            ui = clock.period
+            if offset is None:
+                offset = clock.phase
+        if ui is None:
+            raise ValueError("Either ui or clock must be provided")
+
+        self.ui = ui
+        self.n_ui = n_ui
+        self.offset = 0.0 if offset is None else offset
+        self.resample = resample
+        self.chunk_size = chunk_size
+
+        self.nx, self.ny = bins
+        self.span = n_ui*ui
+        self.dt = self.span/self.nx
+
+        self.y_edges = None
+        if y_range is not None:
+            self._set_range(*y_range)
+
+        self.counts = np.zeros((self.nx, self.ny), dtype=np.int64)
+        self.clipped = 0
+        self._sum = 0.0
+        self._n = 0
+
+        # The last point of the previous chunk, and the next resampled point
+        self._last = None
+        self._next = None
+
+    @classmethod
+    def from_wave(cls, wave, *args, **kwargs):
+        eye = cls(*args, **kwargs)
+        eye.add(wave)
+        return eye
+
+    def _set_range(self, lo, hi):
+        self.y_edges = np.linspace(lo, hi, self.ny + 1)
+        self.dy = (hi - lo)/self.ny
+
+    @property
+    def x_edges(self):
+        """Edges of the time bins, from the eye's left edge"""
+        return np.arange(self.nx + 1)*self.dt
+
+    @property
+    def x_centers(self):
+        return (np.arange(self.nx) + 0.5)*self.dt
+
+    @property
+    def y_centers(self):
+        return (self.y_edges[:-1] + self.y_edges[1:])/2
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    @property
+    def mean(self):
+        """Mean of the binned points.  The default decision level."""
+        return self._sum/self._n if self._n else None
+
+    def add(self, x, y=None):
+        """Adds a chunk of a waveform:  a Wave, or its x and y values.  Chunks must be added in order."""
+        if y is None:
+            x, y = x.x, x.y
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if len(x) == 0:
+            return
+
+        if self.y_edges is None:
+            lo, hi = np.nanmin(y), np.nanmax(y)
+            margin = 0.1*(hi - lo) if hi > lo else 1.0
+            self._set_range(lo - margin, hi + margin)
+
+        if self.resample:
+            self._add_resampled(x, y)
+        else:
+            for start in range(0, len(x), self.chunk_size):
+                xs = x[start:start + self.chunk_size]
+                k = np.floor(((xs - self.offset) % self.span)/self.dt).astype(np.intp)
+                self._bin(np.minimum(k, self.nx - 1), y[start:start + self.chunk_size])
+
+    def extend(self, chunks):
+        """Adds each of *chunks*:  Waves, or (x, y) pairs."""
+        for chunk in chunks:
+            if isinstance(chunk, Wave):
+                self.add(chunk)
+            else:
+                self.add(*chunk)
+
+    def _add_resampled(self, x, y):
+        # Points at offset + k*dt, interpolated across the boundary with the previous chunk
+        if self._last is not None:
+            x = np.concatenate(([self._last[0]], x))
+            y = np.concatenate(([self._last[1]], y))
+        self._last = (x[-1], y[-1])
+
+        first = math.ceil((x[0] - self.offset)/self.dt)
+        if self._next is not None:
+            first = max(first, self._next)
+        last = math.floor((x[-1] - self.offset)/self.dt)
+
+        for start in range(first, last + 1, self.chunk_size):
+            k = np.arange(start, min(start + self.chunk_size, last + 1))
+            self._bin(k % self.nx, np.interp(self.offset + k*self.dt, x, y))
+        self._next = max(first, last + 1)
+
+    def _bin(self, k, y):
+        j = np.floor((y - self.y_edges[0])/self.dy).astype(np.intp)
+        inside = (j >= 0) & (j < self.ny)
+        n = np.count_nonzero(inside)
+        self.clipped += len(j) - n
+        if n < len(j):
+            k, j, y = k[inside], j[inside], y[inside]
+        self._sum += y.sum()
+        self._n += n
+        self.counts += np.bincount(k*self.ny + j, minlength=self.nx*self.ny).reshape(self.nx, self.ny)
+
+    def _row(self, level):
+        if level is None:
+            level = self.mean
+        return min(max(int((level - self.y_edges[0])//self.dy), 0), self.ny - 1)
+
+    def _column(self, t):
+        return int((t % self.span)//self.dt)
+
+    def center(self, level=None):
+        """ Returns the time of the eye's center:  the middle of the longest run of time bins with no points
+        at the decision *level* (Default: the mean), or the bin with the fewest.
+        """
+        c = self.counts[:, self._row(level)]
+        empty = c == c.min()
+        if empty.all():
+            return self.span/2
+
+        # Longest run of empty bins, around the end of the span
+        start = np.argmin(empty)
+        empty = np.roll(empty, -start)
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], empty.view(np.int8), [0]))))
+        runs = edges.reshape(-1, 2)
+        longest = runs[np.argmax(runs[:, 1] - runs[:, 0])]
+        return ((start + longest.mean())*self.dt) % self.span
+
+    def pdf(self, t=None):
+        """Returns the density of y at time *t* (Default: the eye's center) as a Wave."""
+        c = self.counts[self._column(self.center() if t is None else t)]
+        return Wave(x=self.y_centers, y=c/max(c.sum(), 1)/self.dy, name="PDF", interp='nearest')
+
+    def cdf(self, t=None):
+        """Returns the cumulative distribution of y at time *t* (Default: the eye's center) as a Wave."""
+        c = self.counts[self._column(self.center() if t is None else t)]
+        return Wave(x=self.y_edges[1:], y=np.cumsum(c)/max(c.sum(), 1), name="CDF")
+
+    def height(self, t=None, level=None, ber=0.0):
+        """ Returns the vertical opening at time *t* (Default: the eye's center) around the decision *level*
+        (Default: the mean).  The inner edges are where the fraction of points of the upper and lower
+        rails past them exceeds *ber*.
+        """
+        row = self._row(level)
+        c = self.counts[self._column(self.center(level) if t is None else t)]
+        total = c.sum()
+        if total == 0 or c[row] > ber*total:
+            return 0.0
+
+        upper = np.cumsum(c[row + 1:])
+        lower = np.cumsum(c[:row][::-1])
+        top = np.argmax(upper > ber*upper[-1]) if len(upper) and upper[-1] else len(upper)
+        bottom = np.argmax(lower > ber*lower[-1]) if len(lower) and lower[-1] else len(lower)
+        return (top + bottom + 1)*self.dy
+
+    def bathtub(self, level=None, density=0.5):
+        """ Returns the bit error rate vs. the sampling time, within one UI centered on the eye, as a Wave.
+
+        Points at the decision *level* (Default: the mean) half a UI from the eye's center are taken as the
+        distribution of the crossings.  The eye's right edge crosses one UI after its left.  The error rate
+        at a time is the probability that the left edge crosses later, or the right edge earlier, times the
+        transition *density*.
+        """
+        n = int(round(self.ui/self.dt))
+        boundary = (self._column(self.center(level)) - n//2) % self.nx
+
+        # Crossings, from half a UI before the boundary to half a UI after
+        c = np.roll(self.counts[:, self._row(level)], n//2 - boundary)[:n]
+        total = max(c.sum(), 1)
+        after = np.cumsum(c[::-1])[::-1]/total
+        before = np.cumsum(c)/total
+
+        late = np.zeros(n)
+        late[:n - n//2] = after[n//2:]
+        early = np.zeros(n)
+        early[n - n//2:] = before[:n//2]
+
+        x = (np.arange(n) - n//2 + 0.5)*self.dt
+        return Wave(x=x, y=density*(late + early), name="Bathtub")
+
+    def width(self, level=None, ber=0.0, density=0.5):
+        """Returns the horizontal opening at the decision *level*:  the time the bathtub curve is at or below *ber*."""
+        tub = self.bathtub(level, density=density)
+        return np.count_nonzero(tub.y <= ber)*self.dt
@@ -0,0 +1,122 @@
+"""
+Vectorized interpolation of waveform data.
+
+'linear', 'step'/'zero' and 'nearest' interpolation are computed directly with np.interp and
+np.searchsorted.  The spline kinds ('slinear', 'quadratic', 'cubic') use SciPy.
+
+An Interpolator sorts its data and fits its spline once, so it can be called repeatedly
+with little overhead.  Waves keep one Interpolator per kind (see Wave.interpolator).
+"""
+import numpy as np
+
+KINDS = ('linear', 'nearest', 'zero', 'slinear', 'quadratic', 'cubic', 'step')
+
+# What to return outside the range of the data
+OUTSIDE = ('extrapolate', 'hold', 'nan')
+
+SPLINE_ORDER = {'slinear': 1,
+                'quadratic': 2,
+                'cubic': 3,
+                }
+
+
+def is_ascending(x):
+    return len(x) < 2 or bool((x[1:] >= x[:-1]).all())
+
+
+def sort_xy(x, y):
+    """Returns x and y sorted by x, without copying if x is already ascending."""
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if is_ascending(x):
+        return x, y
+    i = np.argsort(x, kind='mergesort')
+    return x[i], y[i]
+
+
+def resample(x, y, xi, kind='linear'):
+    """ Returns the values of the y(x) at *xi*.
+
+    Outside the range of *x*, the first and last values of *y* are held.
+
+    :param x: Ascending x values
+    :param y: y values
+    :param xi: x values to interpolate at
+    :param kind: One of KINDS
+    """
+    if kind not in KINDS:
+        raise ValueError("Unknown interpolation: {}".format(kind))
+    xi = np.asarray(xi)
+    n = len(x)
+
+    if kind in ('zero', 'step'):
+        # The last sample at or before xi
+        i = np.searchsorted(x, xi, side='right') - 1
+        return y[np.clip(i, 0, n - 1)]
+
+    elif kind == 'nearest':
+        if n == 1:
+            return y[np.zeros(xi.shape, dtype=int)]
+        i = np.clip(np.searchsorted(x, xi), 1, n - 1)
+        # Step back to the left sample when it is at least as close
+        i -= (xi - x[i - 1]) <= (x[i] - xi)
+        return y[i]
+
+    elif kind == 'linear' and not np.iscomplexobj(y):
+        return np.interp(xi, x, y)
+
+    elif kind == 'linear':
+        return np.interp(xi, x, y.real) + 1j*np.interp(xi, x, y.imag)
+
+    from scipy import interpolate
+    f = interpolate.InterpolatedUnivariateSpline(x, y, k=SPLINE_ORDER[kind], ext='const')
+    return f(xi)
+
+
+class Interpolator:
+    """ Interpolates y(x) at new x values.
+
+    :param x: x values.  Need not be sorted.
+    :param y: y values
+    :param kind: One of KINDS.  'step' is an alias of 'zero'.
+    :param outside: Values returned outside of the range of *x*:
+        'extrapolate' -- Extrapolate linear and spline interpolation.  Step and nearest hold their end values.
+        'hold'        -- The first and last y values.
+        'nan'         -- NaN.
+    """
+    def __init__(self, x, y, kind='linear', outside='extrapolate'):
+        if kind not in KINDS:
+            raise ValueError("Unknown interpolation: {}".format(kind))
+        if outside not in OUTSIDE:
+            raise ValueError("Unknown extrapolation: {}".format(outside))
+        if kind == 'step':
+            kind = 'zero'
+
+        self.x, self.y = sort_xy(x, y)
+        self.kind = kind
+        self.outside = outside
+
+        self._spline = None
+        if kind in SPLINE_ORDER:
+            from scipy import interpolate
+            ext = 0 if outside == 'extrapolate' else 3
+            self._spline = interpolate.InterpolatedUnivariateSpline(self.x, self.y, k=SPLINE_ORDER[kind], ext=ext)
+
+    def out_of_bounds(self, xi):
+        return (xi < self.x[0]) | (xi > self.x[-1])
+
+    def __call__(self, xi):
+        xi = np.asarray(xi)
+        if self._spline is not None:
+            y = self._spline(xi)
+        else:
+            y = resample(self.x, self.y, xi, self.kind)
+
+        if self.outside == 'extrapolate' and self.kind == 'linear' and len(self.x) > 1:
+            # np.interp holds the end values.  Extend the first and last segments instead.
+            x, yd = self.x, self.y
+            y = np.where(xi < x[0], yd[0] + (xi - x[0])*(yd[1] - yd[0])/(x[1] - x[0]), y)
+            y = np.where(xi > x[-1], yd[-1] + (xi - x[-1])*(yd[-1] - yd[-2])/(x[-1] - x[-2]), y)
+        elif self.outside == 'nan':
+            y = np.where(self.out_of_bounds(xi), np.nan, y)
+        return y
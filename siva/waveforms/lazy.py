@@ -0,0 +1,109 @@
+import numbers
+
+import numpy as np
+
+from .wave import Wave, Point
+
+
+class LazyWave(Wave):
+    """ A waveform whose x and y vectors stay on disk until they are needed.
+
+    *x* and *y* can be any array-like objects that support slicing and len(), such as h5py Datasets.
+    Indexing and windowing the waveform only reads the requested portion of the data:
+
+        w = results.v('dut.out', lazy=True)
+        w[100:200]      # Points 100 through 199
+        w[1e-9:2e-9]    # Points with x values between 1ns and 2ns (x must be ascending)
+
+    Any other operation reads the full x and y vectors into memory once, and then behaves like a Wave.
+    """
+
+    def __init__(self, x, y, name=None, desc=None, interp='linear', default=None, threshold=None):
+        self.name = name
+        self.desc = desc
+        self.interp = interp
+        self.default = default
+        self.threshold = threshold
+
+        self._build_mode = False
+        self._x_ds = x
+        self._y_ds = y
+        self._x = None
+        self._y = None
+
+    @property
+    def x(self):
+        if self._x is None:
+            self._x = np.asarray(self._x_ds[:])
+            self._x_changed()
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        Wave.x.fset(self, value)
+
+    @property
+    def y(self):
+        if self._y is None:
+            self._y = np.asarray(self._y_ds[:])
+        return self._y
+
+    @y.setter
+    def y(self, value):
+        Wave.y.fset(self, value)
+
+    @property
+    def is_loaded(self):
+        return self._x is not None and self._y is not None
+
+    def __getattr__(self, name):
+        # The sample rate and order are computed when x is loaded
+        if name in ('dx', 'order'):
+            self.x
+            return self.__dict__[name]
+        raise AttributeError(name)
+
+    def __len__(self):
+        if self._x is not None:
+            return len(self._x)
+        return len(self._x_ds)
+
+    def __getitem__(self, key):
+        if self.is_loaded:
+            return super().__getitem__(key)
+
+        if isinstance(key, numbers.Integral):
+            return Point(self._x_ds[key], self._y_ds[key])
+        elif isinstance(key, slice):
+            if self._is_x_value(key.start) or self._is_x_value(key.stop):
+                return self.window(key.start, key.stop)
+            return Wave(x=self._x_ds[key], y=self._y_ds[key], name=self.name, interp=self.interp)
+        return super().__getitem__(key)
+
+    @staticmethod
+    def _is_x_value(value):
+        return isinstance(value, numbers.Real) and not isinstance(value, numbers.Integral)
+
+    def window(self, start=None, stop=None):
+        """Returns a Wave of the points whose x values are between *start* and *stop*, inclusive.
+        Only the chunks of the data containing the window are read.
+        """
+        i = 0 if start is None else self._search(start, side='left')
+        j = len(self) if stop is None else self._search(stop, side='right')
+        return Wave(x=self._x_ds[i:j], y=self._y_ds[i:j], name=self.name, interp=self.interp)
+
+    def _search(self, value, side='left'):
+        """ Binary search of the (ascending) x vector, reading one element per step.
+        """
+        if self._x is not None:
+            return int(np.searchsorted(self._x, value, side=side))
+
+        lo, hi = 0, len(self._x_ds)
+        while lo < hi:
+            mid = (lo + hi)//2
+            x = self._x_ds[mid]
+            if x < value or (side == 'right' and x == value):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
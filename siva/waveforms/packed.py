@@ -0,0 +1,308 @@
+"""
+Patterns of fixed width words, stored in a Numpy array.
+
+Pattern holds a list of Binary objects, each a Python integer that is converted to a list of
+bits for every slice or inversion.  That is fine for a few words, but not for PRBS patterns
+with millions of them.  A PackedPattern stores the bits of each word in an unsigned integer
+(uint8, uint16, uint32 or uint64, the smallest that holds *width* bits), so bitwise operations,
+Verilog style bit selection, and signed conversions are array operations over every word:
+
+    >>> p = PackedPattern([0x12, 0xff, 0x80], width=8, format="twos_complement")
+    >>> p.values                    # array([ 18,  -1, -128])
+    >>> p.bits[7:4]                 # The upper nibble of each word, as a 4 bit pattern
+    >>> ~p & 0x0f
+    >>> PackedPattern.pack(bits, width=10)      # Bit stream to 10 bit words, MSB first
+
+Arithmetic wraps at the word width, like a hardware register.
+"""
+import numpy as np
+
+from .wave import wrap_methods
+
+FORMATS = ("unsigned", "twos_complement", "sign_magnitude")
+
+
+def word_dtype(width):
+    """Returns the smallest unsigned integer type that holds *width* bits."""
+    if not 0 < width <= 64:
+        raise ValueError("Width must be between 1 and 64.  {} was given.".format(width))
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if width <= np.iinfo(dtype).bits:
+            return np.dtype(dtype)
+
+
+class _BitSelect:
+    """Verilog style selection of the bits of every word.  (See PackedPattern.bits)"""
+    def __init__(self, pattern):
+        self.pattern = pattern
+
+    def __getitem__(self, key):
+        p = self.pattern
+        if isinstance(key, slice):
+            msb = p.width - 1 if key.start is None else key.start
+            lsb = 0 if key.stop is None else key.stop
+            if msb < lsb:
+                # bus[0:7]:  the bits in reversed order
+                return p.select(lsb, msb).reverse()
+            return p.select(msb, lsb)
+        if not 0 <= key < p.width:
+            raise IndexError("Bit {} of a {} bit pattern".format(key, p.width))
+        return ((p.words >> p.dtype.type(key)) & p.dtype.type(1)).astype(np.uint8)
+
+
+@wrap_methods
+class PackedPattern:
+    """ A pattern of *width* bit words.
+
+    :param words: Integers, encoded in *format*.  Arrays of unsigned integers (E.g., np.uint8) are taken as
+                  encoded words.
+    :param width: Bits per word, up to 64.  If None, the fewest bits that hold the largest word.
+    :param format: How the words are interpreted as integers (See values):  unsigned, twos_complement, or
+                   sign_magnitude.
+    """
+    BIN_OPS = ('__add__', '__sub__', '__mul__', '__lshift__', '__rshift__', '__and__', '__or__', '__xor__',
+               '__radd__', '__rsub__', '__rmul__', '__rand__', '__rxor__', '__ror__',
+               '__lt__', '__le__', '__eq__', '__ne__', '__gt__', '__ge__')
+
+    BOOL_BIN_OPS = ('__lt__', '__le__', '__eq__', '__ne__', '__gt__', '__ge__')
+
+    # Operations on the bits.  Others, on the values.
+    BITWISE_OPS = ('__and__', '__or__', '__xor__', '__rand__', '__rxor__', '__ror__')
+
+    UNARY_WAVE_OPS = ('__neg__',)
+
+    UNARY_VALUE_OPS = ('min', 'max', 'sum', 'all', 'any')
+
+    def __init__(self, words=(), width=None, format="unsigned", name=None):
+        if format not in FORMATS:
+            raise ValueError("format must be 'unsigned', 'twos_complement', or 'sign_magnitude'")
+        self.format = format
+        self.name = name
+
+        words = np.asarray(words)
+        if words.size == 0:
+            # np.asarray([]) is float
+            words = np.zeros(0, dtype=word_dtype(width or 1))
+        if words.dtype.kind not in 'iub':
+            raise TypeError("Words must be integers.  Got {}".format(words.dtype))
+        if width is None:
+            width = self._min_width(words, format)
+        self.width = width
+        self.dtype = word_dtype(width)
+        self.mask = self.dtype.type((1 << width) - 1)
+        self.words = self._encode(words.ravel())
+
+    @staticmethod
+    def _min_width(values, format):
+        """The fewest bits that hold *values*."""
+        if len(values) == 0:
+            return 1
+        lo, hi = int(values.min()), int(values.max())
+        if format == "unsigned":
+            return max(hi.bit_length(), 1)
+        if format == "twos_complement":
+            return max(max(hi, 0).bit_length(), (~lo).bit_length() if lo < 0 else 0) + 1
+        return max(max(hi, 0).bit_length(), (-lo).bit_length()) + 1
+
+    @classmethod
+    def _from_words(cls, words, width, format="unsigned", name=None):
+        """Wraps an array of encoded words, without copying it."""
+        p = cls.__new__(cls)
+        p.format = format
+        p.name = name
+        p.width = width
+        p.dtype = word_dtype(width)
+        p.mask = p.dtype.type((1 << width) - 1)
+        p.words = words
+        return p
+
+    def _encode(self, values):
+        """Encodes integers as words."""
+        if values.dtype.kind in 'ub':
+            return values.astype(self.dtype) & self.mask
+
+        values = values.astype(np.int64)
+        if self.format == "sign_magnitude":
+            sign = self.dtype.type(1 << (self.width - 1))
+            magnitude = np.abs(values).astype(np.uint64).astype(self.dtype) & (sign - self.dtype.type(1))
+            return np.where(values < 0, magnitude | sign, magnitude)
+
+        # Two's complement.  Negative unsigned values wrap, too.
+        return values.view(np.uint64).astype(self.dtype) & self.mask
+
+    @property
+    def values(self):
+        """The words as integers, according to the pattern's format."""
+        if self.format == "unsigned":
+            return self.words
+
+        sign = self.dtype.type(1 << (self.width - 1))
+        negative = (self.words & sign) != 0
+        if self.format == "twos_complement":
+            if self.width == 64:
+                return self.words.view(np.int64)
+            return self.words.astype(np.int64) - (negative.astype(np.int64) << self.width)
+
+        magnitude = (self.words & (sign - self.dtype.type(1))).astype(np.int64)
+        return np.where(negative, -magnitude, magnitude)
+
+    @property
+    def bits(self):
+        """ Selects bits of every word with Verilog rules:  p.bits[7:4] is bits 7 down to 4, as a 4 bit pattern.
+        p.bits[0:3] is bits 0 up to 3 (reversed).  p.bits[2] is bit 2 of each word, as an array.
+        """
+        return _BitSelect(self)
+
+    def select(self, msb, lsb=None):
+        """Returns bits *msb* down to *lsb* of every word, as an unsigned pattern."""
+        if lsb is None:
+            lsb = msb
+        if not 0 <= lsb <= msb < self.width:
+            raise IndexError("Bits [{}:{}] of a {} bit pattern".format(msb, lsb, self.width))
+        width = msb - lsb + 1
+        dtype = word_dtype(width)
+        words = ((self.words >> self.dtype.type(lsb)) & self.dtype.type((1 << width) - 1)).astype(dtype)
+        return PackedPattern._from_words(words, width)
+
+    def reverse(self):
+        """Returns the pattern with the bits of each word in reversed order."""
+        words = np.zeros_like(self.words)
+        one = self.dtype.type(1)
+        for i in range(self.width):
+            words |= ((self.words >> self.dtype.type(i)) & one) << self.dtype.type(self.width - 1 - i)
+        return self._from_words(words, self.width, self.format, self.name)
+
+    @staticmethod
+    def concat(*patterns):
+        """ Concatenates the bits of the words of *patterns*, like Verilog's {a, b}.  The first pattern's
+        bits are the most significant.
+        """
+        width = sum(p.width for p in patterns)
+        dtype = word_dtype(width)
+        words = np.zeros(len(patterns[0]), dtype=dtype)
+        for p in patterns:
+            words = (words << dtype.type(p.width)) | p.words.astype(dtype)
+        return PackedPattern._from_words(words, width)
+
+    @classmethod
+    def pack(cls, bits, width, msb_first=True, format="unsigned"):
+        """Packs a stream of bits (0s and 1s) into *width* bit words.  Trailing bits of a partial word are dropped."""
+        bits = np.asarray(bits)
+        n = len(bits)//width
+        bits = bits[:n*width].reshape(n, width)
+        if not msb_first:
+            bits = bits[:, ::-1]
+        dtype = word_dtype(width)
+        words = np.zeros(n, dtype=dtype)
+        for i in range(width):
+            words = (words << dtype.type(1)) | bits[:, i].astype(dtype)
+        return cls._from_words(words, width, format)
+
+    def unpack(self, msb_first=True):
+        """Returns the bits of the words, as a stream of 0s and 1s (uint8)."""
+        shifts = np.arange(self.width, dtype=self.dtype)
+        if msb_first:
+            shifts = shifts[::-1]
+        bits = (self.words[:, None] >> shifts) & self.dtype.type(1)
+        return bits.astype(np.uint8).ravel()
+
+    @classmethod
+    def from_pattern(cls, pattern, width=None, format="unsigned"):
+        """Converts a Pattern of Binary values."""
+        return cls([int(item) for item in pattern.data], width=width or pattern.width, format=format,
+                   name=pattern.name)
+
+    def to_pattern(self):
+        from .pattern import Pattern
+
+        return Pattern([int(v) for v in self.values], name=self.name, width=self.width)
+
+    @classmethod
+    def from_logic(cls, logic, width=None, period=None, start=None, format="unsigned"):
+        """ Converts a Logic waveform.  Each point is a word, or if a *period* is given, the waveform is sampled
+        in the middle of each period from *start* (Default: its first point).
+        """
+        y = logic.y
+        if period is not None:
+            if start is None:
+                start = logic.x[0]
+            n = int(np.floor((logic.x[-1] - start)/period + 0.5))
+            x = start + (np.arange(n) + 0.5)*period
+            y = logic.y[np.searchsorted(logic.x, x, side='right') - 1]
+        return cls(np.asarray(y).astype(np.int64), width=width or logic.width, format=format, name=logic.name)
+
+    def to_logic(self, period=1.0, start=0.0, reduce=True):
+        """ Returns the values as a Logic waveform, one word per *period* from *start*.  If *reduce*, only the
+        points where the value changes are kept.
+        """
+        from .logic import Logic
+
+        values = self.values
+        x = start + np.arange(len(values))*period
+        if reduce and len(values) > 1:
+            keep = np.concatenate(([True], values[1:] != values[:-1]))
+            x, values = x[keep], values[keep]
+        return Logic(x=x, y=values, name=self.name, width=self.width)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __iter__(self):
+        return iter(self.values.tolist())
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return self.values[key].item()
+        return self._from_words(self.words[key], self.width, self.format, self.name)
+
+    def __invert__(self):
+        return self._from_words(~self.words & self.mask, self.width, self.format, self.name)
+
+    def __repr__(self):
+        return "PackedPattern({}, width={}, format='{}')".format(self.values, self.width, self.format)
+
+    # ===========================================================
+    # Math methods
+    # ===========================================================
+    def _binary_operation(self, op, other):
+        if op in self.BITWISE_OPS:
+            if isinstance(other, PackedPattern):
+                width = max(self.width, other.width)
+                dtype = word_dtype(width)
+                words = getattr(self.words.astype(dtype), op)(other.words.astype(dtype))
+                return self._from_words(words, width, self.format, self.name)
+            other = self._encode(np.asarray(other))
+            return self._from_words(getattr(self.words, op)(other), self.width, self.format, self.name)
+
+        if op in ('__lshift__', '__rshift__'):
+            words = getattr(self.words, op)(self.dtype.type(other)) & self.mask
+            return self._from_words(words, self.width, self.format, self.name)
+
+        if isinstance(other, PackedPattern):
+            other = other.values
+        other = np.asarray(other)
+        if op in self.BOOL_BIN_OPS:
+            return getattr(self.values, op)(other)
+
+        if self.format == "sign_magnitude":
+            result = getattr(self.values, op)(other)
+            return self._from_words(self._encode(np.asarray(result)), self.width, self.format, self.name)
+
+        # Unsigned and two's complement arithmetic are the same, modulo 2**width
+        words = self.words.astype(np.uint64)
+        if other.dtype.kind in 'ub':
+            other = other.astype(np.uint64)
+        else:
+            other = other.astype(np.int64).view(np.uint64)
+        result = getattr(words, op)(other) & np.uint64(self.mask)
+        return self._from_words(result.astype(self.dtype), self.width, self.format, self.name)
+
+    def _unary_wave_operation(self, op):
+        if self.format == "sign_magnitude":
+            result = getattr(self.values, op)()
+            return self._from_words(self._encode(result), self.width, self.format, self.name)
+        result = getattr(self.words.astype(np.uint64), op)() & np.uint64(self.mask)
+        return self._from_words(result.astype(self.dtype), self.width, self.format, self.name)
+
+    def _unary_value_operation(self, op):
+        return getattr(self.values, op)()
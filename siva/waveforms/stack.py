@@ -0,0 +1,141 @@
+"""
+A stack of waveforms that share the same x values, such as one output of every variant
+of a sweep.  (See siva.simulation.measurement.evaluate_batch)
+
+The y values are stored as a 2-D array, one column per waveform, so an expression written
+for a single Wave is evaluated for all of them at once:
+
+    >>> s = WaveStack.from_waves(waves)
+    >>> (s - vdd).max()         # One value per wave.  vdd may be a scalar or one value per wave.
+    >>> s.cross(0.5, 'rising')  # The crossings of each wave, padded with NaN
+"""
+import numpy as np
+
+from .wave import Wave, wrap_methods
+
+
+@wrap_methods
+class WaveStack:
+    """ *n* waveforms with the same *x* values.  *y* is a (len(x), n) array.
+
+    Arrays of length *n* broadcast against the waveforms, one value per waveform.
+    """
+    BIN_OPS = ('__add__', '__sub__', '__mul__', '__floordiv__', '__mod__', '__pow__', '__truediv__',
+               '__radd__', '__rsub__', '__rmul__', '__rtruediv__', '__rfloordiv__', '__rmod__', '__rpow__',
+               '__and__', '__or__', '__xor__', '__rand__', '__ror__', '__rxor__',
+               '__lt__', '__le__', '__eq__', '__ne__', '__gt__', '__ge__')
+
+    UNARY_WAVE_OPS = ('__neg__', '__abs__', '__invert__')
+
+    # Reduce each waveform to a value
+    UNARY_VALUE_OPS = ('ptp', 'min', 'max', 'sum', 'mean', 'var', 'std', 'prod', 'all', 'any')
+
+    def __init__(self, x, y, interp='linear'):
+        self.x = np.asarray(x)
+        self.y = np.asarray(y)
+        if self.y.ndim != 2 or len(self.y) != len(self.x):
+            raise ValueError("y must be a (len(x), n) array.  Got {} for {} x values".format(self.y.shape, len(self.x)))
+        self.interp = interp
+
+    @classmethod
+    def from_waves(cls, waves):
+        """ Stacks a list of Waves.  Returns None if their x values or interpolation methods differ.
+        """
+        waves = list(waves)
+        if not waves or not all(isinstance(w, Wave) for w in waves):
+            return None
+        first = waves[0]
+        for w in waves[1:]:
+            if w.interp != first.interp or len(w.x) != len(first.x):
+                return None
+            if w.x is not first.x and not np.array_equal(w.x, first.x):
+                return None
+        return cls(first.x, np.column_stack([w.y for w in waves]), interp=first.interp)
+
+    def __len__(self):
+        return self.y.shape[1]
+
+    def __getitem__(self, i):
+        return Wave(x=self.x, y=self.y[:, i], interp=self.interp)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self):
+        return "WaveStack({} waves, {} points)".format(len(self), len(self.x))
+
+    def _binary_operation(self, op, other):
+        if isinstance(other, WaveStack):
+            if not np.array_equal(self.x, other.x):
+                raise ValueError("WaveStacks have different x values")
+            other = other.y
+        elif isinstance(other, Wave):
+            other = other.resample(self.x)[:, np.newaxis]
+        result = getattr(self.y, op)(other)
+        if result is NotImplemented:
+            return result
+        return WaveStack(self.x, result, interp=self.interp)
+
+    def _unary_wave_operation(self, op):
+        return WaveStack(self.x, getattr(self.y, op)(), interp=self.interp)
+
+    def _unary_value_operation(self, op):
+        return getattr(np, op)(self.y, axis=0)
+
+    def __call__(self, x):
+        """ Returns the values of every waveform at *x*, interpolated linearly.  An (len(x), n) array,
+        or (n,) for a scalar *x*.  Values outside of the x range are held.
+        """
+        xi = np.asarray(x, dtype=float)
+        i = np.clip(np.searchsorted(self.x, xi, side='right') - 1, 0, len(self.x) - 2)
+        t = np.clip((xi - self.x[i])/(self.x[i + 1] - self.x[i]), 0, 1)[..., np.newaxis]
+        return self.y[i]*(1 - t) + self.y[i + 1]*t
+
+    def xmax(self):
+        """The x value of each waveform's maximum"""
+        return self.x[self.y.argmax(axis=0)]
+
+    def xmin(self):
+        """The x value of each waveform's minimum"""
+        return self.x[self.y.argmin(axis=0)]
+
+    def rms(self):
+        return np.sqrt(np.mean(np.abs(self.y)**2, axis=0))
+
+    def cross(self, value, edge="either"):
+        """ Returns the x values where each waveform crosses *value*.  (See Wave.cross)
+
+        The result is a (k, n) array, where k is the most crossings of any waveform.  Waveforms
+        with fewer crossings are padded with NaN.  cross(...)[0] is the first crossing of each (NaN
+        if there is none).
+        """
+        assert(edge in ("either", "rising", "falling", "both"))
+        w = self.y - value
+        dy = np.diff(self.y, axis=0)
+        crossing = w[:-1]*w[1:] <= 0
+        if edge == "rising":
+            crossing &= dy >= 0
+        elif edge == "falling":
+            crossing &= dy <= 0
+
+        if self.interp in ('linear', 'slinear', None):
+            # A flat segment at the value doesn't cross it
+            crossing &= dy != 0
+        # Each waveform's crossings, in order
+        wave, i = np.nonzero(crossing.T)
+
+        if self.interp in ('nearest',):
+            x = (self.x[i] + self.x[i + 1])/2
+        elif self.interp in ('zero', 'step'):
+            x = self.x[i]
+        elif self.interp in ('linear', 'slinear', None):
+            x = self.x[i] + (self.x[i + 1] - self.x[i])*np.abs(w[i, wave]/dy[i, wave])
+        else:
+            raise NotImplementedError("Cubic, spline interpolation not implemented")
+
+        counts = np.bincount(wave, minlength=len(self))
+        result = np.full((max(1, counts.max(initial=0)), len(self)), np.nan)
+        first = np.cumsum(counts) - counts
+        result[np.arange(len(wave)) - first[wave], wave] = x
+        return result
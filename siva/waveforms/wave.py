@@ -9,6 +9,8 @@ TODO:  Create a wave class whose y-values correspond to an pair of x values.
 import numpy as np
 import collections
 
+from .interpolation import Interpolator, KINDS
+
 Point = collections.namedtuple('Point', ['x', 'y'])
 
 def wrap_binary_op_method(cls, op):
@@ -70,6 +72,14 @@ class Wave:
     UNARY_VALUE_OPS = ('ptp', 'min', 'max', 'sum', 'mean', 'var', 'std', 'prod',
                        'all', 'any')
 
+    # The x values of the result of a binary operation between Waves with different x values:
+    #   'union'         -- All x values of both waves
+    #   'intersection'  -- The x values of both waves, within the range covered by both
+    #   'left'/'right'  -- The x values of the left/right operand
+    #   A number        -- Evenly spaced x values with this step, over the range of both waves
+    DOMAINS = ('union', 'intersection', 'left', 'right')
+    domain = 'union'
+
     def __init__(self,data=None, x=None, y=None, name=None, desc=None, interp='linear', default=None,
                  threshold=None):
         self.name = name
@@ -77,9 +87,10 @@ class Wave:
         self.interp = interp
         self.default = default
 
-        self._x = []
-        self._y = []
-        self.build_mode = False
+        self._x = np.empty(0)
+        self._y = np.empty(0)
+        self._n = 0
+        self._next_x = None
         self._build_mode = False
 
         if data is None and x is None and y is None:
@@ -138,8 +149,9 @@ class Wave:
     @property
     def x(self):
         if self._build_mode:
-            if len(self._x):
-                return self._x[-1]
+            # The most recent value
+            if self._n:
+                return self._x[self._n - 1]
             else:
                 return 0
         return self._x
@@ -147,7 +159,9 @@ class Wave:
     @x.setter
     def x(self, value):
         if self._build_mode:
-            return self._x.append(value)
+            # Setting x, then y, appends a point
+            self._next_x = value
+            return
         if isinstance(value, Wave):
             self._x = value
         else:
@@ -155,6 +169,8 @@ class Wave:
         self._x_changed()
 
     def _x_changed(self):
+        self._interpolators = {}
+
         # Recompute the sample rate and order
         dx = np.diff(self.x)
         if len(dx) > 0 and dx.ptp() < len(self.x)*np.finfo(float).eps:
@@ -169,9 +185,10 @@ class Wave:
 
     @property
     def y(self):
-        if self.build_mode:
-            if len(self._y):
-                return self._y[-1]
+        if self._build_mode:
+            # The most recent value
+            if self._n:
+                return self._y[self._n - 1]
             else:
                 return 0
 
@@ -180,19 +197,78 @@ class Wave:
     @y.setter
     def y(self, value):
         if self._build_mode:
-            return self._x.append(value)
+            # Appends a point at the x value set last, or at the next index if none was set
+            x, self._next_x = self._next_x, None
+            self.append(self._n if x is None else x, value)
+            return
         if isinstance(value, Wave):
             self._y = value
         else:
             self._y = np.array(value)
+        self._interpolators = {}
 
-    def append(self, x,y):
-        if self.build_mode:
-            self._x.append(x)
-            self._y.append(y)
-        else:
-            np.append(self._x, x)
-            np.append(self._y, y)
+    def append(self, x, y):
+        """ Adds a point to the end of the waveform.  In build mode, this takes amortized constant time.
+        """
+        if not self._build_mode:
+            self.extend([x], [y])
+            return
+        n = self._n
+        if n == len(self._x) or (isinstance(y, complex) and self._y.dtype.kind != 'c'):
+            self.reserve(n + 1, y_dtype=np.result_type(self._y.dtype, type(y)))
+        self._x[n] = x
+        self._y[n] = y
+        self._n = n + 1
+
+    def extend(self, x, y):
+        """ Adds a block of points to the end of the waveform.
+
+        In build mode, the points are copied into the waveform's buffers, which grow geometrically.
+        Otherwise, the x and y arrays are replaced by longer ones.
+        """
+        x = np.asarray(x)
+        y = np.asarray(y)
+        if len(x) != len(y):
+            raise ValueError("x and y must have the same length: {} vs {}".format(len(x), len(y)))
+        if not self._build_mode:
+            self._x = np.concatenate((self._x, x))
+            self._y = np.concatenate((self._y, y))
+            self._x_changed()
+            return
+
+        n = self._n
+        stop = n + len(x)
+        self.reserve(stop, x_dtype=np.result_type(self._x.dtype, x.dtype),
+                      y_dtype=np.result_type(self._y.dtype, y.dtype))
+        self._x[n:stop] = x
+        self._y[n:stop] = y
+        self._n = stop
+
+    def reserve(self, length, x_dtype=None, y_dtype=None):
+        """ Grows the build mode buffers to hold at least *length* points.  Reserving the final length
+        up front avoids copying the points as the buffers grow.
+        """
+        x_dtype = self._x.dtype if x_dtype is None else x_dtype
+        y_dtype = self._y.dtype if y_dtype is None else y_dtype
+        capacity = len(self._x)
+        if length <= capacity and x_dtype == self._x.dtype and y_dtype == self._y.dtype:
+            return
+        while capacity < length:
+            capacity = max(1024, 2*capacity)
+
+        n = self._n
+        x = np.empty(capacity, dtype=x_dtype)
+        y = np.empty(capacity, dtype=y_dtype)
+        x[:n] = self._x[:n]
+        y[:n] = self._y[:n]
+        self._x, self._y = x, y
+
+    def finalize(self):
+        """ Ends build mode.  The x and y arrays become views of the build buffers, trimmed to the
+        points that were added, without copying them.  Returns this Wave.
+        """
+        self.build_mode = False
+        return self
 
     @property
     def build_mode(self):
@@ -200,14 +276,20 @@ class Wave:
 
     @build_mode.setter
     def build_mode(self, value):
-        if value:
-            # Convert x, y arrays to Python lists
-            self._x = self._x.tolist()
-            self._y = self._y.tolist()
-        else:
-            self._x = np.array(self._x)
-            self._y = np.array(self._y)
+        if value and not self._build_mode:
+            # Points are added to buffers with spare capacity.  (See append and extend)
+            self._n = len(self._x)
+            self._next_x = None
+            self._x = np.asarray(self._x, dtype=np.result_type(self._x, float))
+            self._y = np.asarray(self._y, dtype=np.result_type(self._y, float))
+            self.reserve(self._n)
+        elif not value and self._build_mode:
+            self._x = self._x[:self._n]
+            self._y = self._y[:self._n]
+            self._build_mode = False
+            self._x_changed()
         self._build_mode = value
+        self._interpolators = {}
 
     @property
     def points(self):
@@ -219,32 +301,80 @@ class Wave:
         self.y = points[:,1]
 
     def __len__(self):
+        if self._build_mode:
+            return self._n
         return self.x.__len__()
 
-    def _binary_operation(self, op, other):
+    def _binary_operation(self, op, other, domain=None):
         if self._build_mode:
             return getattr(self.y, op)(other)
 
         if isinstance(other, Wave):
-            # If the domains are the same, operate on the y arrays only.
-            if len(self.x) == len(other.x) and (self.x == other.x).all():
-                x = self.x
-                y = np.copy(other.y)
-            # Otherwise, combine the domains and interpolate
-            else:
-                # Find a common domain, interpolate
-                # and perform the operation
-                # print(self.x, other.x)
-                raise(NotImplementedError)
+            x, y_self, y = self.align(other, domain=domain)
         else:
             x = self.x
+            y_self = self.y
             y = other
 
-        method = getattr(self.y, op)
+        method = getattr(y_self, op)
         new_y = method(y)
         result = Wave(x=x, y=new_y)
         return result
 
+    def combine(self, other, op, domain=None):
+        """ Applies a binary operator to two waves, with a specific domain policy.
+
+            a.combine(b, '__add__', domain='intersection')
+        """
+        return self._binary_operation(op, other, domain=domain)
+
+    def common_domain(self, other, domain=None):
+        """ Returns the x values for combining this Wave with *other*.  See Wave.domain.
+        """
+        if domain is None:
+            domain = self.domain
+
+        if domain == 'left':
+            return self.x
+        elif domain == 'right':
+            return other.x
+
+        start = min(self.x.min(), other.x.min())
+        stop = max(self.x.max(), other.x.max())
+
+        if domain == 'union':
+            return np.union1d(self.x, other.x)
+        elif domain == 'intersection':
+            x = np.union1d(self.x, other.x)
+            start = max(self.x.min(), other.x.min())
+            stop = min(self.x.max(), other.x.max())
+            return x[np.searchsorted(x, start):np.searchsorted(x, stop, side='right')]
+        elif not isinstance(domain, str) and domain > 0:
+            # Resample.  Extend by half a step to include the stop value.
+            return np.arange(start, stop + domain/2, domain)
+        raise ValueError("Domain must be one of {}, or a step size: {}".format(self.DOMAINS, domain))
+
+    def align(self, other, domain=None):
+        """ Interpolates this Wave and *other* onto a common domain.
+
+        Each wave is interpolated with its own *interp* method.  Outside of its original domain,
+        a wave's first and last values are held.
+
+        :return: (x, self's y values, other's y values)
+        """
+        # If the domains are the same, operate on the y arrays only.
+        if len(self.x) == len(other.x) and (self.x == other.x).all():
+            return self.x, self.y, other.y
+
+        x = self.common_domain(other, domain)
+        return x, self.resample(x), other.resample(x)
+
+    def resample(self, x, kind=None):
+        """Returns the y values of this waveform at *x*, interpolated with *kind* (default: self.interp)."""
+        if len(x) == len(self.x) and (x is self.x or (x == self.x).all()):
+            return self.y
+        return self.interpolator(kind, outside='hold')(x)
+
     def _unary_wave_operation(self, op):
         method = getattr(self.y, op)
         new_y = method()
@@ -348,7 +478,7 @@ class Wave:
         elif self.interp in ('linear', 'slinear', None):
             # Interpolate linear between indices
             dx = np.diff(self.x)
-            x = self.x[i] + dx[i]*abs(w[i]/(dy[i]))
+            x = self.x[:-1][i] + dx[i]*abs(w[:-1][i]/(dy[i]))
             x = x[~np.isnan(x)]
         else:
             raise(NotImplementedError, "Cubic, spline interpolation not implemented")
@@ -473,42 +603,49 @@ class Wave:
         self._interp = value
 
     def interpolate(self, values, kind=None, bounds_error=False):
-        import scipy
-        from scipy import interpolate
+        """ Returns a Wave of this waveform's values at the x *values*, using *kind* interpolation
+        (default: self.interp).
 
+        Linear and spline interpolation extrapolate outside the waveform's domain, 'nearest'
+        holds the end values, and 'step'/'zero' return NaN.  If *bounds_error* is True, a
+        ValueError is raised instead.
+        """
         if kind is None:
             kind = self.interp
+        if kind not in KINDS:
+            raise ValueError("Unknown interpolation: {}".format(kind))
 
-        assert( kind in ('linear', 'nearest', 'zero', 'slinear', 'quadratic', 'cubic', 'step'))
-        # Alias 'step' with 'zero'
-        if (kind == "step"):
-            kind = 'zero'
-
-        kind_order = {'linear' : 1,
-                      'zero' : 0,
-                      'slinear' : 0,
-                      'quadratic' : 2,
-                      'cubic': 3,
-                      'step': 0
-                      }
-
-        if kind == 'zero':
-            f = interpolate.interp1d(self.x,self.y, kind='zero', bounds_error=bounds_error)
-        else:
-            # Using Univariate Spline gives us extrapolation too
-            f = interpolate.InterpolatedUnivariateSpline(self.x, self.y, k=kind_order[kind])
-
-        # Convert lists and numbers into ndarrays
-        if not isinstance(values, np.ndarray):
+        values = np.asarray(values)
+        if values.ndim == 0:
             # Int, float, bool, etc.
-            if not isinstance(values, collections.Iterable):
-                values = (values,)
-            values = np.array(values)
+            values = values.reshape(1)
+
+        f = self.interpolator(kind)
+        if bounds_error and f.out_of_bounds(values).any():
+            raise ValueError("A value is outside of the interpolation range")
 
         y = f(values)
         w = self.__class__(x=values, y=y)
         return w
 
+    def interpolator(self, kind=None, outside=None):
+        """ Returns an Interpolator for this waveform.
+
+        Interpolators are kept until x or y are assigned new values, so repeated sampling
+        doesn't re-sort the data or refit splines.  (Modifying x or y in place does not reset them.)
+        """
+        if kind is None:
+            kind = self.interp
+        if outside is None:
+            outside = 'nan' if kind in ('zero', 'step') else 'extrapolate'
+
+        cache = self.__dict__.setdefault('_interpolators', {})
+        key = (kind, outside)
+        f = cache.get(key)
+        if f is None:
+            f = cache[key] = Interpolator(self.x, self.y, kind=kind, outside=outside)
+        return f
+
     def irfft(self):
         y = np.fft.irfft(self.y)
         dt = 0.5/self.x[-1]
@@ -584,67 +721,103 @@ class Wave:
         ymin = self.y.argmin()
         return self.x[ymin]
 
-    def pdf(self):
-        pass
+    def pdf(self, bins=100, range=None):
+        """Returns the probability density of the y values, as a Wave of the density at the center of each bin."""
+        density, edges = np.histogram(self.y, bins=bins, range=range, density=True)
+        x = (edges[:-1] + edges[1:])/2
+        return Wave(x=x, y=density, name="PDF({})".format(self.name), interp='nearest')
 
     def cdf(self):
-        pass
+        """Returns the cumulative distribution of the y values, as a Wave."""
+        x = np.sort(self.y)
+        y = np.arange(1, len(x) + 1)/len(x)
+        return Wave(x=x, y=y, name="CDF({})".format(self.name), interp='step')
 
-    def histogram(self):
-        pass
+    def histogram(self, bins=100, range=None):
+        """Returns the number of y values in each bin, as a Wave of the counts at the center of each bin."""
+        counts, edges = np.histogram(self.y, bins=bins, range=range)
+        x = (edges[:-1] + edges[1:])/2
+        return Wave(x=x, y=counts, name="Histogram({})".format(self.name), interp='nearest')
 
     def rms(self):
-        pass
+        return np.sqrt(np.mean(np.abs(self.y)**2))
 
-    def slice(self, levels=None, values=[0,1]):
-        """ Slices the waveform into discrete Binary values using the provided **levels** and **values**.
+    def eye(self, ui=None, clock=None, **kwargs):
+        """Returns the eye diagram of the waveform, folded at a unit interval or a clock's period.  (See EyeDiagram)"""
+        from .eye import EyeDiagram
 
-        :param thresholds: Y levels at which to slice.  If **None**, will use the waveform's threshold attribute.
-        This can be a single item for PAM-2 coded data or a list of size log(N) for PAM-N data.
+        return EyeDiagram.from_wave(self, ui=ui, clock=clock, **kwargs)
 
-        Items in the list can be numerical values or a waveform.
+    def slice(self, levels=None, values=None):
+        """ Slices the waveform into discrete values using the provided **levels** and **values**.
 
-        :param levels: A list of integer values that are sliced by the thresholds. Must be greater than the number
-        of thresholds by 1.
+        :param levels: Y levels at which to slice, in ascending order.  If **None**, will use the waveform's
+        threshold attribute.  This can be a single item for PAM-2 coded data or a list of N-1 levels for PAM-N data.
 
-        return: Returns a Binary version of the waveform, by slicing at the given thresholds and mapping the
-        output to the given
+        :param values: The values of the regions between the levels, from the lowest to the highest.  Must be
+        greater than the number of levels by 1.  Defaults to 0, 1, ... N-1.
+
+        return: Returns a Logic version of the waveform, with a point at the start of the waveform and at each
+        change of value.
 
         For example to slice a differential NRZ value, levels would be [0], and values would be [-1,1].   To slice
-        CMOS logic waveforms, supply VDD/2 for the levels argument, and [0,1] for its values.
+        CMOS logic waveforms, supply VDD/2 for the levels argument, and [0,1] for its values.  A PAM-4 signal
+        is sliced with three levels, and values [0, 1, 2, 3] (or [-3, -1, 1, 3]).
+
+        Samples equal to a level are in the region below it.  The waveform is sliced in one pass:  each sample
+        is assigned a region, and each change of region is placed where the waveform crosses the level(s)
+        between the two regions.  When a change spans several levels between two samples (E.g., 0 to 3 in
+        PAM-4), one change is placed at the crossing of their middle.  The changes are found in order, so no
+        sorting is needed.
         """
-
-        # If levels
-
         if levels is None:
             if self.threshold is not None:
                 levels = (self.threshold,)
             else:
                 raise ValueError("Need to provide slicing threshold.")
 
-        # Handle the PAM-2 case since it is much easier to handle and will be the most common form.
-        if len(levels) == 1:
-
-            x0 = self.x[0]
-            y0 = values[0] if self.y[0] <= levels[0] else values[1]
-
-            x_rising = self.cross(levels[0], edge="rising")
-            x_falling = self.cross(levels[0], edge="falling")
-
-            y_rising  = np.array(int(values[1])).repeat(len(x_rising))
-            y_falling = np.array(int(values[0])).repeat(len(x_falling))
-
-            x = np.concatenate([[x0], x_rising, x_falling])
-            y = np.concatenate([[y0], y_rising, y_falling])
+        levels = np.atleast_1d(np.asarray(levels, dtype=float))
+        if values is None:
+            values = np.arange(len(levels) + 1)
+        values = np.asarray(values)
+        if len(values) != len(levels) + 1:
+            raise ValueError("Need {} values for {} levels.  Got {}".format(len(levels) + 1, len(levels), len(values)))
+        if (np.diff(levels) <= 0).any():
+            raise ValueError("Levels must be in ascending order: {}".format(levels))
+
+        x, y = self.x, self.y
+
+        # The region of each sample:  levels[i-1] < y <= levels[i].  For the few levels of PAM-N data,
+        # summing comparisons is several times faster than a search (np.digitize).
+        if len(levels) <= 16:
+            region = np.zeros(len(y), dtype=np.uint8)
+            for level in levels:
+                region += y > level
+        else:
+            region = np.digitize(y, levels, right=True)
 
-            indices = x.argsort()
-            x = x[indices]
-            y = y[indices]
+        # Samples followed by a change of region
+        i = np.flatnonzero(region[1:] != region[:-1])
+        before = region[i].astype(np.intp)
+        after = region[i + 1].astype(np.intp)
 
+        if self.interp in ('nearest',):
+            edges = (x[i] + x[i + 1])/2
+        elif self.interp in ('zero', 'step'):
+            edges = x[i]
         else:
-            raise NotImplementedError
-            rising = [ self.cross(level, edge="rising") for level in levels]
-            falling = [ self.cross(level, edge="falling") for level in levels]
+            # Linear interpolation to the crossing of the levels between the regions
+            lo = np.minimum(before, after)
+            hi = np.maximum(before, after) - 1
+            level = (levels[lo] + levels[hi])/2
+            y0 = y[i]
+            edges = x[i] + (x[i + 1] - x[i])*((level - y0)/(y[i + 1] - y0))
+
+        x = np.empty(len(i) + 1, dtype=np.result_type(x, edges))
+        x[0] = self.x[0]
+        x[1:] = edges
+        y = values[np.concatenate(([region[0]], after))]
+
         from .logic import Logic
 
         return Logic(x=x, y=y)